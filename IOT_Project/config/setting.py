@@ -18,23 +18,185 @@ DATA_DIR = BASE_DIRECTORY / "data"
 RAW_DATA_DIR = DATA_DIR / "raw"
 PROCESSED_DATA_DIR = DATA_DIR / "processed"
 RESULTS_DIR = BASE_DIRECTORY / "results"
+CACHE_DIR = DATA_DIR / "cache"
+FEATURE_STORE_DIR = PROCESSED_DATA_DIR / "feature_store"
+STATION_SHARDS_DIR = PROCESSED_DATA_DIR / "stations"
 
 # Dataset Configuration
                        
 DEFAULT_DATASET_NAME = "AirQualityUCI.csv"
 RAW_DATA_FILE = RAW_DATA_DIR / DEFAULT_DATASET_NAME
 
+# Columnar Data Cache
+
+USE_DATA_CACHE = True          # reuse Arrow copies of raw / cleaned data
+CACHE_HASH_CONTENT = True      # key on file bytes too, not only size + mtime
+CACHE_MAX_SIZE_MB = 2048       # least recently used entries evicted above this
+PIPELINE_CACHE_DIR = CACHE_DIR / "pipeline"   # memoized stage outputs of main.py
+PIPELINE_KEEP_ENTRIES = 3      # stored outputs kept per stage
+
+# Missing Value Imputation
+
+SENSOR_FAILURE_VALUE = -200    # value the UCI sensors report on failure
+IMPUTATION_STRATEGY = "median" # median | rolling_median | ffill | interpolate
+IMPUTATION_MAX_GAP = 6         # longest gap (rows) bridged by ffill
+ROLLING_MEDIAN_WINDOW = 24     # causal window (rows) for rolling_median
+
+# Label Thresholds
+
+LABEL_THRESHOLD_MODE = "global"    # global | expanding | rolling (causal, streaming)
+LABEL_THRESHOLD_WINDOW = 24 * 30   # rows covered by the rolling threshold
+
+# Features and Labels
+
+SENSOR_FEATURES = [
+    "CO(GT)",
+    "NO2(GT)",
+    "NOx(GT)",
+    "C6H6(GT)",
+    "T",
+    "RH",
+    "AH"
+]
+TARGET_COLUMNS = ["CO(GT)"]
+FORECAST_HORIZON = 1           # hours ahead
+
+# Lag / Rolling-Window Features
+
+USE_WINDOW_FEATURES = True
+WINDOW_FEATURES = {
+    "columns": ["CO(GT)", "NO2(GT)", "NOx(GT)", "C6H6(GT)"],
+    "lags": [1, 2, 3, 24],
+    "windows": [3, 6, 24],
+    "stats": ["mean", "std", "min", "max"],
+    "ewm_spans": [12],
+    "max_memory_mb": 512
+}
+
+# Preprocessing
+
+PREPROCESS_LOW_MEMORY = False  # preallocated float32 X, no full-frame copies
+RESAMPLE_HOURLY = True         # align rows onto a regular hourly grid; gap hours get no label
+RESAMPLE_ROUNDING = "nearest"  # "nearest" | "floor": hour a jittered reading is counted in
+RESAMPLE_FENCE_HOURS = 24 * 30 # readings this far beyond the chunk's 3 * IQR fence are dropped
+
 # Model Parameters
 
 TRAIN_TEST_SPLIT_RATIO = 0.8
 RANDOM_STATE = 42
 
+MODEL_BACKEND = "random_forest"   # "random_forest" | "hist_gradient_boosting"
+MODEL_PARAMS = {
+    "random_forest": {
+        "n_estimators": 100,
+        "max_depth": None,
+        "n_jobs": -1
+    },
+    "hist_gradient_boosting": {
+        "max_iter": 300,
+        "learning_rate": 0.1,
+        "max_leaf_nodes": 31,
+        "max_bins": 255,
+        "early_stopping": True,
+        "validation_fraction": 0.1,
+        "n_iter_no_change": 10
+    }
+}
+
+# Walk-Forward Backtesting
+
+BACKTEST_N_FOLDS = 5
+BACKTEST_MODE = "expanding"    # "expanding" | "sliding"
+BACKTEST_TEST_SIZE = None      # rows per test window; None splits the tail evenly
+BACKTEST_TRAIN_SIZE = None     # sliding mode window; None uses the first fold's size
+BACKTEST_GAP = FORECAST_HORIZON  # rows dropped between train and test (label look-ahead)
+
+# Incremental Training
+
+INCREMENTAL_TRAINING = False   # update the saved forest with new rows instead of retraining
+MODEL_STATE_DIR = RESULTS_DIR / "model_state"
+INCREMENTAL_TREES_PER_UPDATE = 10
+INCREMENTAL_MAX_TREES = 100    # oldest trees are aged out above this
+INCREMENTAL_MIN_NEW_ROWS = 24  # wait for at least a day of new hourly rows
+DRIFT_ACCURACY_DROP = 0.10     # prequential accuracy drop that flags drift
+DRIFT_MEAN_SHIFT = 3.0         # feature mean shift (in reference std) that flags drift
+
+# Hyperparameter Tuning
+
+TUNING_DIR = RESULTS_DIR / "tuning"
+TUNING_N_CANDIDATES = 27
+TUNING_FACTOR = 3              # keep 1 / factor of the candidates per rung
+TUNING_N_FOLDS = 3             # walk-forward folds each trial is scored on
+TUNING_MIN_ROWS = None         # training rows in the first rung; None derives it
+TUNING_SPACE = {
+    "random_forest": {
+        "n_estimators": [50, 100, 200],
+        "max_depth": [None, 8, 16, 32],
+        "min_samples_leaf": [1, 2, 5, 10],
+        "max_features": ["sqrt", 0.5, 1.0]
+    },
+    "hist_gradient_boosting": {
+        "learning_rate": [0.03, 0.1, 0.3],
+        "max_leaf_nodes": [15, 31, 63],
+        "min_samples_leaf": [10, 20, 50],
+        "l2_regularization": [0.0, 0.1, 1.0]
+    }
+}
+
+# ONNX Inference
+
+ONNX_MODEL_PATH = RESULTS_DIR / "air_quality_model.onnx"
+ORT_INTRA_OP_THREADS = 1       # per-operator threads; batching supplies the parallelism
+ORT_INTER_OP_THREADS = 1
+
+# ONNX Export Optimization
+
+OPTIMIZE_ONNX_EXPORT = False   # write and measure optimized variants after export
+ONNX_OPTIMIZATION = {
+    "ort_format": True,                        # also save an ORT-format copy
+    "threshold_precisions": ["float16", "int8"],
+    "max_trees": 50                            # pruned variant; None to skip
+}
+
+# Inference Server
+
+INFERENCE_HOST = "127.0.0.1"
+INFERENCE_PORT = 8765
+INFERENCE_SOCKET_PATH = None   # Unix socket path; overrides host / port when set
+INFERENCE_MAX_BATCH_SIZE = 256
+INFERENCE_BATCH_LATENCY_MS = 2.0  # longest a request waits for others to join its batch
+
 # Logging Configuration
 
 LOG_LEVEL = "INFO"
 LOG_FILE_NAME = "project.log"
 LOG_FILE_PATH = BASE_DIRECTORY / LOG_FILE_NAME
 
+# Stage Instrumentation
+
+INSTRUMENT_STAGES = True       # time / memory / row counts of the main pipeline functions
+INSTRUMENT_TRACEMALLOC = False # exact Python allocation peaks; slows the run down
+PROFILE_STAGES = None          # None | "cprofile" | "pyinstrument": one profile dump per stage
+STAGE_METRICS_FILE = RESULTS_DIR / "stage_metrics.json"
+PROFILE_DIR = RESULTS_DIR / "profiles"
+
+# Evaluation Reports
+
+REPORT_MODE = "interactive"    # "interactive" (pyplot windows) | "headless" (Agg files + index)
+REPORTS_DIR = RESULTS_DIR / "reports"
+ROC_MAX_POINTS = 500           # ROC curves are resampled to at most this many points
+REPORT_POOL_MIN_FIGURES = 8    # fewer figures are rendered in-process
+
+# Feature Importance
+
+PERMUTATION_IMPORTANCE = False # evaluate with permutation instead of impurity importances
+PERMUTATION_BACKEND = "sklearn"  # "sklearn" (fitted model) | "onnx" (ONNX_MODEL_PATH session)
+PERMUTATION_SCORING = "roc_auc"  # "roc_auc" | "accuracy" | "precision" | "recall" | "f1_score"
+PERMUTATION_REPEATS = 5
+PERMUTATION_MAX_ROWS = 5000    # test rows sampled per run; None scores all of them
+PERMUTATION_BATCH_MB = 64      # permuted copies of X scored together in one predict call
+IMPORTANCE_CACHE_DIR = RESULTS_DIR / "importance"
+
 # Validation Rules
 
 REQUIRED_COLUMNS = [
@@ -55,6 +217,30 @@ USE_SYNTHETIC_DATA = True   # True → synthetic | False → real
 REAL_DATA_FILE = RAW_DATA_DIR / "AirQualityUCI.csv"
 SYNTHETIC_DATA_FILE = RAW_DATA_DIR / "AirQualityUCI_synthetic.csv"
 
+# Chunked Loading
+
+CHUNK_SIZE_ROWS = 500_000      # upper bound on rows per streamed chunk
+MAX_CHUNK_MEMORY_MB = 256      # peak memory cap for a single chunk while parsing
+
+
+# Multi-Station Processing
+
+MULTI_STATION_MODE = False     # preprocess every station file in RAW_DATA_DIR
+STATION_FILE_PATTERN = "*.csv"
+MAX_WORKERS = os.cpu_count()   # worker processes for parallel stages
+
+# Streaming Ingestion
+
+STREAMING_MODE = False         # main.py scores a live record feed instead of the batch pipeline
+STREAM_SOURCE = "tail"         # "stdin" | "pipe" | "tail" | "tcp"
+STREAM_PATH = None             # named pipe / tailed CSV; None follows the selected dataset
+STREAM_HOST = "127.0.0.1"
+STREAM_PORT = 8766
+STREAM_POLL_SECONDS = 1.0      # tail: wait between checks for new lines
+STREAM_WARMUP = True           # replay the selected dataset first to prime lags and thresholds
+STREAM_OUTPUT_PATH = None      # JSON lines file of hourly predictions; None prints them
+STREAM_REPORT_EVERY = 24       # scored hours between latency / accuracy summaries
+STREAM_DATE_FORMAT = None      # Date layout of live records, e.g. "%d/%m/%Y"; None detects it from the historical dataset
 
 # Environment Mode
 
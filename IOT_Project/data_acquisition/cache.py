@@ -0,0 +1,158 @@
+"""
+Columnar Data Cache
+
+This module stores DataFrames as Arrow (Feather v2) files, so repeat
+runs memory-map a binary file instead of parsing the semicolon /
+comma-decimal CSV again. utils.pipeline keys the entries on the stage,
+its parameters and the source file fingerprint built here.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+from config.setting import (
+    CACHE_DIR,
+    CACHE_HASH_CONTENT,
+    CACHE_MAX_SIZE_MB
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - cache is optional
+    pa = None
+    feather = None
+
+
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_fingerprint(data_path, hash_content: bool = CACHE_HASH_CONTENT) -> dict:
+    """
+    Describe a source file well enough to detect any change to it.
+
+    Parameters
+    ----------
+    data_path : Path
+        Source file
+    hash_content : bool, optional
+        Also hash the file bytes (catches edits that keep size and mtime)
+
+    Returns
+    -------
+    dict
+        path, size, mtime_ns and (optionally) sha256
+    """
+    data_path = Path(data_path).resolve()
+    stat = data_path.stat()
+
+    fingerprint = {
+        "path": str(data_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns
+    }
+
+    if hash_content:
+        digest = hashlib.sha256()
+        with open(data_path, "rb") as f:
+            for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+        fingerprint["sha256"] = digest.hexdigest()
+
+    return fingerprint
+
+
+def _entry_path(key: str, cache_dir: Path) -> Path:
+    return Path(cache_dir) / f"{key}.arrow"
+
+
+def read_cached_frame(key: str, cache_dir: Path = CACHE_DIR):
+    """
+    Memory-map a cached frame.
+
+    Numeric columns without nulls wrap the mapped file instead of being
+    copied (and are read-only); other columns are converted one at a
+    time, releasing each Arrow buffer once it is converted.
+
+    Returns
+    -------
+    pd.DataFrame | None
+        Cached frame, or None on a cache miss
+    """
+    path = _entry_path(key, cache_dir)
+    if feather is None or not path.exists():
+        return None
+
+    table = feather.read_table(path, memory_map=True)
+
+    # Mark the entry as recently used for eviction
+    os.utime(path)
+
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def write_cached_frame(
+    key: str,
+    df,
+    cache_dir: Path = CACHE_DIR,
+    max_size_mb: float = CACHE_MAX_SIZE_MB
+):
+    """
+    Store a frame as an uncompressed Arrow file and enforce the size limit.
+    """
+    if pa is None:
+        return
+
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    path = _entry_path(key, cache_dir)
+    tmp_path = path.with_suffix(".tmp")
+
+    # Uncompressed so the file can be memory-mapped without decoding
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+
+    evict_cache(cache_dir=cache_dir, max_size_mb=max_size_mb)
+
+
+def evict_cache(cache_dir: Path = CACHE_DIR, max_size_mb: float = CACHE_MAX_SIZE_MB):
+    """
+    Delete least recently used entries until the cache fits max_size_mb.
+
+    Returns
+    -------
+    list
+        Paths of evicted entries
+    """
+    cache_dir = Path(cache_dir)
+    if not cache_dir.exists():
+        return []
+
+    entries = sorted(
+        (p.stat().st_mtime, p.stat().st_size, p)
+        for p in cache_dir.glob("*.arrow")
+    )
+
+    total = sum(size for _, size, _ in entries)
+    limit = max_size_mb * 1024 * 1024
+
+    evicted = []
+    for _, size, path in entries:
+        if total <= limit:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        evicted.append(path)
+
+    return evicted
+
+
+def clear_cache(cache_dir: Path = CACHE_DIR):
+    """
+    Remove every cached entry.
+    """
+    return evict_cache(cache_dir=cache_dir, max_size_mb=0)
+
@@ -1,19 +1,368 @@
 # preprocessing/cleaning.py
 
+import warnings
+
+import numpy as np
 import pandas as pd
-#from config.setting import (
-#    PROCESSED_DATA_DIR,
-#    RAW_DATA_FILE
-#)
+from numpy.lib.stride_tricks import sliding_window_view
+
+from config.setting import (
+    SENSOR_FAILURE_VALUE,
+    IMPUTATION_STRATEGY,
+    IMPUTATION_MAX_GAP,
+    ROLLING_MEDIAN_WINDOW,
+    TRAIN_TEST_SPLIT_RATIO
+)
+from preprocessing.resampling import READINGS_COLUMN
+from utils.instrumentation import instrumented
+
+
+IMPUTATION_STRATEGIES = ("median", "rolling_median", "ffill", "interpolate")
+
+
+def _sensor_block(df, columns):
+    """
+    Return the sensor columns as one float32 block with failures set to NaN.
+    """
+    block = df[columns].to_numpy(dtype=np.float32, copy=True)
+    block[block == SENSOR_FAILURE_VALUE] = np.nan
+
+    return block
+
+
+def fit_imputer(df, columns=None, train_ratio: float = TRAIN_TEST_SPLIT_RATIO) -> dict:
+    """
+    Fit imputation statistics on the training window only.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Time-ordered dataframe
+    columns : list | None
+        Sensor columns; all numeric columns except READINGS_COLUMN if None
+    train_ratio : float, optional
+        Leading fraction of rows treated as the training window, matching
+        the time-based split in train_model
+
+    Returns
+    -------
+    dict
+        JSON-serialisable statistics, reusable at inference
+    """
+    if columns is None:
+        # The reading counts of resample_hourly are not sensor values
+        columns = [c for c in df.select_dtypes(include="number").columns if c != READINGS_COLUMN]
+
+    n_train = max(1, int(len(df) * train_ratio))
+    block = _sensor_block(df.iloc[:n_train], columns)
+
+    with warnings.catch_warnings():
+        # All-missing columns simply get no median
+        warnings.simplefilter("ignore", RuntimeWarning)
+        medians = np.nanmedian(block, axis=0)
+
+    return {
+        "columns": columns,
+        "medians": [None if np.isnan(m) else float(m) for m in medians],
+        "fitted_rows": n_train
+    }
+
+
+def _time_axis(df, timestamp_col):
+    """
+    Positions used for interpolation: epoch values if available, else rows.
+    """
+    if timestamp_col is not None and pd.api.types.is_datetime64_any_dtype(df[timestamp_col]):
+        return df[timestamp_col].to_numpy().astype("datetime64[s]").astype(np.int64).astype(np.float64)
+
+    return np.arange(len(df), dtype=np.float64)
+
+
+def _fill_rolling_median(block, mask, window):
+    """
+    Causal rolling median over the previous `window` rows, missing cells only.
+    """
+    padded = np.vstack([np.full((window, block.shape[1]), np.nan, dtype=np.float32), block])
+    # windows[t] covers original rows t - window .. t - 1
+    windows = sliding_window_view(padded[:-1], window, axis=0)
+
+    rows, cols = np.nonzero(mask)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        block[rows, cols] = np.nanmedian(windows[rows, cols], axis=1)
+
+
+def _fill_forward(block, mask, max_gap):
+    """
+    Forward-fill gaps of at most max_gap rows.
+    """
+    n_rows = block.shape[0]
+    positions = np.arange(n_rows)[:, None]
+
+    last_seen = np.where(mask, 0, positions)
+    np.maximum.accumulate(last_seen, axis=0, out=last_seen)
+
+    has_prior = ~mask[last_seen, np.arange(block.shape[1])]
+    fillable = mask & has_prior & (positions - last_seen <= max_gap)
+
+    filled = np.take_along_axis(block, last_seen, axis=0)
+    np.copyto(block, filled, where=fillable)
+
+
+def _fill_interpolate(block, mask, time_axis):
+    """
+    Linear interpolation in time between observed values (no extrapolation).
+    """
+    for j in range(block.shape[1]):
+        missing = mask[:, j]
+        if not missing.any() or missing.all():
+            continue
+
+        observed = ~missing
+        t_obs = time_axis[observed]
+        t_miss = time_axis[missing]
+
+        values = np.interp(t_miss, t_obs, block[observed, j])
+        inside = (t_miss > t_obs[0]) & (t_miss < t_obs[-1])
+
+        column = block[:, j]
+        idx = np.flatnonzero(missing)[inside]
+        column[idx] = values[inside]
+
+
+def apply_imputer(
+    df,
+    stats: dict,
+    strategy: str = IMPUTATION_STRATEGY,
+    max_gap: int = IMPUTATION_MAX_GAP,
+    window: int = ROLLING_MEDIAN_WINDOW,
+    timestamp_col: str | None = None
+):
+    """
+    Impute sensor failures with previously fitted statistics.
 
+    All sensor columns are processed together as one float32 block: the
+    failure mask is computed once, the chosen strategy fills what it can
+    in place, and anything left (leading gaps, gaps longer than max_gap)
+    falls back to the fitted medians.
 
-def handle_missing_values(df):
-    df = df.replace(-200, pd.NA)
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Time-ordered dataframe (or chunk)
+    stats : dict
+        Output of fit_imputer
+    strategy : str, optional
+        One of IMPUTATION_STRATEGIES
+    max_gap : int, optional
+        Longest gap forward-filled by "ffill"
+    window : int, optional
+        Causal window length for "rolling_median"
+    timestamp_col : str | None
+        Datetime column giving the time axis for "interpolate"
 
-    numeric_cols = df.select_dtypes(include="number").columns
-    df[numeric_cols] = df[numeric_cols].fillna(df[numeric_cols].median())
+    Returns
+    -------
+    pd.DataFrame
+    """
+    if strategy not in IMPUTATION_STRATEGIES:
+        raise ValueError(
+            f"Unknown imputation strategy '{strategy}', expected one of {IMPUTATION_STRATEGIES}"
+        )
+
+    columns = stats["columns"]
+    medians = np.array(
+        [np.nan if m is None else m for m in stats["medians"]],
+        dtype=np.float32
+    )
+
+    block = _sensor_block(df, columns)
+    mask = np.isnan(block)
+
+    if mask.any():
+        if strategy == "rolling_median":
+            _fill_rolling_median(block, mask, window)
+        elif strategy == "ffill":
+            _fill_forward(block, mask, max_gap)
+        elif strategy == "interpolate":
+            _fill_interpolate(block, mask, _time_axis(df, timestamp_col))
+
+        remaining = np.isnan(block)
+        np.copyto(block, np.broadcast_to(medians, block.shape), where=remaining)
+
+    df = df.copy(deep=False)
+    df[columns] = block
 
     return df
 
 
+class ChunkedImputer:
+    """
+    apply_imputer over consecutive chunks of one time-ordered series.
+
+    The output, concatenated, equals cleaning the whole series at once
+    with the same stats. The fitted statistics are fixed for every chunk,
+    and the raw rows a strategy still looks at are carried to the next
+    chunk:
+    - "median"         : nothing
+    - "ffill"          : the last max_gap rows
+    - "rolling_median" : the last `window` rows
+    - "interpolate"    : rows after the latest reading of a sensor wait
+      for its next reading in a later chunk (or flush()), together with
+      the rows back to the reading before them
+
+    Parameters
+    ----------
+    stats : dict
+        Output of fit_imputer, e.g. fitted on the training window once
+    strategy, max_gap, window, timestamp_col
+        See apply_imputer
+    """
+
+    def __init__(
+        self,
+        stats: dict,
+        strategy: str = IMPUTATION_STRATEGY,
+        max_gap: int = IMPUTATION_MAX_GAP,
+        window: int = ROLLING_MEDIAN_WINDOW,
+        timestamp_col: str | None = None
+    ):
+        if strategy not in IMPUTATION_STRATEGIES:
+            raise ValueError(
+                f"Unknown imputation strategy '{strategy}', expected one of {IMPUTATION_STRATEGIES}"
+            )
+
+        self.stats = stats
+        self.strategy = strategy
+        self.max_gap = max_gap
+        self.window = window
+        self.timestamp_col = timestamp_col
+
+        # Raw rows carried over; the first _n_context were already returned
+        self._tail = None
+        self._n_context = 0
+
+    def _context_rows(self) -> int:
+        if self.strategy == "ffill":
+            return self.max_gap
+        if self.strategy == "rolling_median":
+            return self.window
+
+        return 0
+
+    def _interpolation_bounds(self, buffer) -> tuple:
+        """
+        (start, cut): rows from cut on wait for a later reading of some
+        sensor, rows from start on are needed to interpolate them.
+        """
+        observed = ~np.isnan(_sensor_block(buffer, self.stats["columns"]))
+        n_rows = len(buffer)
+
+        seen = observed.any(axis=0)
+        # Last reading of every sensor that has one
+        last = n_rows - 1 - np.argmax(observed[::-1], axis=0)
+        cut = int(min(last[seen].min() + 1, n_rows)) if seen.any() else n_rows
+
+        # Reading of every sensor at or before cut - 1
+        before = observed[:cut]
+        has_before = before.any(axis=0)
+        previous = cut - 1 - np.argmax(before[::-1], axis=0)
+        start = int(previous[has_before].min()) if has_before.any() else cut
+
+        return start, cut
+
+    def _emit(self, buffer, final: bool):
+        n_rows = len(buffer)
+        if n_rows == 0:
+            return buffer
+
+        cleaned = apply_imputer(
+            buffer,
+            self.stats,
+            strategy=self.strategy,
+            max_gap=self.max_gap,
+            window=self.window,
+            timestamp_col=self.timestamp_col
+        )
+
+        if final:
+            start = cut = n_rows
+        elif self.strategy == "interpolate":
+            start, cut = self._interpolation_bounds(buffer)
+            cut = max(cut, self._n_context)
+            start = min(start, cut)
+        else:
+            cut = n_rows
+            start = max(0, n_rows - self._context_rows())
+
+        emitted = cleaned.iloc[self._n_context:cut]
+
+        self._tail = buffer.iloc[start:].reset_index(drop=True)
+        self._n_context = cut - start
+
+        return emitted.reset_index(drop=True)
+
+    def transform(self, chunk):
+        """
+        Cleaned rows of the chunk (and held-back earlier rows) that no
+        later chunk can change.
+        """
+        buffer = chunk if self._tail is None else pd.concat([self._tail, chunk], ignore_index=True)
+
+        return self._emit(buffer, final=False)
+
+    def flush(self):
+        """
+        Remaining held-back rows, once no more chunks follow.
+        """
+        if self._tail is None:
+            return None
+
+        tail = self._emit(self._tail, final=True)
+        self._tail = None
+        self._n_context = 0
+
+        return tail
+
+
+@instrumented("clean")
+def handle_missing_values(
+    df,
+    strategy: str = IMPUTATION_STRATEGY,
+    stats: dict | None = None,
+    max_gap: int = IMPUTATION_MAX_GAP,
+    window: int = ROLLING_MEDIAN_WINDOW,
+    timestamp_col: str | None = None
+):
+    """
+    Replace -200 sensor failures and fill the gaps.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Raw dataframe; to clean chunks of one series (e.g. from
+        iter_raw_air_quality_chunks) use ChunkedImputer
+    strategy : str, optional
+        median | rolling_median | ffill | interpolate
+    stats : dict | None
+        Statistics from fit_imputer. At inference, pass the statistics
+        fitted on the training window so new data is filled the same way;
+        if None they are fitted on the leading training window of df.
+    max_gap, window, timestamp_col
+        See apply_imputer
+
+    Returns
+    -------
+    pd.DataFrame
+    """
+    if stats is None:
+        stats = fit_imputer(df)
 
+    return apply_imputer(
+        df,
+        stats,
+        strategy=strategy,
+        max_gap=max_gap,
+        window=window,
+        timestamp_col=timestamp_col
+    )
@@ -1,24 +1,160 @@
 
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
-from config.setting import RAW_DATA_FILE
+from config.setting import (
+    RAW_DATA_FILE,
+    REQUIRED_COLUMNS,
+    CHUNK_SIZE_ROWS,
+    MAX_CHUNK_MEMORY_MB
+)
+from exceptions.custom_exceptions import (
+    DataNotFoundError,
+    DataValidationError
+)
+from preprocessing.timestamps import (
+    MISSING_EPOCH,
+    build_epoch_timestamps,
+    detect_date_format
+)
+from utils.instrumentation import instrumented
+
+
+# Rough per-row cost of the Date/Time string objects held while parsing
+_STRING_BYTES_PER_ROW = 160
 
 
-def load_raw_air_quality_data():
+@instrumented("load")
+def load_raw_air_quality_data(data_path=RAW_DATA_FILE):
     """
     Loads the raw Air Quality UCI dataset from the raw data directory.
 
+    Parameters
+    ----------
+    data_path : Path, optional
+        CSV file to load, by default RAW_DATA_FILE
+
     Returns
     -------
     df : pandas.DataFrame
         Raw dataset loaded from CSV.
     """
     df = pd.read_csv(
-        RAW_DATA_FILE,
+        data_path,
         sep=";",
         decimal=","
     )
     return df
 
+
+def _read_header(data_path):
+    """
+    Read only the header line and return the usable column names.
+    """
+    header = pd.read_csv(data_path, sep=";", decimal=",", nrows=0)
+    columns = [c for c in header.columns if not c.startswith("Unnamed")]
+
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    if missing:
+        raise DataValidationError(
+            f"{data_path} is missing required columns: {missing}"
+        )
+
+    return columns
+
+
+def _bounded_chunk_rows(n_numeric_columns, chunk_rows, max_memory_mb):
+    """
+    Shrink chunk_rows so one parsed chunk stays under max_memory_mb.
+    """
+    bytes_per_row = (
+        _STRING_BYTES_PER_ROW         # Date / Time strings during parsing
+        + 8                           # datetime64 Timestamp
+        + 4 * n_numeric_columns       # float32 sensor values
+    )
+    cap_rows = int(max_memory_mb * 1024 * 1024) // bytes_per_row
+
+    return max(1, min(chunk_rows, cap_rows))
+
+
+def iter_raw_air_quality_chunks(
+    data_path=RAW_DATA_FILE,
+    chunk_rows: int = CHUNK_SIZE_ROWS,
+    max_memory_mb: float = MAX_CHUNK_MEMORY_MB
+):
+    """
+    Stream an AirQualityUCI-format CSV as bounded-size, typed chunks.
+
+    Sensor columns are read as float32 and Date + Time are fused into a
+    single ``Timestamp`` column (datetime64) with build_epoch_timestamps,
+    using a Date format detected once on the first chunk. Chunks are
+    resampled and cleaned one at a time, with the same result as the
+    whole file, by HourlyAligner(timestamp_col="Timestamp", time_col=None)
+    followed by ChunkedImputer, which carry the open hour and the rows
+    their fill strategy still needs.
+
+    Parameters
+    ----------
+    data_path : Path, optional
+        CSV file to stream, by default RAW_DATA_FILE
+    chunk_rows : int, optional
+        Upper bound on rows per chunk
+    max_memory_mb : float, optional
+        Peak memory cap for one chunk while parsing; lowers chunk_rows
+        when needed
+
+    Yields
+    ------
+    chunk : pandas.DataFrame
+        Timestamp column followed by float32 sensor columns
+    """
+    data_path = Path(data_path)
+    if not data_path.exists():
+        raise DataNotFoundError(f"Raw data file not found: {data_path}")
+
+    columns = _read_header(data_path)
+    numeric_columns = [c for c in columns if c not in ("Date", "Time")]
+
+    dtypes = {c: np.float32 for c in numeric_columns}
+    dtypes["Date"] = str
+    dtypes["Time"] = str
+
+    rows_per_chunk = _bounded_chunk_rows(
+        len(numeric_columns), chunk_rows, max_memory_mb
+    )
+
+    reader = pd.read_csv(
+        data_path,
+        sep=";",
+        decimal=",",
+        usecols=columns,
+        dtype=dtypes,
+        chunksize=rows_per_chunk
+    )
+
+    date_format = None
+
+    with reader:
+        for chunk in reader:
+            # The UCI export pads the file with empty ";;;" rows
+            chunk = chunk.dropna(subset=["Date"])
+            if chunk.empty:
+                continue
+
+            if date_format is None:
+                date_format = detect_date_format(chunk["Date"])
+
+            epoch = build_epoch_timestamps(chunk["Date"], chunk["Time"], date_format)
+            timestamp = epoch.astype("datetime64[s]")
+            timestamp[epoch == MISSING_EPOCH] = np.datetime64("NaT")
+
+            out = chunk[numeric_columns]
+            out.insert(0, "Timestamp", timestamp)
+
+            yield out
+
+
 def inspect_raw_data(df):
     """
     Performs an initial inspection of the raw dataset.
@@ -36,5 +172,3 @@ def inspect_raw_data(df):
 
     print("\n🔹 Statistical summary:")
     print(df.describe())
-
-
@@ -0,0 +1,156 @@
+"""
+Live Record Sources
+
+This module reads sensor records as they arrive, one text line each:
+- stdin : lines piped into the process
+- pipe  : a named pipe (or any file) read until its writer closes it
+- tail  : a CSV such as the dataset in RAW_DATA_DIR, followed like
+          tail -f from its current end
+- tcp   : a local socket that gateways (or an MQTT bridge) connect to,
+          one connection at a time
+
+Lines are either AirQualityUCI rows (";" separated, "," decimals, in the
+column order of the last header line seen) or JSON objects, and are
+turned into dicts by RecordParser.
+"""
+
+import json
+import socket
+import sys
+import time
+from pathlib import Path
+
+from config.setting import (
+    STREAM_HOST,
+    STREAM_PORT,
+    STREAM_POLL_SECONDS
+)
+
+
+STREAM_SOURCES = ("stdin", "pipe", "tail", "tcp")
+
+
+def iter_stdin_lines():
+    yield from sys.stdin
+
+
+def iter_pipe_lines(path):
+    """
+    Lines of a named pipe, blocking until data arrives, until EOF.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        yield from f
+
+
+def iter_tailed_lines(path, poll_seconds: float = STREAM_POLL_SECONDS, from_start: bool = False):
+    """
+    Follow a growing text file.
+
+    The header line is always yielded first so the parser knows the
+    column order. Partial lines are held back until they are complete; a
+    truncated (rotated) file is read again from its start.
+    """
+    path = Path(path)
+    f = open(path, "r", encoding="utf-8")
+    try:
+        yield f.readline()
+        if not from_start:
+            f.seek(0, 2)
+
+        pending = ""
+        while True:
+            line = f.readline()
+            if line:
+                pending += line
+                if pending.endswith("\n"):
+                    yield pending
+                    pending = ""
+                continue
+
+            if path.stat().st_size < f.tell():
+                f.close()
+                f = open(path, "r", encoding="utf-8")
+                yield f.readline()
+                pending = ""
+                continue
+
+            time.sleep(poll_seconds)
+    finally:
+        f.close()
+
+
+def iter_tcp_lines(host: str = STREAM_HOST, port: int = STREAM_PORT):
+    """
+    Lines sent by clients of a local TCP socket, one connection at a time.
+    """
+    with socket.create_server((host, port)) as server:
+        print(f" Listening for records on tcp://{host}:{port}", file=sys.stderr)
+        while True:
+            conn, _ = server.accept()
+            with conn, conn.makefile("r", encoding="utf-8") as f:
+                yield from f
+
+
+def iter_source_lines(
+    source: str,
+    path=None,
+    host: str = STREAM_HOST,
+    port: int = STREAM_PORT,
+    poll_seconds: float = STREAM_POLL_SECONDS
+):
+    """
+    Line iterator of one of STREAM_SOURCES.
+    """
+    if source == "stdin":
+        return iter_stdin_lines()
+    if source == "pipe":
+        return iter_pipe_lines(path)
+    if source == "tail":
+        return iter_tailed_lines(path, poll_seconds)
+    if source == "tcp":
+        return iter_tcp_lines(host, port)
+
+    raise ValueError(f"Unknown stream source '{source}'. Use one of {STREAM_SOURCES}")
+
+
+class RecordParser:
+    """
+    Turns source lines into {column: value} dicts.
+
+    Parameters
+    ----------
+    columns : list | None
+        Column order of ";" separated lines until a header line is seen
+    """
+
+    def __init__(self, columns=None):
+        self.columns = list(columns) if columns is not None else None
+
+    def __call__(self, line: str):
+        """
+        Parsed record, or None for blank, header and padding lines
+        (e.g. the ";;;;;" rows of the UCI file) without a Date.
+        """
+        line = line.strip()
+        if not line:
+            return None
+
+        if line.startswith("{"):
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError(f"Expected a JSON object, got {type(record).__name__}")
+            return record if record.get("Date") else None
+
+        fields = line.split(";")
+        if fields[0] == "Date":
+            self.columns = [name for name in fields if name]
+            return None
+        if self.columns is None:
+            raise ValueError("Received a ';' separated record before any header line")
+
+        record = {
+            name: value.replace(",", ".")
+            for name, value in zip(self.columns, fields)
+        }
+
+        return record if record.get("Date") else None
@@ -4,13 +4,163 @@ import numpy as np
 import pandas as pd
 from pathlib import Path
 
+from config.setting import CHUNK_SIZE_ROWS, SENSOR_FAILURE_VALUE
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - Parquet output is optional
+    pa = None
+    pq = None
+
+
+SENSOR_COLUMNS = [
+    "CO(GT)",
+    "NMHC(GT)",
+    "C6H6(GT)",
+    "NOx(GT)",
+    "NO2(GT)",
+    "T",
+    "RH",
+    "AH"
+]
+
+# Per column: level, sin amplitude, cos amplitude, noise std
+# (AH is derived from T and RH, its level / amplitudes are unused)
+_SIGNAL = np.array([
+    [2.0,    0.5,   0.0,  0.2],    # CO(GT)
+    [150.0,  0.0,  30.0, 10.0],    # NMHC(GT)
+    [5.0,    2.0,   0.0,  0.3],    # C6H6(GT)
+    [200.0, 40.0,   0.0, 15.0],    # NOx(GT)
+    [100.0,  0.0,  30.0, 10.0],    # NO2(GT)
+    [15.0,  10.0,   0.0,  0.5],    # T
+    [60.0, -15.0,   0.0,  2.0],    # RH
+    [0.0,    0.0,   0.0,  0.01]    # AH
+])
+
+_T, _RH, _AH = 5, 6, 7
+
+
+def _format_timestamps(timestamps):
+    """
+    Date / Time strings, formatting each distinct day and time once.
+    """
+    days = timestamps.astype("datetime64[D]")
+    unique_days, day_codes = np.unique(days, return_inverse=True)
+    date = np.datetime_as_string(unique_days)[day_codes]
+
+    seconds = (timestamps - days).astype("timedelta64[s]").astype(np.int64)
+    unique_seconds, second_codes = np.unique(seconds, return_inverse=True)
+    unique_times = np.array([
+        f"{s // 3600:02d}:{s % 3600 // 60:02d}:{s % 60:02d}" for s in unique_seconds
+    ])
+    time = unique_times[second_codes]
+
+    return date, time
+
+
+def iter_synthetic_chunks(
+    start_date="2005-01-01",
+    periods=1000,
+    freq="h",
+    chunk_rows: int = CHUNK_SIZE_ROWS,
+    n_stations: int = 1,
+    station_correlation: float = 0.8,
+    sensor_failure_rate: float = 0.03,
+    seed: int | None = None
+):
+    """
+    Stream synthetic AirQualityUCI-format data, chunk by chunk.
+
+    Every chunk is generated as one block per station: the seasonal signal,
+    correlated noise and the sensor-failure mask are all computed with
+    array operations, never per row or per column.
+
+    Parameters
+    ----------
+    start_date : str
+        Start date
+    periods : int
+        Number of samples per station
+    freq : str
+        Fixed time frequency, e.g. "h"
+    chunk_rows : int, optional
+        Rows per station per chunk
+    n_stations : int, optional
+        Number of stations
+    station_correlation : float, optional
+        Share of noise variance common to all stations, in [0, 1]
+    sensor_failure_rate : float
+        Probability of sensor failure (-200 values)
+    seed : int | None
+        Seed for numpy.random.Generator; same seed and chunk_rows give
+        the same data
+
+    Yields
+    ------
+    station : int
+        Station index
+    df : pd.DataFrame
+        Next chunk of that station
+    """
+    rng = np.random.default_rng(seed)
+
+    step = pd.to_timedelta(pd.tseries.frequencies.to_offset(freq)).to_timedelta64()
+    start = np.datetime64(pd.Timestamp(start_date).to_datetime64(), "s")
+
+    # Same sinusoid as the single-series generator: t spans 0..10
+    t_step = 10 / max(periods - 1, 1)
+
+    # Each station gets its own level, fixed for the whole run
+    station_levels = 1 + rng.normal(0, 0.05, (n_stations, len(SENSOR_COLUMNS)))
+
+    shared_weight = np.sqrt(station_correlation)
+    own_weight = np.sqrt(1 - station_correlation)
+
+    for chunk_start in range(0, periods, chunk_rows):
+        n_rows = min(chunk_rows, periods - chunk_start)
+        index = np.arange(chunk_start, chunk_start + n_rows)
+
+        timestamps = start + index * step
+        date, time = _format_timestamps(timestamps)
+
+        t = index * t_step
+        signal = (
+            _SIGNAL[:, 0]
+            + np.outer(np.sin(t), _SIGNAL[:, 1])
+            + np.outer(np.cos(t), _SIGNAL[:, 2])
+        )
+
+        # Noise common to every station in this chunk
+        shared_noise = rng.standard_normal((n_rows, len(SENSOR_COLUMNS)))
+
+        for station in range(n_stations):
+            noise = shared_weight * shared_noise + own_weight * rng.standard_normal(shared_noise.shape)
+            block = signal * station_levels[station] + noise * _SIGNAL[:, 3]
+
+            block[:, _AH] = (
+                (block[:, _RH] / 100) * (block[:, _T] / 30)
+                + noise[:, _AH] * _SIGNAL[_AH, 3]
+            )
+
+            # Sensor failures (-200) over the whole block at once
+            failures = rng.random(block.shape) < sensor_failure_rate
+            block[failures] = SENSOR_FAILURE_VALUE
+
+            df = pd.DataFrame(block, columns=SENSOR_COLUMNS, copy=False)
+            df.insert(0, "Time", time)
+            df.insert(0, "Date", date)
+
+            yield station, df
+
 
 def generate_synthetic_air_quality_data(
     start_date="2005-01-01",
     periods=1000,
-    freq="H",
+    freq="h",
     save_path: Path | None = None,
-    sensor_failure_rate: float = 0.03
+    sensor_failure_rate: float = 0.03,
+    seed: int | None = None
 ) -> pd.DataFrame:
     """
     Generate synthetic air quality dataset similar to AirQualityUCI.
@@ -27,53 +177,99 @@ def generate_synthetic_air_quality_data(
         Save CSV if provided
     sensor_failure_rate : float
         Probability of sensor failure (-200 values)
+    seed : int | None
+        Seed for reproducible output
 
     Returns
     -------
     df : pd.DataFrame
     """
+    _, df = next(iter_synthetic_chunks(
+        start_date=start_date,
+        periods=periods,
+        freq=freq,
+        chunk_rows=periods,
+        sensor_failure_rate=sensor_failure_rate,
+        seed=seed
+    ))
 
-    # 1- Time
-    timestamps = pd.date_range(start=start_date, periods=periods, freq=freq)
-
-    date = timestamps.date.astype(str)
-    time = timestamps.time.astype(str)
-
-    t = np.linspace(0, 10, periods)
-
-    # 2- Environmental variables
-    T = 15 + 10 * np.sin(t) + np.random.normal(0, 0.5, periods)
-    RH = 60 - 15 * np.sin(t) + np.random.normal(0, 2, periods)
-    AH = (RH / 100) * (T / 30) + np.random.normal(0, 0.01, periods)
-
-    # 3- Pollutants (correlated)
-    CO = 2 + 0.5 * np.sin(t) + np.random.normal(0, 0.2, periods)
-    NMHC = 150 + 30 * np.cos(t) + np.random.normal(0, 10, periods)
-    C6H6 = 5 + 2 * np.sin(t) + np.random.normal(0, 0.3, periods)
-    NOx = 200 + 40 * np.sin(t) + np.random.normal(0, 15, periods)
-    NO2 = 100 + 30 * np.cos(t) + np.random.normal(0, 10, periods)
-
-    df = pd.DataFrame({
-        "Date": date,
-        "Time": time,
-        "CO(GT)": CO,
-        "NMHC(GT)": NMHC,
-        "C6H6(GT)": C6H6,
-        "NOx(GT)": NOx,
-        "NO2(GT)": NO2,
-        "T": T,
-        "RH": RH,
-        "AH": AH
-    })
-
-    # 4- Sensor failures (-200)
-    for col in df.columns[2:]:
-        mask = np.random.rand(periods) < sensor_failure_rate
-        df.loc[mask, col] = -200
-
-    # 5- Save
     if save_path:
         save_path.parent.mkdir(parents=True, exist_ok=True)
         df.to_csv(save_path, sep=";", decimal=",", index=False)
 
     return df
+
+
+def write_synthetic_shards(
+    output_dir: Path,
+    n_stations: int = 1,
+    periods: int = 1000,
+    file_format: str = "csv",
+    chunk_rows: int = CHUNK_SIZE_ROWS,
+    **kwargs
+) -> list:
+    """
+    Write synthetic station files chunk by chunk, never holding a full series.
+
+    One file per station (station_000.csv, ...), in the AirQualityUCI CSV
+    layout so they can be read by the loaders and the multi-station mode,
+    or as Parquet with one row group per chunk.
+
+    Parameters
+    ----------
+    output_dir : Path
+        Target directory
+    n_stations : int, optional
+        Number of stations
+    periods : int, optional
+        Rows per station
+    file_format : str, optional
+        "csv" or "parquet"
+    chunk_rows : int, optional
+        Rows per station held in memory at a time
+    **kwargs
+        Forwarded to iter_synthetic_chunks (start_date, freq, seed, ...)
+
+    Returns
+    -------
+    list
+        Paths of the written files
+    """
+    if file_format not in ("csv", "parquet"):
+        raise ValueError(f"Unknown file format '{file_format}'")
+    if file_format == "parquet" and pq is None:
+        raise ImportError("pyarrow is required for Parquet output")
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    paths = [output_dir / f"station_{i:03d}.{file_format}" for i in range(n_stations)]
+    writers = {}
+    written = set()
+
+    try:
+        for station, df in iter_synthetic_chunks(
+            periods=periods, n_stations=n_stations, chunk_rows=chunk_rows, **kwargs
+        ):
+            path = paths[station]
+
+            if file_format == "csv":
+                df.to_csv(
+                    path,
+                    sep=";",
+                    decimal=",",
+                    index=False,
+                    mode="a" if station in written else "w",
+                    header=station not in written
+                )
+                written.add(station)
+            else:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if station not in writers:
+                    writers[station] = pq.ParquetWriter(path, table.schema)
+                writers[station].write_table(table)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    return paths
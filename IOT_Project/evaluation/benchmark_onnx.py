@@ -0,0 +1,114 @@
+"""
+ONNX Inference Benchmark
+
+Compares the two inference paths on the same model and data:
+- current : ZipMap export + predict_with_onnx (+ positive_class_probability)
+- iobinding : zipmap=False export + OnnxPredictor (IO binding, reused buffers)
+
+Run with:  python -m evaluation.benchmark_onnx
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from models.export_onnx import export_model_to_onnx
+from evaluation.onnx_inference import (
+    OnnxPredictor,
+    load_onnx_model,
+    predict_with_onnx,
+    positive_class_probability
+)
+
+
+def _rows_per_second(fn, X, batch_size, min_seconds):
+    """
+    Throughput of fn over X in batches, repeated for at least min_seconds.
+    """
+    batches = [X[i:i + batch_size] for i in range(0, len(X), batch_size)]
+    fn(batches[0])  # warm-up
+
+    rows = 0
+    start = time.perf_counter()
+    while True:
+        for batch in batches:
+            fn(batch)
+            rows += len(batch)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return rows / elapsed
+
+
+def benchmark_inference(model, X, batch_sizes=(1, 64, 1024), min_seconds=1.0):
+    """
+    Rows/second of both inference paths for several batch sizes.
+
+    Parameters
+    ----------
+    model : sklearn model
+        Trained classifier
+    X : numpy.ndarray | pandas.DataFrame
+        Input rows (used repeatedly)
+    batch_sizes : tuple, optional
+        Batch sizes to measure
+    min_seconds : float, optional
+        Minimum measuring time per configuration
+
+    Returns
+    -------
+    list of dict
+        One entry per batch size with both throughputs and the speed-up
+    """
+    X = np.asarray(X)
+    X_float32 = np.ascontiguousarray(X, dtype=np.float32)
+    n_features = X.shape[1]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        zipmap_path = Path(tmp) / "zipmap.onnx"
+        plain_path = Path(tmp) / "plain.onnx"
+        export_model_to_onnx(model, n_features, zipmap_path, zipmap=True)
+        export_model_to_onnx(model, n_features, plain_path, zipmap=False)
+
+        zipmap_session = load_onnx_model(zipmap_path)
+        predictor = OnnxPredictor(load_onnx_model(plain_path), max_batch_size=max(batch_sizes))
+
+    # Both paths must agree before timing them
+    expected = positive_class_probability(predict_with_onnx(zipmap_session, X[:256]))
+    actual = predictor.predict_positive(X_float32[:256])
+    if not np.allclose(expected, actual, atol=1e-5):
+        raise AssertionError("ZipMap and IO-binding outputs differ")
+
+    def current(batch):
+        return positive_class_probability(predict_with_onnx(zipmap_session, batch))
+
+    def iobinding(batch):
+        return predictor.predict_proba(batch)
+
+    results = []
+    for batch_size in batch_sizes:
+        current_rps = _rows_per_second(current, X, batch_size, min_seconds)
+        iobinding_rps = _rows_per_second(iobinding, X_float32, batch_size, min_seconds)
+        results.append({
+            "batch_size": batch_size,
+            "current_rows_per_s": current_rps,
+            "iobinding_rows_per_s": iobinding_rps,
+            "speedup": iobinding_rps / current_rps
+        })
+
+    print(f"{'batch':>6} {'current rows/s':>16} {'iobinding rows/s':>18} {'speed-up':>9}")
+    for r in results:
+        print(
+            f"{r['batch_size']:>6} {r['current_rows_per_s']:>16,.0f} "
+            f"{r['iobinding_rows_per_s']:>18,.0f} {r['speedup']:>8.2f}x"
+        )
+
+    return results
+
+
+if __name__ == "__main__":
+    from models.train_model import train_from_feature_store
+
+    model, X_train, X_test, *_ = train_from_feature_store()
+    benchmark_inference(model, X_test)
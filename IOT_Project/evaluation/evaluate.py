@@ -1,10 +1,27 @@
+from config.setting import REPORT_MODE
 from evaluation.metrics import evaluate_classification
 from evaluation.plots import plot_roc_curve, plot_confusion_matrix
+from utils.instrumentation import instrumented
 
-def run_evaluation(y_test, y_pred, y_prob):
+@instrumented("evaluate")
+def run_evaluation(y_test, y_pred, y_prob, mode=REPORT_MODE, name="model", feature_names=None, importances=None):
     metrics = evaluate_classification(y_test, y_pred, y_prob)
 
+    if mode == "headless":
+        # Agg files + index under REPORTS_DIR, nothing through pyplot
+        from evaluation.reporting import render_reports
+
+        render_reports({name: {
+            "y_true": y_test,
+            "y_pred": y_pred,
+            "y_prob": y_prob,
+            "feature_names": feature_names,
+            "importances": importances,
+            "metrics": metrics
+        }})
+        return metrics
+
     plot_roc_curve(y_test, y_prob)
-    plot_confusion_matrix(y_test, y_pred)
+    plot_confusion_matrix(cm=metrics["confusion_matrix"])
     
     return metrics
@@ -2,10 +2,14 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 
-def plot_feature_importance(model, feature_names, save_path=None):
+def plot_feature_importance(model, feature_names, save_path=None, importances=None):
+    # importances: precomputed values (e.g. permutation importance) in feature_names order
+    if importances is None:
+        importances = model.feature_importances_
+
     importance_df = pd.DataFrame({
         "feature": feature_names,
-        "importance": model.feature_importances_
+        "importance": importances
     }).sort_values(by="importance", ascending=False)
 
     plt.figure(figsize=(10, 6))
@@ -0,0 +1,366 @@
+"""
+Feature Importance
+
+This module computes the importances plotted after evaluation:
+- permutation_importance : drop in score when one feature column is
+  shuffled, the measure to trust for correlated or high-cardinality
+  features such as hour
+- tree_importances : impurity importances of a fitted tree ensemble
+
+Permutation importance is made cheap enough for 100-tree forests:
+- The test set is optionally subsampled to PERMUTATION_MAX_ROWS rows
+- Several features are shuffled at once into a stacked copy of X and
+  scored in a single predict call (PERMUTATION_BATCH_MB per batch); only
+  the shuffled column is rewritten between batches
+- Repeats run in parallel worker processes over one read-only
+  memory-mapped X, with tree / ORT threads bounded per worker
+- Scores come from the fitted model or an ONNX Runtime session
+- Results are cached as JSON in IMPORTANCE_CACHE_DIR, keyed by the
+  model hash, the test data and the settings
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from threadpoolctl import threadpool_limits
+
+from config.setting import (
+    RANDOM_STATE,
+    MAX_WORKERS,
+    PERMUTATION_SCORING,
+    PERMUTATION_REPEATS,
+    PERMUTATION_MAX_ROWS,
+    PERMUTATION_BATCH_MB,
+    IMPORTANCE_CACHE_DIR
+)
+from evaluation.metrics import METRIC_NAMES, roc_auc, confusion_by_group, metrics_from_confusion
+
+
+SCORINGS = ["roc_auc"] + METRIC_NAMES
+
+# Worker state set by _init_worker: (predict, X, y)
+_WORKER = None
+
+
+def model_hash(model) -> str:
+    """
+    Hash of a fitted model, or of an ONNX file when given a path.
+
+    Tree forests are hashed on their trees only (see
+    models.incremental.model_fingerprint), so settings such as n_jobs do
+    not change it; other models are hashed on their pickle.
+    """
+    if isinstance(model, (str, Path)):
+        return hashlib.sha256(Path(model).read_bytes()).hexdigest()
+
+    from models.incremental import model_fingerprint
+
+    try:
+        return model_fingerprint(model)
+    except AttributeError:
+        return hashlib.sha256(pickle.dumps(model)).hexdigest()
+
+
+def _cache_path(cache_dir, kind: str, key: dict) -> Path:
+    digest = hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return Path(cache_dir) / f"{kind}-{digest}.json"
+
+
+def _load_cached(path: Path):
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_cached(path: Path, result: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+
+
+def _importance_frame(feature_names, values, std=None) -> pd.DataFrame:
+    frame = pd.DataFrame({"feature": list(feature_names), "importance": values})
+    if std is not None:
+        frame["std"] = std
+
+    return frame.sort_values(by="importance", ascending=False).reset_index(drop=True)
+
+
+def tree_importances(model, feature_names, cache_dir: Path | None = IMPORTANCE_CACHE_DIR) -> pd.DataFrame:
+    """
+    Impurity importances of a fitted tree ensemble, cached per model hash.
+
+    feature_importances_ of a forest is recomputed from every tree on
+    each access, so it is read once per model and stored.
+
+    Returns
+    -------
+    pd.DataFrame
+        feature, importance; most important first
+    """
+    path = None
+    if cache_dir is not None:
+        path = _cache_path(cache_dir, "tree", {"model": model_hash(model)})
+        cached = _load_cached(path)
+        if cached is not None:
+            return _importance_frame(cached["features"], cached["importances"])
+
+    values = np.asarray(model.feature_importances_, dtype=float)
+    if path is not None:
+        _save_cached(path, {"features": list(map(str, feature_names)), "importances": values.tolist()})
+
+    return _importance_frame(feature_names, values)
+
+
+def _predictor(model, n_threads: int | None = None):
+    """
+    Positive-class probability function of a fitted model or an ONNX file.
+
+    n_threads bounds the model's n_jobs / ORT threads; None keeps the
+    model's own setting.
+    """
+    if isinstance(model, (str, Path)):
+        from evaluation.onnx_inference import (
+            load_onnx_model,
+            predict_with_onnx,
+            positive_class_probability,
+            OnnxPredictor
+        )
+
+        session = load_onnx_model(model, intra_op_threads=n_threads, inter_op_threads=1)
+        try:
+            return OnnxPredictor(session, max_batch_size=65_536).predict_positive
+        except ValueError:
+            # ZipMap output, no IO binding
+            return lambda X: positive_class_probability(predict_with_onnx(session, X))
+
+    if n_threads is not None and "n_jobs" in model.get_params():
+        model.set_params(n_jobs=n_threads)
+
+    return lambda X: model.predict_proba(X)[:, 1]
+
+
+def _score(scoring: str, y, y_prob, n_blocks: int = 1) -> np.ndarray:
+    """
+    Scores of n_blocks stacked predictions of the same y.
+    """
+    n_rows = len(y)
+    if scoring == "roc_auc":
+        return np.array([roc_auc(y, y_prob[k * n_rows:(k + 1) * n_rows]) for k in range(n_blocks)])
+
+    # One bincount for all blocks
+    cm = confusion_by_group(
+        np.repeat(np.arange(n_blocks), n_rows),
+        np.tile(y, n_blocks),
+        (y_prob >= 0.5).astype(np.intp),
+        n_blocks
+    )
+
+    return metrics_from_confusion(cm)[scoring]
+
+
+def _permuted_scores(predict, X, y, repeat: int, seed: int, scoring: str, batch_size: int) -> np.ndarray:
+    """
+    Score of every feature shuffled once, batch_size features per predict call.
+    """
+    n_rows, n_features = X.shape
+    batch_size = max(1, min(batch_size, n_features))
+
+    # Seeded per repeat and drawn in feature order, so results do not
+    # depend on the batch size or on which worker runs the repeat
+    rng = np.random.default_rng([seed, repeat])
+    permutations = [rng.permutation(n_rows) for _ in range(n_features)]
+
+    stacked = np.tile(X, (batch_size, 1))
+    scores = np.empty(n_features)
+
+    for start in range(0, n_features, batch_size):
+        features = range(start, min(start + batch_size, n_features))
+        for k, feature in enumerate(features):
+            stacked[k * n_rows:(k + 1) * n_rows, feature] = X[permutations[feature], feature]
+
+        n_blocks = len(features)
+        y_prob = predict(stacked[:n_blocks * n_rows])
+        scores[start:start + n_blocks] = _score(scoring, y, y_prob, n_blocks)
+
+        # Restore the shuffled columns for the next batch
+        for k, feature in enumerate(features):
+            stacked[k * n_rows:(k + 1) * n_rows, feature] = X[:, feature]
+
+    return scores
+
+
+def _init_worker(model, X_path, y_path, n_threads: int):
+    global _WORKER
+
+    threadpool_limits(n_threads)
+    _WORKER = (
+        _predictor(model, n_threads),
+        np.load(X_path, mmap_mode="r"),
+        np.load(y_path, mmap_mode="r")
+    )
+
+
+def _run_repeat(repeat: int, seed: int, scoring: str, batch_size: int) -> np.ndarray:
+    predict, X, y = _WORKER
+    return _permuted_scores(predict, X, np.asarray(y), repeat, seed, scoring, batch_size)
+
+
+def permutation_importance(
+    model,
+    X,
+    y,
+    feature_names=None,
+    scoring: str = PERMUTATION_SCORING,
+    n_repeats: int = PERMUTATION_REPEATS,
+    max_rows: int | None = PERMUTATION_MAX_ROWS,
+    batch_mb: float = PERMUTATION_BATCH_MB,
+    max_workers: int | None = MAX_WORKERS,
+    random_state: int = RANDOM_STATE,
+    cache_dir: Path | None = IMPORTANCE_CACHE_DIR
+) -> pd.DataFrame:
+    """
+    Permutation importance of every feature on a test set.
+
+    Parameters
+    ----------
+    model : fitted classifier | str | Path
+        Model with predict_proba, or the path of an ONNX model exported
+        with zipmap=False to score with ONNX Runtime
+    X : pd.DataFrame | numpy.ndarray
+        Test features
+    y : pd.Series | numpy.ndarray
+        Test labels
+    feature_names : list | None
+        Defaults to the columns of X
+    scoring : str, optional
+        One of SCORINGS
+    n_repeats : int, optional
+        Shuffles per feature; importances are averaged over them
+    max_rows : int | None, optional
+        Random subsample of the test rows; None uses all
+    batch_mb : float, optional
+        Size of the stacked permuted copies scored per predict call
+    max_workers : int | None, optional
+        Total core budget shared by the parallel repeats
+    random_state : int, optional
+        Seed of the subsample and the shuffles
+    cache_dir : Path | None, optional
+        Result cache; None to always recompute
+
+    Returns
+    -------
+    pd.DataFrame
+        feature, importance (mean score drop), std; most important first
+    """
+    if scoring not in SCORINGS:
+        raise ValueError(f"Unknown scoring '{scoring}'. Use one of {SCORINGS}")
+
+    if feature_names is None:
+        feature_names = list(X.columns) if hasattr(X, "columns") else [f"f{i}" for i in range(X.shape[1])]
+    feature_names = list(map(str, feature_names))
+
+    X = np.ascontiguousarray(np.asarray(X, dtype=np.float32))
+    y = np.asarray(y, dtype=np.int8)
+
+    if max_rows is not None and len(X) > max_rows:
+        rows = np.sort(np.random.default_rng(random_state).choice(len(X), max_rows, replace=False))
+        X, y = X[rows], y[rows]
+
+    settings = {
+        "scoring": scoring,
+        "n_repeats": n_repeats,
+        "max_rows": max_rows,
+        "random_state": random_state
+    }
+
+    path = None
+    if cache_dir is not None:
+        path = _cache_path(cache_dir, "permutation", {
+            "model": model_hash(model),
+            "data": hashlib.sha256(X.tobytes() + y.tobytes()).hexdigest(),
+            "features": feature_names,
+            **settings
+        })
+        cached = _load_cached(path)
+        if cached is not None:
+            print(f" Permutation importance loaded from cache: {path.name}")
+            return _importance_frame(cached["features"], cached["importances_mean"], cached["importances_std"])
+
+    # Repeats in parallel; the rest of the core budget goes to each predict call
+    n_cores = max_workers or os.cpu_count()
+    n_workers = max(1, min(n_repeats, n_cores))
+    n_threads = max(1, n_cores // n_workers)
+    batch_size = max(1, int(batch_mb * 1024 * 1024 // X.nbytes))
+
+    print(
+        f" Permutation importance: {len(feature_names)} features x {n_repeats} repeats "
+        f"on {len(X)} rows, {n_workers} workers x {n_threads} threads"
+    )
+
+    if n_workers == 1:
+        predict = _predictor(model)
+        permuted = [
+            _permuted_scores(predict, X, y, repeat, random_state, scoring, batch_size)
+            for repeat in range(n_repeats)
+        ]
+    else:
+        # X / y are memory-mapped read-only by every worker, and each worker
+        # bounds the n_jobs of its own copy of the model
+        with tempfile.TemporaryDirectory() as tmp:
+            X_path = Path(tmp) / "X.npy"
+            y_path = Path(tmp) / "y.npy"
+            np.save(X_path, X)
+            np.save(y_path, y)
+
+            with ProcessPoolExecutor(
+                max_workers=n_workers,
+                initializer=_init_worker,
+                initargs=(model, X_path, y_path, n_threads)
+            ) as pool:
+                permuted = list(pool.map(
+                    _run_repeat,
+                    range(n_repeats),
+                    [random_state] * n_repeats,
+                    [scoring] * n_repeats,
+                    [batch_size] * n_repeats
+                ))
+
+        predict = _predictor(model)
+
+    baseline = float(_score(scoring, y, predict(X))[0])
+
+    # (n_features, n_repeats) score drops
+    importances = baseline - np.column_stack(permuted)
+
+    result = {
+        **settings,
+        "baseline_score": baseline,
+        "n_rows": len(X),
+        "features": feature_names,
+        "importances_mean": importances.mean(axis=1).tolist(),
+        "importances_std": importances.std(axis=1).tolist(),
+        "importances": importances.tolist()
+    }
+    if path is not None:
+        _save_cached(path, result)
+
+    return _importance_frame(feature_names, result["importances_mean"], result["importances_std"])
+
+
+if __name__ == "__main__":
+    from config.setting import ONNX_MODEL_PATH, TRAIN_TEST_SPLIT_RATIO
+    from preprocessing.feature_store import load_feature_store
+
+    X, y, _ = load_feature_store()
+    split_index = int(len(X) * TRAIN_TEST_SPLIT_RATIO)
+
+    print(permutation_importance(ONNX_MODEL_PATH, X.iloc[split_index:], y.iloc[split_index:]).to_string())
@@ -0,0 +1,343 @@
+"""
+ONNX Inference Server
+
+Small asyncio HTTP server (TCP or Unix socket) around one warm
+ONNX Runtime session:
+- Concurrent requests are coalesced into micro-batches, waiting at most
+  INFERENCE_BATCH_LATENCY_MS for others to join
+- Rows are copied straight into a preallocated float32 buffer
+- Session threads are fixed by ORT_INTRA_OP_THREADS / ORT_INTER_OP_THREADS
+
+Endpoints:
+- POST /predict  {"features": [...]} or {"instances": [[...], ...]}
+- GET  /stats    request latency p50 / p99 and batch statistics
+
+Run with:  python -m evaluation.inference_server
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+
+import numpy as np
+
+from config.setting import (
+    ONNX_MODEL_PATH,
+    ORT_INTRA_OP_THREADS,
+    ORT_INTER_OP_THREADS,
+    INFERENCE_HOST,
+    INFERENCE_PORT,
+    INFERENCE_SOCKET_PATH,
+    INFERENCE_MAX_BATCH_SIZE,
+    INFERENCE_BATCH_LATENCY_MS
+)
+from evaluation.onnx_inference import load_onnx_model, positive_class_probability
+
+
+# Number of recent requests kept for latency percentiles
+LATENCY_HISTORY = 10_000
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent prediction requests into batched session runs.
+
+    Parameters
+    ----------
+    ort_session : onnxruntime.InferenceSession
+        Warm session, reused for every batch
+    max_batch_size : int, optional
+        Rows per session run
+    latency_budget_ms : float, optional
+        Longest the first request of a batch waits for more requests
+    """
+
+    def __init__(
+        self,
+        ort_session,
+        max_batch_size: int = INFERENCE_MAX_BATCH_SIZE,
+        latency_budget_ms: float = INFERENCE_BATCH_LATENCY_MS
+    ):
+        self.session = ort_session
+        self.input_name = ort_session.get_inputs()[0].name
+        self.n_features = ort_session.get_inputs()[0].shape[1]
+        self.max_batch_size = max_batch_size
+        self.latency_budget = latency_budget_ms / 1000
+
+        self._buffer = np.empty((max_batch_size, self.n_features), dtype=np.float32)
+        self._queue = asyncio.Queue()
+        self._worker = None
+        self._pending = set()
+        self._stopped = False
+
+        self.latencies = deque(maxlen=LATENCY_HISTORY)
+        self.n_requests = 0
+        self.n_failed = 0
+        self.n_batches = 0
+        self.n_rows = 0
+
+    def start(self):
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        self._stopped = True
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+        # Queued or in-flight requests would otherwise wait forever
+        for future in list(self._pending):
+            if not future.done():
+                future.set_exception(RuntimeError("MicroBatcher stopped"))
+                self.n_failed += 1
+        self._pending.clear()
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+    async def predict(self, rows) -> np.ndarray:
+        """
+        Queue rows (n_rows, n_features) and wait for their probabilities.
+        """
+        if self._stopped:
+            raise RuntimeError("MicroBatcher stopped")
+
+        rows = np.asarray(rows, dtype=np.float32).reshape(-1, self.n_features)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        await self._queue.put((rows, future, time.perf_counter()))
+
+        return await future
+
+    def _run_session(self, X):
+        outputs = self.session.run(None, {self.input_name: X})
+        return positive_class_probability(outputs)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+            n_rows = len(batch[0][0])
+            deadline = loop.time() + self.latency_budget
+
+            # Fill the batch until it is full or the latency budget runs out
+            while n_rows < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if n_rows + len(item[0]) > self.max_batch_size:
+                    await self._flush(batch, n_rows)
+                    batch, n_rows = [], 0
+                batch.append(item)
+                n_rows += len(item[0])
+
+            await self._flush(batch, n_rows)
+
+    async def _flush(self, batch, n_rows):
+        if not batch:
+            return
+
+        if n_rows > self.max_batch_size:
+            # Oversized single request: run it on its own array
+            X = batch[0][0]
+        else:
+            X = self._buffer[:n_rows]
+            start = 0
+            for rows, _, _ in batch:
+                X[start:start + len(rows)] = rows
+                start += len(rows)
+
+        try:
+            probabilities = await asyncio.get_running_loop().run_in_executor(
+                None, self._run_session, X
+            )
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            self.n_failed += len(batch)
+            return
+
+        self.n_batches += 1
+        self.n_rows += n_rows
+
+        now = time.perf_counter()
+        start = 0
+        for rows, future, queued_at in batch:
+            if not future.done():
+                future.set_result(probabilities[start:start + len(rows)].copy())
+            start += len(rows)
+            self.latencies.append(now - queued_at)
+        self.n_requests += len(batch)
+
+    def stats(self) -> dict:
+        latencies_ms = np.array(self.latencies) * 1000
+
+        return {
+            "requests": self.n_requests,
+            "failed_requests": self.n_failed,
+            "batches": self.n_batches,
+            "mean_batch_rows": self.n_rows / self.n_batches if self.n_batches else 0.0,
+            "latency_p50_ms": float(np.percentile(latencies_ms, 50)) if len(latencies_ms) else None,
+            "latency_p99_ms": float(np.percentile(latencies_ms, 99)) if len(latencies_ms) else None
+        }
+
+
+async def _read_request(reader):
+    """
+    Parse one HTTP/1.1 request; returns (method, path, headers, body) or None.
+    """
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+
+    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length", 0))
+    body = await reader.readexactly(length) if length else b""
+
+    return method, path, headers, body
+
+
+def _response(status: str, payload: dict, keep_alive: bool) -> bytes:
+    body = json.dumps(payload).encode()
+    head = (
+        f"HTTP/1.1 {status}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+
+    return head.encode() + body
+
+
+def _parse_rows(payload, n_features: int) -> np.ndarray:
+    """
+    Rows (n_rows, n_features) of a /predict body; ValueError on a wrong width.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("Request body must be a JSON object")
+
+    if "instances" in payload:
+        rows = np.asarray(payload["instances"], dtype=np.float32)
+        if rows.ndim != 2 or rows.shape[1] != n_features:
+            raise ValueError(f"'instances' must be a list of rows of {n_features} features")
+    else:
+        rows = np.asarray(payload["features"], dtype=np.float32)
+        if rows.ndim != 1 or len(rows) != n_features:
+            raise ValueError(f"'features' must hold exactly {n_features} values")
+        rows = rows[None, :]
+
+    return rows
+
+
+def make_handler(batcher: MicroBatcher):
+    """
+    Connection handler for asyncio.start_server / start_unix_server.
+    """
+    async def handle(reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "keep-alive").lower() != "close"
+
+                if method == "POST" and path == "/predict":
+                    try:
+                        rows = _parse_rows(json.loads(body), batcher.n_features)
+                    except (KeyError, TypeError, ValueError) as e:
+                        rows = None
+                        response = _response("400 Bad Request", {"error": str(e)}, keep_alive)
+
+                    if rows is not None:
+                        try:
+                            probabilities = await batcher.predict(rows)
+                            response = _response("200 OK", {
+                                "probability": probabilities.tolist(),
+                                "label": (probabilities >= 0.5).astype(int).tolist()
+                            }, keep_alive)
+                        except Exception as e:
+                            # ONNX Runtime or other failures of a well-formed request
+                            response = _response(
+                                "500 Internal Server Error",
+                                {"error": f"{type(e).__name__}: {e}"},
+                                keep_alive
+                            )
+                elif method == "GET" and path == "/stats":
+                    response = _response("200 OK", batcher.stats(), keep_alive)
+                else:
+                    response = _response("404 Not Found", {"error": f"No route {method} {path}"}, keep_alive)
+
+                writer.write(response)
+                await writer.drain()
+
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return handle
+
+
+async def serve(
+    model_path=ONNX_MODEL_PATH,
+    host: str = INFERENCE_HOST,
+    port: int = INFERENCE_PORT,
+    socket_path: str | None = INFERENCE_SOCKET_PATH,
+    max_batch_size: int = INFERENCE_MAX_BATCH_SIZE,
+    latency_budget_ms: float = INFERENCE_BATCH_LATENCY_MS
+):
+    """
+    Load the model once and serve predictions until cancelled.
+    """
+    ort_session = load_onnx_model(
+        model_path,
+        intra_op_threads=ORT_INTRA_OP_THREADS,
+        inter_op_threads=ORT_INTER_OP_THREADS
+    )
+
+    batcher = MicroBatcher(ort_session, max_batch_size, latency_budget_ms)
+    batcher.start()
+
+    # Warm-up run so the first request does not pay for lazy initialisation
+    await batcher.predict(np.zeros((1, batcher.n_features), dtype=np.float32))
+
+    handler = make_handler(batcher)
+    if socket_path:
+        server = await asyncio.start_unix_server(handler, path=socket_path)
+        print(f"Inference server listening on unix:{socket_path}")
+    else:
+        server = await asyncio.start_server(handler, host=host, port=port)
+        print(f"Inference server listening on http://{host}:{port}")
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await batcher.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve())
@@ -1,22 +1,269 @@
-
 # evaluation/metrics.py
-from sklearn.metrics import (
-    accuracy_score,
-    precision_score,
-    recall_score,
-    f1_score,
-    roc_auc_score,
-    classification_report
-)
+"""
+Classification metrics from one confusion matrix.
+
+Every metric is derived from 2 x 2 confusion counts built with a single
+np.bincount, and ROC AUC from one sort of the scores, instead of
+rescanning y_true / y_pred per metric:
+- evaluate_classification : drop-in single-model metrics
+- ClassificationAccumulator : streaming totals over chunks or folds
+- confusion_by_group / confusion_by_threshold : many stations or
+  thresholds at once, as an (n, 2, 2) array for metrics_from_confusion
+"""
+
+import numpy as np
+
+
+METRIC_NAMES = ["accuracy", "precision", "recall", "f1_score"]
+
+# Score bins of the streaming ROC AUC estimate
+AUC_BINS = 10_000
+
+
+def _labels(y) -> np.ndarray:
+    y = np.asarray(y).ravel()
+    if y.dtype.kind not in "biu":
+        # Casting would truncate e.g. probabilities of 0.6 to 0
+        y = y.astype(np.float64)
+        if not np.all(np.mod(y, 1) == 0):
+            raise ValueError("Labels must be integers; pass probabilities as y_prob")
+        y = y.astype(np.int64)
+    if y.size and (y.min() < 0 or y.max() > 1):
+        raise ValueError("Only binary 0 / 1 labels are supported")
+
+    return y.astype(np.intp, copy=False)
+
+
+def confusion_counts(y_true, y_pred) -> np.ndarray:
+    """
+    2 x 2 confusion matrix [[tn, fp], [fn, tp]] in one bincount.
+    """
+    y_true = _labels(y_true)
+    y_pred = _labels(y_pred)
+    if len(y_true) != len(y_pred):
+        raise ValueError(f"y_true has {len(y_true)} rows, y_pred {len(y_pred)}")
+
+    return np.bincount(2 * y_true + y_pred, minlength=4).reshape(2, 2)
+
+
+def _divide(numerator, denominator):
+    # 0 where undefined, like sklearn's zero_division default
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    return np.divide(numerator, denominator, out=np.zeros(np.broadcast(numerator, denominator).shape),
+                     where=denominator > 0)
+
+
+def metrics_from_confusion(cm) -> dict:
+    """
+    Accuracy, precision, recall and F1 of the positive class.
+
+    Parameters
+    ----------
+    cm : array-like (..., 2, 2)
+        One confusion matrix or a stack of them
+
+    Returns
+    -------
+    dict
+        Metric name -> float, or array over the leading axes
+    """
+    cm = np.asarray(cm)
+    tn, fp = cm[..., 0, 0], cm[..., 0, 1]
+    fn, tp = cm[..., 1, 0], cm[..., 1, 1]
+
+    precision = _divide(tp, tp + fp)
+    recall = _divide(tp, tp + fn)
+
+    metrics = {
+        "accuracy": _divide(tp + tn, tp + tn + fp + fn),
+        "precision": precision,
+        "recall": recall,
+        "f1_score": _divide(2 * tp, 2 * tp + fp + fn)
+    }
+
+    if cm.ndim == 2:
+        metrics = {name: float(value) for name, value in metrics.items()}
+
+    return metrics
+
+
+def roc_points(y_true, y_prob):
+    """
+    ROC curve from one descending sort of the scores.
+
+    Returns
+    -------
+    fpr, tpr, thresholds : numpy.ndarray
+        One point per distinct score, starting at (0, 0)
+    """
+    y_true = _labels(y_true)
+    y_prob = np.asarray(y_prob, dtype=np.float64).ravel()
+
+    order = np.argsort(y_prob, kind="stable")[::-1]
+    scores = y_prob[order]
+    hits = y_true[order]
+
+    # Last index of every run of equal scores
+    ends = np.r_[np.flatnonzero(np.diff(scores)), len(scores) - 1]
+    tps = np.cumsum(hits)[ends]
+    fps = (ends + 1) - tps
+
+    n_pos, n_neg = tps[-1], fps[-1]
+    tpr = np.r_[0.0, _divide(tps, n_pos)]
+    fpr = np.r_[0.0, _divide(fps, n_neg)]
+    thresholds = np.r_[np.inf, scores[ends]]
+
+    return fpr, tpr, thresholds
+
+
+def roc_auc(y_true, y_prob) -> float:
+    """
+    Area under the ROC curve (ties count half, as in sklearn).
+    """
+    y_true = _labels(y_true)
+    if y_true.min() == y_true.max():
+        raise ValueError("ROC AUC is undefined when y_true holds a single class")
+
+    fpr, tpr, _ = roc_points(y_true, y_prob)
+
+    return float(np.trapezoid(tpr, fpr))
+
+
+def classification_report_from_confusion(cm, digits: int = 2) -> str:
+    """
+    Text report in the layout of sklearn's classification_report.
+    """
+    cm = np.asarray(cm)
+    support = cm.sum(axis=1)
+    predicted = cm.sum(axis=0)
+    correct = np.diag(cm)
+
+    precision = _divide(correct, predicted)
+    recall = _divide(correct, support)
+    # From the counts, as sklearn does: 2tp / (2tp + fp + fn)
+    f1 = _divide(2 * correct, support + predicted)
+    total = support.sum()
+
+    width = max(len("weighted avg"), digits)
+    head = f"{'':>{width}}  {'precision':>9} {'recall':>9} {'f1-score':>9} {'support':>9}\n\n"
+    row = "{:>{w}}  {:>9.{d}f} {:>9.{d}f} {:>9.{d}f} {:>9}\n"
+
+    report = head
+    for label in range(len(cm)):
+        report += row.format(label, precision[label], recall[label], f1[label], support[label], w=width, d=digits)
+    report += "\n"
+    report += f"{'accuracy':>{width}}  {'':>9} {'':>9} {correct.sum() / total:>9.{digits}f} {total:>9}\n"
+    report += row.format("macro avg", precision.mean(), recall.mean(), f1.mean(), total, w=width, d=digits)
+    weights = support / total
+    report += row.format(
+        "weighted avg", precision @ weights, recall @ weights, f1 @ weights, total, w=width, d=digits
+    )
+
+    return report
+
 
 def evaluate_classification(y_true, y_pred, y_prob):
+    cm = confusion_counts(y_true, y_pred)
+
     return {
-        "accuracy": accuracy_score(y_true, y_pred),
-        "precision": precision_score(y_true, y_pred),
-        "recall": recall_score(y_true, y_pred),
-        "f1_score": f1_score(y_true, y_pred),
-        "roc_auc": roc_auc_score(y_true, y_prob),
-        "classification_report": classification_report(y_true, y_pred)
+        **metrics_from_confusion(cm),
+        "roc_auc": roc_auc(y_true, y_prob),
+        "confusion_matrix": cm.tolist(),
+        "classification_report": classification_report_from_confusion(cm)
     }
 
 
+class ClassificationAccumulator:
+    """
+    Confusion counts and score histograms summed over chunks or folds.
+
+    ROC AUC is computed from per-class histograms of AUC_BINS score bins
+    over [0, 1], which is exact to about 1 / AUC_BINS.
+    """
+
+    def __init__(self, n_bins: int = AUC_BINS):
+        self.n_bins = n_bins
+        self.cm = np.zeros((2, 2), dtype=np.int64)
+        self.score_counts = np.zeros((2, n_bins), dtype=np.int64)
+
+    def update(self, y_true, y_pred, y_prob=None):
+        y_true = _labels(y_true)
+        self.cm += confusion_counts(y_true, y_pred)
+
+        if y_prob is not None:
+            bins = np.clip((np.asarray(y_prob).ravel() * self.n_bins).astype(np.intp), 0, self.n_bins - 1)
+            self.score_counts += np.bincount(
+                y_true * self.n_bins + bins, minlength=2 * self.n_bins
+            ).reshape(2, self.n_bins)
+
+        return self
+
+    def merge(self, other: "ClassificationAccumulator"):
+        self.cm += other.cm
+        self.score_counts += other.score_counts
+        return self
+
+    def roc_auc(self) -> float:
+        negatives, positives = self.score_counts
+        n_neg, n_pos = negatives.sum(), positives.sum()
+        if n_neg == 0 or n_pos == 0:
+            return float("nan")
+
+        # Each positive beats the negatives in lower bins and ties half of its own bin
+        below = np.cumsum(negatives) - negatives
+        wins = positives @ (below + 0.5 * negatives)
+
+        return float(wins / (n_pos * n_neg))
+
+    def result(self) -> dict:
+        return {
+            **metrics_from_confusion(self.cm),
+            "roc_auc": self.roc_auc(),
+            "confusion_matrix": self.cm.tolist(),
+            "n_rows": int(self.cm.sum())
+        }
+
+
+def confusion_by_group(groups, y_true, y_pred, n_groups: int | None = None) -> np.ndarray:
+    """
+    One confusion matrix per group (e.g. station) in a single bincount.
+
+    Parameters
+    ----------
+    groups : array-like of int
+        Group index of every row, in [0, n_groups)
+
+    Returns
+    -------
+    numpy.ndarray (n_groups, 2, 2)
+    """
+    groups = np.asarray(groups).astype(np.intp, copy=False)
+    n_groups = n_groups or int(groups.max()) + 1
+
+    codes = 4 * groups + 2 * _labels(y_true) + _labels(y_pred)
+
+    return np.bincount(codes, minlength=4 * n_groups).reshape(n_groups, 2, 2)
+
+
+def confusion_by_threshold(y_true, y_prob, thresholds) -> np.ndarray:
+    """
+    Confusion matrices of y_prob >= t for every threshold t at once.
+
+    Returns
+    -------
+    numpy.ndarray (n_thresholds, 2, 2)
+    """
+    y_true = _labels(y_true)
+    y_prob = np.asarray(y_prob, dtype=np.float64).ravel()
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+
+    positive_scores = np.sort(y_prob[y_true == 1])
+    negative_scores = np.sort(y_prob[y_true == 0])
+
+    tp = len(positive_scores) - np.searchsorted(positive_scores, thresholds, side="left")
+    fp = len(negative_scores) - np.searchsorted(negative_scores, thresholds, side="left")
+    fn = len(positive_scores) - tp
+    tn = len(negative_scores) - fp
+
+    return np.stack([tn, fp, fn, tp], axis=-1).reshape(-1, 2, 2)
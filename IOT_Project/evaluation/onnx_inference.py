@@ -6,16 +6,32 @@ import numpy as np
 import onnxruntime as ort
 
 
-def load_onnx_model(onnx_path):
+def load_onnx_model(onnx_path, intra_op_threads=None, inter_op_threads=None):
     """
     Load ONNX model.
 
+    Parameters
+    ----------
+    onnx_path : str | Path
+        Path to the ONNX model
+    intra_op_threads : int | None, optional
+        Threads used inside one operator (ORT default if None)
+    inter_op_threads : int | None, optional
+        Threads used across independent operators (ORT default if None)
+
     Returns
     -------
     ort_session : onnxruntime.InferenceSession
     """
+    options = ort.SessionOptions()
+    if intra_op_threads is not None:
+        options.intra_op_num_threads = intra_op_threads
+    if inter_op_threads is not None:
+        options.inter_op_num_threads = inter_op_threads
+
     ort_session = ort.InferenceSession(
-        onnx_path,
+        str(onnx_path),
+        sess_options=options,
         providers=["CPUExecutionProvider"]
     )
     return ort_session
@@ -43,3 +59,149 @@ def predict_with_onnx(ort_session, X):
     )
 
     return predictions
+
+
+def positive_class_probability(predictions):
+    """
+    Probability of class 1 from the outputs of predict_with_onnx.
+
+    Handles both the ZipMap output (list of {class: probability} dicts)
+    and a plain (n_samples, n_classes) probability tensor.
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    probabilities = predictions[1]
+
+    if isinstance(probabilities, list):
+        return np.array([p[1] for p in probabilities], dtype=np.float32)
+
+    return np.asarray(probabilities)[:, 1]
+
+
+# Below this many rows, copying into the bound input buffer is cheaper
+# than binding the caller's array
+DIRECT_BINDING_MIN_ROWS = 256
+
+
+class OnnxPredictor:
+    """
+    Repeated ONNX inference with IO binding over reusable buffers.
+
+    Input and output arrays are bound to ONNX Runtime by pointer, so no
+    per-call allocation happens on either side. float32 C-contiguous input
+    above DIRECT_BINDING_MIN_ROWS rows is bound directly; anything else is
+    converted while being copied into the preallocated input buffer. Requires a model exported with
+    zipmap=False.
+
+    Parameters
+    ----------
+    ort_session : onnxruntime.InferenceSession
+        Session from load_onnx_model
+    max_batch_size : int, optional
+        Rows per session run; larger inputs are processed in slices
+    """
+
+    def __init__(self, ort_session, max_batch_size=4096):
+        self.session = ort_session
+        self.max_batch_size = max_batch_size
+
+        model_input = ort_session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.n_features = model_input.shape[1]
+
+        outputs = ort_session.get_outputs()
+        if len(outputs) != 2 or not outputs[1].type.startswith("tensor"):
+            raise ValueError(
+                "Model outputs are not plain tensors; re-export with zipmap=False"
+            )
+        self.label_name = outputs[0].name
+        self.probability_name = outputs[1].name
+        self.n_classes = outputs[1].shape[1] or 2
+
+        self._input = np.empty((max_batch_size, self.n_features), dtype=np.float32)
+        self._labels = np.empty(max_batch_size, dtype=np.int64)
+        self._probabilities = np.empty((max_batch_size, self.n_classes), dtype=np.float32)
+        self._binding = ort_session.io_binding()
+        self._bound = None
+
+    def _run(self, X, labels, probabilities):
+        binding = self._binding
+
+        # Re-binding costs more than a small run; skip it when the same
+        # buffers are used again (the common case for small batches)
+        key = (X.ctypes.data, probabilities.ctypes.data, len(X))
+        if key == self._bound:
+            self.session.run_with_iobinding(binding)
+            return
+
+        binding.bind_input(
+            self.input_name, "cpu", 0, np.float32, list(X.shape), X.ctypes.data
+        )
+        binding.bind_output(
+            self.label_name, "cpu", 0, np.int64, list(labels.shape), labels.ctypes.data
+        )
+        binding.bind_output(
+            self.probability_name, "cpu", 0, np.float32,
+            list(probabilities.shape), probabilities.ctypes.data
+        )
+        self.session.run_with_iobinding(binding)
+        self._bound = key
+
+    def predict_proba(self, X, out=None):
+        """
+        Class probabilities for X.
+
+        Parameters
+        ----------
+        X : numpy.ndarray | pandas.DataFrame
+            Input features (n_samples, n_features)
+        out : numpy.ndarray | None
+            Optional float32 array (n_samples, n_classes) to write into.
+            Without it, inputs of at most max_batch_size rows return a view
+            of the internal buffer that is overwritten by the next call.
+
+        Returns
+        -------
+        numpy.ndarray
+            float32 probabilities (n_samples, n_classes)
+        """
+        X = np.asarray(X)
+        n_rows = len(X)
+
+        if out is None and n_rows > self.max_batch_size:
+            out = np.empty((n_rows, self.n_classes), dtype=np.float32)
+
+        # Large float32 inputs are bound in place; small ones are copied
+        # into the fixed input buffer so the existing binding is reused
+        direct = (
+            X.dtype == np.float32
+            and X.flags["C_CONTIGUOUS"]
+            and n_rows > DIRECT_BINDING_MIN_ROWS
+        )
+
+        for start in range(0, n_rows, self.max_batch_size):
+            stop = min(start + self.max_batch_size, n_rows)
+            size = stop - start
+
+            if direct:
+                batch = X[start:stop]
+            else:
+                batch = self._input[:size]
+                batch[...] = X[start:stop]
+
+            if out is not None:
+                probabilities = out[start:stop]
+            else:
+                probabilities = self._probabilities[:size]
+
+            self._run(batch, self._labels[:size], probabilities)
+
+        return out if out is not None else self._probabilities[:n_rows]
+
+    def predict_positive(self, X):
+        """
+        Probability of class 1, as a view of the output buffer.
+        """
+        return self.predict_proba(X)[:, 1]
@@ -1,10 +1,10 @@
 # evaluation/plots.py
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.metrics import roc_curve, confusion_matrix
+from evaluation.metrics import confusion_counts, roc_points
 
 def plot_roc_curve(y_true, y_prob, save_path=None):
-    fpr, tpr, _ = roc_curve(y_true, y_prob)
+    fpr, tpr, _ = roc_points(y_true, y_prob)
 
     plt.figure()
     plt.plot(fpr, tpr, label="ROC Curve")
@@ -18,8 +18,10 @@ def plot_roc_curve(y_true, y_prob, save_path=None):
         plt.savefig(save_path)
     plt.show()
 
-def plot_confusion_matrix(y_true, y_pred, save_path=None):
-    cm = confusion_matrix(y_true, y_pred)
+def plot_confusion_matrix(y_true=None, y_pred=None, save_path=None, cm=None):
+    # A precomputed matrix (e.g. from evaluate_classification) skips the rescan
+    if cm is None:
+        cm = confusion_counts(y_true, y_pred)
 
     plt.figure()
     sns.heatmap(cm, annot=True, fmt="d", cmap="Blues")
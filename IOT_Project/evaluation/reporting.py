@@ -0,0 +1,273 @@
+"""
+Headless Evaluation Reports
+
+This module renders evaluation figures to files without any display or
+pyplot state, for batch runs over many models or stations:
+- Figures are built with the object-oriented Figure API on an Agg canvas
+- The parent process reduces each test set to small plot data first
+  (ROC curves resampled to at most ROC_MAX_POINTS, a 2 x 2 confusion
+  matrix, importances), so workers receive kilobytes, not test sets
+- Larger batches are rendered in a process pool
+- Every artifact is listed in index.json and index.html under REPORTS_DIR
+
+Used by run_evaluation when REPORT_MODE is "headless".
+"""
+
+import hashlib
+import html
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from config.setting import (
+    REPORTS_DIR,
+    ROC_MAX_POINTS,
+    REPORT_POOL_MIN_FIGURES,
+    MAX_WORKERS
+)
+from evaluation.metrics import confusion_counts, metrics_from_confusion, roc_auc, roc_points
+
+
+def downsample_roc(fpr, tpr, max_points: int = ROC_MAX_POINTS):
+    """
+    Resample a ROC curve onto at most max_points false-positive rates.
+
+    The curve is a step function, so tpr is taken as the highest value
+    reached at or below each grid point; both end points are kept.
+    """
+    fpr = np.asarray(fpr)
+    tpr = np.asarray(tpr)
+    if len(fpr) <= max_points:
+        return fpr, tpr
+
+    grid = np.linspace(0.0, 1.0, max_points)
+    index = np.searchsorted(fpr, grid, side="right") - 1
+    tpr_max = np.maximum.accumulate(tpr)
+
+    return grid, tpr_max[np.clip(index, 0, len(tpr) - 1)]
+
+
+def _file_stem(name: str) -> str:
+    """
+    File name safe version of a report name; a hash of the original keeps
+    names that only differ in replaced characters apart.
+    """
+    stem = re.sub(r"[^A-Za-z0-9._-]+", "_", str(name)).strip(".") or "report"
+    if stem != name:
+        stem += "-" + hashlib.sha1(str(name).encode()).hexdigest()[:8]
+
+    return stem
+
+
+def build_figure_jobs(
+    name: str,
+    y_true,
+    y_pred,
+    y_prob,
+    feature_names=None,
+    importances=None,
+    metrics: dict | None = None,
+    max_points: int = ROC_MAX_POINTS
+):
+    """
+    Plot specs and metrics for one model.
+
+    metrics takes an evaluate_classification result that was already
+    computed. A test set with a single class gets a NaN roc_auc and no
+    ROC figure.
+
+    Returns
+    -------
+    jobs : list of dict
+        One spec per figure (kind, name, plot data)
+    metrics : dict
+        Numeric evaluate_classification results
+    """
+    if metrics is None:
+        cm = confusion_counts(y_true, y_pred).tolist()
+        metrics = metrics_from_confusion(cm)
+        try:
+            metrics["roc_auc"] = roc_auc(y_true, y_prob)
+        except ValueError:
+            metrics["roc_auc"] = float("nan")
+    else:
+        metrics = dict(metrics)
+        cm = metrics.pop("confusion_matrix")
+        metrics.pop("classification_report", None)
+
+    stem = _file_stem(name)
+    jobs = [{"kind": "confusion", "name": name, "stem": stem, "cm": cm}]
+
+    if np.isfinite(metrics["roc_auc"]):
+        fpr, tpr, _ = roc_points(y_true, y_prob)
+        fpr, tpr = downsample_roc(fpr, tpr, max_points)
+        jobs.insert(0, {
+            "kind": "roc", "name": name, "stem": stem, "fpr": fpr, "tpr": tpr, "auc": metrics["roc_auc"]
+        })
+
+    if importances is not None:
+        order = np.argsort(importances)[::-1]
+        jobs.append({
+            "kind": "importance",
+            "name": name,
+            "stem": stem,
+            "features": [str(feature_names[i]) for i in order],
+            "values": np.asarray(importances)[order]
+        })
+
+    return jobs, metrics
+
+
+def _draw_roc(ax, job):
+    ax.plot(job["fpr"], job["tpr"], label=f"ROC Curve (AUC = {job['auc']:.3f})")
+    ax.plot([0, 1], [0, 1], linestyle="--")
+    ax.set_xlabel("False Positive Rate")
+    ax.set_ylabel("True Positive Rate")
+    ax.set_title("ROC Curve")
+    ax.legend()
+
+
+def _draw_confusion(ax, job):
+    cm = np.asarray(job["cm"])
+    ax.imshow(cm, cmap="Blues")
+    for (i, j), count in np.ndenumerate(cm):
+        color = "white" if count > cm.max() / 2 else "black"
+        ax.text(j, i, f"{count:d}", ha="center", va="center", color=color)
+    ax.set_xticks(range(cm.shape[1]))
+    ax.set_yticks(range(cm.shape[0]))
+    ax.set_xlabel("Predicted")
+    ax.set_ylabel("Actual")
+    ax.set_title("Confusion Matrix")
+
+
+def _draw_importance(ax, job):
+    ax.barh(job["features"], job["values"])
+    ax.invert_yaxis()
+    ax.set_title("Feature Importance")
+
+
+_DRAW = {
+    "roc": (_draw_roc, (6.4, 4.8)),
+    "confusion": (_draw_confusion, (6.4, 4.8)),
+    "importance": (_draw_importance, (10, 6))
+}
+
+
+def render_figure(job: dict, output_dir) -> str:
+    """
+    Render one figure spec to PNG on its own Agg canvas.
+
+    Returns
+    -------
+    str
+        Path of the written file
+    """
+    draw, size = _DRAW[job["kind"]]
+
+    fig = Figure(figsize=size)
+    FigureCanvasAgg(fig)
+    draw(fig.add_subplot(), job)
+    fig.tight_layout()
+
+    path = Path(output_dir) / f"{job['stem']}_{job['kind']}.png"
+    fig.savefig(path)
+
+    return str(path)
+
+
+def render_figures(jobs: list, output_dir, max_workers: int | None = MAX_WORKERS) -> list:
+    """
+    Render figure specs, in a process pool when there are enough of them.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    n_workers = min(max_workers or os.cpu_count(), len(jobs))
+    if len(jobs) < REPORT_POOL_MIN_FIGURES or n_workers <= 1:
+        return [render_figure(job, output_dir) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        return list(pool.map(render_figure, jobs, [output_dir] * len(jobs), chunksize=4))
+
+
+def write_index(entries: list, output_dir) -> Path:
+    """
+    Write index.json and a minimal index.html listing every report.
+    """
+    output_dir = Path(output_dir)
+    created_at = datetime.now(timezone.utc).isoformat()
+
+    # NaN metrics (e.g. roc_auc of a single-class station) are written as null
+    reports = [
+        {**entry, "metrics": {k: None if np.isnan(v) else v for k, v in entry["metrics"].items()}}
+        for entry in entries
+    ]
+    with open(output_dir / "index.json", "w") as f:
+        json.dump({"created_at": created_at, "reports": reports}, f, indent=2, allow_nan=False)
+
+    sections = []
+    for entry in entries:
+        rows = "".join(
+            f"<tr><td>{html.escape(k)}</td><td>{v:.4f}</td></tr>" for k, v in entry["metrics"].items()
+        )
+        images = "".join(
+            f'<img src="{html.escape(Path(p).name)}" width="480">' for p in entry["figures"]
+        )
+        sections.append(f"<h2>{html.escape(entry['name'])}</h2><table>{rows}</table><div>{images}</div>")
+
+    (output_dir / "index.html").write_text(
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Evaluation reports</title></head>"
+        f"<body><h1>Evaluation reports</h1><p>{created_at}</p>{''.join(sections)}</body></html>",
+        encoding="utf-8"
+    )
+
+    return output_dir / "index.json"
+
+
+def render_reports(
+    results: dict,
+    output_dir: Path = REPORTS_DIR,
+    max_workers: int | None = MAX_WORKERS
+) -> list:
+    """
+    Headless reports for many models (e.g. one per station).
+
+    Parameters
+    ----------
+    results : dict
+        name -> dict with y_true, y_pred, y_prob and optionally
+        feature_names / importances / metrics (see build_figure_jobs)
+    output_dir : Path, optional
+        Target directory, by default REPORTS_DIR
+    max_workers : int | None, optional
+        Render processes
+
+    Returns
+    -------
+    list of dict
+        Index entries: name, metrics and figure paths
+    """
+    all_jobs = []
+    entries = []
+    for name, result in results.items():
+        jobs, metrics = build_figure_jobs(name, **result)
+        all_jobs += jobs
+        entries.append({"name": name, "metrics": metrics, "figures": []})
+
+    paths = render_figures(all_jobs, output_dir, max_workers)
+
+    by_name = {entry["name"]: entry for entry in entries}
+    for job, path in zip(all_jobs, paths):
+        by_name[job["name"]]["figures"].append(path)
+
+    index_path = write_index(entries, output_dir)
+    print(f" {len(paths)} figures for {len(entries)} reports, index: {index_path}")
+
+    return entries
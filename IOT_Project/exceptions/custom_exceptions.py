@@ -3,6 +3,11 @@ class DataNotFoundError(Exception):
     pass
 
 
+class DataValidationError(Exception):
+    """Raised when input data does not match the expected schema."""
+    pass
+
+
 class EmptyDatasetError(Exception):
     """Raised when dataframe is empty after processing."""
     pass
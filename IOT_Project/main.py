@@ -1,13 +1,20 @@
 """
 Main Pipeline for IoT Air Quality Prediction Project
 
-This script orchestrates the full workflow:
-- Data loading
-- Cleaning
-- Preprocessing
-- Saving processed data
-- Model training
-- Evaluation
+This script orchestrates the full workflow as memoized stages
+(see utils/pipeline.py):
+- load       : raw data
+- resample   : regular hourly grid (RESAMPLE_HOURLY)
+- clean      : missing value imputation
+- preprocess : features and labels
+- persist    : feature store
+- train      : model training
+- export     : ONNX export
+- evaluate   : metrics and plots
+
+Only stages whose inputs or settings changed are rerun, and a failed run
+resumes from the last stage that finished. With STREAMING_MODE set, live
+records are scored instead (see preprocessing/streaming.py).
 """
 from exceptions.custom_exceptions import (
     DataNotFoundError,
@@ -20,173 +27,404 @@ from pathlib import Path
 
 from data_acquisition.load_data import load_raw_air_quality_data
 from data_acquisition.cleaning import handle_missing_values
+from data_acquisition.cache import file_fingerprint
 
 from preprocessing.preprocess_data import preprocess_data
+from preprocessing.feature_store import save_feature_store, MANIFEST_NAME
+from preprocessing.label_generation import UNHEALTHY_QUANTILE, global_thresholds
+from preprocessing.resampling import resample_hourly
 
-from models.train_model import train_random_forest
+from models.train_model import train_model
 
 from evaluation.evaluate import run_evaluation
 
+from utils.pipeline import Stage, Pipeline
+from utils.instrumentation import configure_logging, write_stage_metrics
 
-##########################
-from config.setting import PROCESSED_DATA_DIR
-import pandas as pd
 
+##########################
 from data_acquisition.synthetic_air_quality import generate_synthetic_air_quality_data
-from config.setting import RAW_DATA_DIR, SYNTHETIC_DATA_FILE
-import os
-def main():
-    print("Starting IoT Air Quality Prediction Pipeline...")
-    
-
-
-    from config.setting import (
+from config.setting import (
     USE_SYNTHETIC_DATA,
     REAL_DATA_FILE,
-    SYNTHETIC_DATA_FILE
+    SYNTHETIC_DATA_FILE,
+    FEATURE_STORE_DIR,
+    RESULTS_DIR,
+    ONNX_MODEL_PATH,
+    IMPUTATION_STRATEGY,
+    IMPUTATION_MAX_GAP,
+    ROLLING_MEDIAN_WINDOW,
+    TRAIN_TEST_SPLIT_RATIO,
+    SENSOR_FAILURE_VALUE,
+    LABEL_THRESHOLD_MODE,
+    LABEL_THRESHOLD_WINDOW,
+    USE_WINDOW_FEATURES,
+    WINDOW_FEATURES,
+    PREPROCESS_LOW_MEMORY,
+    RESAMPLE_HOURLY,
+    SENSOR_FEATURES,
+    TARGET_COLUMNS,
+    FORECAST_HORIZON,
+    MULTI_STATION_MODE,
+    RANDOM_STATE,
+    OPTIMIZE_ONNX_EXPORT,
+    ONNX_OPTIMIZATION,
+    INCREMENTAL_TRAINING,
+    MODEL_BACKEND,
+    MODEL_PARAMS,
+    REPORT_MODE,
+    PERMUTATION_IMPORTANCE,
+    PERMUTATION_BACKEND,
+    STREAMING_MODE
 )
 
 
-    def load_selected_dataset():
-        
-        # اگر فایل synthetic وجود ندارد، بسازش
-        if not SYNTHETIC_DATA_FILE.exists():
-            print(" Synthetic dataset not found. Generating it now...")
-            generate_synthetic_air_quality_data(
-                periods=2000,
-                save_path=SYNTHETIC_DATA_FILE
-            )
-        else:
-            print("Synthetic dataset already exists." )
-        
-        
-        
-        
-        
-        if USE_SYNTHETIC_DATA:
-           print(" Using synthetic dataset")
-           data_path = SYNTHETIC_DATA_FILE
-        else:
-          print(" Using real dataset")
-          data_path = REAL_DATA_FILE
-
-        return pd.read_csv(
-          data_path,
-          sep=";",
-          decimal=","
-    )
+def load_selected_dataset():
+
+    # اگر فایل synthetic وجود ندارد، بسازش
+    if not SYNTHETIC_DATA_FILE.exists():
+        print(" Synthetic dataset not found. Generating it now...")
+        generate_synthetic_air_quality_data(
+            periods=2000,
+            save_path=SYNTHETIC_DATA_FILE,
+            seed=RANDOM_STATE
+        )
+    else:
+        print("Synthetic dataset already exists." )
+
+    if USE_SYNTHETIC_DATA:
+        print(" Using synthetic dataset")
+        data_path = SYNTHETIC_DATA_FILE
+    else:
+        print(" Using real dataset")
+        data_path = REAL_DATA_FILE
 
-    # --------------------------------------------------
-    # 1. Load Raw Data
-    # --------------------------------------------------
-    print(" Loading raw data...")
-    df_raw = load_selected_dataset()
+    return data_path
+
+
+# --------------------------------------------------
+# Stages
+# --------------------------------------------------
+
+def load_stage(data_path):
+    df_raw = load_raw_air_quality_data(Path(data_path))
     if df_raw is None or df_raw.empty:
         raise DataNotFoundError("Raw dataset not found or empty.")
 
-    # --------------------------------------------------
-    # 2. Data Cleaning
-    # --------------------------------------------------
-    print(" Cleaning data...")
-    df_clean = handle_missing_values(df_raw)
+    return df_raw
+
+
+def resample_stage(load):
+    return resample_hourly(load, timestamp_col="Date", time_col="Time")
+
+
+def clean_stage(strategy, max_gap, window, stats=None, load=None, resample=None):
+    df = load if resample is None else resample
+
+    return handle_missing_values(df, strategy=strategy, stats=stats, max_gap=max_gap, window=window)
+
 
-    # --------------------------------------------------
-    # 3. Preprocessing & Feature Engineering
-    # --------------------------------------------------
-    print(" Preprocessing data...")
+def preprocess_stage(clean, **preprocess_kwargs):
     try:
-        X, y = preprocess_data(
-            df=df_clean,
-            timestamp_col="Date",  
-             sensor_features=[
-               "CO(GT)",
-              "NO2(GT)",
-              "NOx(GT)",
-              "C6H6(GT)",
-              "T",
-              "RH",
-              "AH"
-          ],
-          target_columns=["CO(GT)"],
-          horizon=1,
-          use_time_features=True
-     )
+        X, y = preprocess_data(df=clean, **preprocess_kwargs)
     except Exception as e:
-        raise PreprocessingError(f"Preprocessing failed: {e}")    
+        raise PreprocessingError(f"Preprocessing failed: {e}")
     if X.empty or y.empty:
         raise EmptyDatasetError("Dataset became empty after preprocessing.")
 
-    #برای تست کردن داده های ساخته شده
-    #print("@@@@@@@Label distribution:")
-    #print(y.value_counts())
+    return X, y
 
-    # 4. Save Processed Data (IMPORTANT)
 
-    print("Saving processed data...")
+def persist_stage(preprocess, metadata):
+    X, y = preprocess
+    manifest_path = save_feature_store(X, y, metadata=metadata)
+    print(f" Feature store saved to: {manifest_path.parent}")
 
-    PROCESSED_DATA_DIR.mkdir(parents=True, exist_ok=True)
+    return str(manifest_path)
 
-    X_path = PROCESSED_DATA_DIR / "X_features.csv"
-    y_path = PROCESSED_DATA_DIR / "y_labels.csv"
 
-    X.to_csv(X_path, index=False)
-    y.to_csv(y_path, index=False)
-
-    print(f" Features saved to: {X_path}")
-    print(f" Labels saved to: {y_path}")
-
-    # 5. Train Model
-
-    print("Training Random Forest model...")
+def train_stage(preprocess, backend, train_ratio, random_state, model_params):
+    X, y = preprocess
     try:
-
-        model, X_train, X_test, y_train, y_test, y_pred, y_prob = train_random_forest(
+        model, X_train, X_test, y_train, y_test, y_pred, y_prob = train_model(
             X=X,
-            y=y
+            y=y,
+            train_ratio=train_ratio,
+            random_state=random_state,
+            backend=backend,
+            **model_params
         )
     except Exception as e:
-        raise ModelTrainingError(f"Model training failed: {e}") 
-    
-        #Export trained model to ONNX
+        raise ModelTrainingError(f"Model training failed: {e}")
+
+    return {
+        "model": model,
+        "split_index": len(X_train),
+        "y_test": y_test,
+        "y_pred": y_pred,
+        "y_prob": y_prob
+    }
+
+
+def export_stage(preprocess, train, output_path):
     from models.export_onnx import export_model_to_onnx
 
+    X, _ = preprocess
     export_model_to_onnx(
-         model=model,
-         n_features=X_train.shape[1],
-         output_path="results/air_quality_model.onnx"
+        model=train["model"],
+        n_features=X.shape[1],
+        output_path=output_path
     )
 
+    return output_path
 
-    from config.setting import RESULTS_DIR
-    import json
 
-    # 7. Feature Importance
+def optimize_stage(preprocess, train, options):
+    from models.optimize_onnx import run_export_optimization
 
-    print(" Plotting feature importance...")
+    X, y = preprocess
+    split_index = train["split_index"]
+
+    return run_export_optimization(train["model"], X.iloc[split_index:], y.iloc[split_index:], **options)
 
-        # 6. Evaluation
-    print(" Evaluating model...")
+
+def feature_importances(X, train):
+    """
+    Permutation importances on the test split if enabled, else the
+    model's impurity importances (None when it has none).
+    """
+    from evaluation.importance import permutation_importance, tree_importances
+
+    model = train["model"]
+    if PERMUTATION_IMPORTANCE:
+        scorer = ONNX_MODEL_PATH if PERMUTATION_BACKEND == "onnx" else model
+        ranking = permutation_importance(scorer, X.iloc[train["split_index"]:], train["y_test"])
+    elif hasattr(model, "feature_importances_"):
+        ranking = tree_importances(model, X.columns)
+    else:
+        return None
+
+    return ranking.set_index("feature")["importance"].reindex(X.columns.astype(str)).to_numpy()
+
+
+def evaluate_stage(preprocess, train):
+    from evaluation.feature_importance import plot_feature_importance
+
+    X, _ = preprocess
+    model = train["model"]
+    importances = feature_importances(X, train)
 
     metrics = run_evaluation(
-        y_test=y_test,
-        y_pred=y_pred,
-        y_prob=y_prob
+        y_test=train["y_test"],
+        y_pred=train["y_pred"],
+        y_prob=train["y_prob"],
+        feature_names=list(X.columns),
+        importances=importances
     )
 
-    print(" Evaluation completed.")
+    if REPORT_MODE == "headless":
+        return metrics
+
+    print(" Plotting feature importance...")
+
+    if importances is not None:
+        plot_feature_importance(
+            model=model,
+            feature_names=X.columns,
+            save_path=RESULTS_DIR / "feature_importance.png",
+            importances=importances
+        )
+    else:
+        print(f" {MODEL_BACKEND} has no impurity importances, plot skipped.")
+
+    return metrics
+
+
+def incremental_stage(preprocess, clean, preprocessing, load=None, resample=None):
+    from data_acquisition.cleaning import fit_imputer
+    from models.incremental import run_incremental_update
+
+    if preprocessing is None:
+        # First fit: the statistics clean / preprocess just fitted themselves
+        preprocessing = {
+            "imputer": fit_imputer(load if resample is None else resample),
+            "label_thresholds": global_thresholds(clean, TARGET_COLUMNS)
+        }
+
+    X, y = preprocess
+    _, report = run_incremental_update(X=X, y=y, preprocessing=preprocessing)
+
+    return report
+
+
+def build_pipeline(data_path) -> Pipeline:
+    """
+    Declare the stages and their settings for one dataset.
+    """
+    from models.tuning import load_best_params
+
+    window_features = WINDOW_FEATURES if USE_WINDOW_FEATURES else None
+
+    # Incremental updates rebuild old rows with the first fit's statistics
+    frozen = None
+    if INCREMENTAL_TRAINING:
+        from models.incremental import frozen_preprocessing
+
+        frozen = frozen_preprocessing()
+
+    stages = [
+        Stage(
+            "load",
+            load_stage,
+            params={"data_path": str(data_path)},
+            depends_on={"source": file_fingerprint(data_path)}
+        )
+    ]
+
+    if RESAMPLE_HOURLY:
+        stages.append(Stage(
+            "resample",
+            resample_stage,
+            inputs=["load"],
+            depends_on={"failure_value": SENSOR_FAILURE_VALUE}
+        ))
+
+    stages += [
+        Stage(
+            "clean",
+            clean_stage,
+            inputs=["resample" if RESAMPLE_HOURLY else "load"],
+            params={
+                "strategy": IMPUTATION_STRATEGY,
+                "max_gap": IMPUTATION_MAX_GAP,
+                "window": ROLLING_MEDIAN_WINDOW,
+                "stats": None if frozen is None else frozen["imputer"]
+            },
+            # Imputation medians are fitted on the training share only
+            depends_on={"train_ratio": TRAIN_TEST_SPLIT_RATIO, "failure_value": SENSOR_FAILURE_VALUE}
+        ),
+        Stage(
+            "preprocess",
+            preprocess_stage,
+            inputs=["clean"],
+            params={
+                "timestamp_col": "Date",
+                "sensor_features": SENSOR_FEATURES,
+                "target_columns": TARGET_COLUMNS,
+                "horizon": FORECAST_HORIZON,
+                "use_time_features": True,
+                "window_features": window_features,
+                "time_col": "Time",
+                "low_memory": PREPROCESS_LOW_MEMORY,
+                "thresholds": None if frozen is None else frozen["label_thresholds"]
+            },
+            # Read by the label generators as defaults
+            depends_on={
+                "threshold_quantile": UNHEALTHY_QUANTILE,
+                "threshold_mode": LABEL_THRESHOLD_MODE,
+                "threshold_window": LABEL_THRESHOLD_WINDOW
+            }
+        ),
+        Stage(
+            "persist",
+            persist_stage,
+            inputs=["preprocess"],
+            params={"metadata": {
+                "source": str(data_path),
+                "horizon": FORECAST_HORIZON,
+                "window_features": window_features,
+                "label_config": {
+                    "target_columns": TARGET_COLUMNS,
+                    "threshold_quantile": UNHEALTHY_QUANTILE
+                }
+            }},
+            artifacts=[FEATURE_STORE_DIR / MANIFEST_NAME]
+        )
+    ]
+
+    if INCREMENTAL_TRAINING:
+        # Updates a persisted model, so it runs every time
+        stages.append(Stage(
+            "incremental",
+            incremental_stage,
+            inputs=["preprocess", "clean", "resample" if RESAMPLE_HOURLY else "load"],
+            params={"preprocessing": frozen},
+            memoize=False
+        ))
+        return Pipeline(stages)
+
+    # Parameters found by python -m models.tuning, if it has been run
+    model_params = {**MODEL_PARAMS.get(MODEL_BACKEND, {}), **load_best_params(backend=MODEL_BACKEND)}
+
+    stages += [
+        Stage(
+            "train",
+            train_stage,
+            inputs=["preprocess"],
+            params={
+                "backend": MODEL_BACKEND,
+                "train_ratio": TRAIN_TEST_SPLIT_RATIO,
+                "random_state": RANDOM_STATE,
+                "model_params": model_params
+            }
+        ),
+        Stage(
+            "export",
+            export_stage,
+            inputs=["preprocess", "train"],
+            params={"output_path": ONNX_MODEL_PATH},
+            artifacts=[ONNX_MODEL_PATH]
+        )
+    ]
+
+    if OPTIMIZE_ONNX_EXPORT:
+        stages.append(Stage(
+            "optimize",
+            optimize_stage,
+            inputs=["preprocess", "train"],
+            params={"options": ONNX_OPTIMIZATION},
+            artifacts=[RESULTS_DIR / "onnx_variants" / "report.json"]
+        ))
+
+    # Shows plots, so it is cheap to rerun and always does; permutation
+    # importances are cached per model in IMPORTANCE_CACHE_DIR
+    stages.append(Stage("evaluate", evaluate_stage, inputs=["preprocess", "train"], memoize=False))
+
+    return Pipeline(stages)
+
+
+def main(force=None):
+    configure_logging()
+    print("Starting IoT Air Quality Prediction Pipeline...")
+
+    if MULTI_STATION_MODE:
+        from preprocessing.multi_station import run_multi_station
+
+        run_multi_station()
+        return
+
+    data_path = load_selected_dataset()
+    if not Path(data_path).exists():
+        raise DataNotFoundError(f"Dataset not found: {data_path}")
+
+    if STREAMING_MODE:
+        # Scores a live feed with the exported model until the source ends
+        from preprocessing.streaming import run_streaming
+
+        run_streaming(data_path)
+        return
+
+    pipeline = build_pipeline(data_path)
+    try:
+        pipeline.run(force=force)
+    finally:
+        metrics_path = write_stage_metrics(extra={"pipeline": pipeline.report})
+        print(f" Stage metrics written to: {metrics_path}")
 
     print(" Pipeline completed successfully!")
-    from evaluation.feature_importance import plot_feature_importance
-    from config.setting import RESULTS_DIR
 
-    print(" Plotting feature importance...")
+    return pipeline
 
-    importance_df = plot_feature_importance(
-        model=model,
-        feature_names=X_train.columns,
-        save_path=RESULTS_DIR / "feature_importance.png"
-    )
-    
 
 if __name__ == "__main__":
         main()
@@ -0,0 +1,266 @@
+"""
+Walk-Forward Backtesting
+
+This module evaluates the model over many rolling origins instead of a
+single 80/20 split:
+- Folds are built over the time-ordered X / y from preprocess_data,
+  either expanding (train on all history) or sliding (fixed window)
+- A gap between train and test keeps the label look-ahead out of training
+- Folds are trained in parallel worker processes; the n_jobs / OpenMP
+  threads of each fold are bounded so workers x threads never exceeds
+  the core budget
+- Any registered backend (see models/registry.py) can be backtested
+- X / y are written once as .npy files and memory-mapped read-only by
+  every worker, so the feature matrix is not pickled per fold
+
+Per-fold evaluate_classification metrics are aggregated into mean / std,
+plus metrics of all test windows pooled through ClassificationAccumulator.
+"""
+
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from threadpoolctl import threadpool_limits
+
+from config.setting import (
+    RESULTS_DIR,
+    RANDOM_STATE,
+    MAX_WORKERS,
+    MODEL_BACKEND,
+    MODEL_PARAMS,
+    BACKTEST_N_FOLDS,
+    BACKTEST_MODE,
+    BACKTEST_TEST_SIZE,
+    BACKTEST_TRAIN_SIZE,
+    BACKTEST_GAP
+)
+from evaluation.metrics import evaluate_classification, ClassificationAccumulator
+from models.registry import build_model, prepare_features
+
+
+BACKTEST_MODES = ("expanding", "sliding")
+
+METRIC_NAMES = ["accuracy", "precision", "recall", "f1_score", "roc_auc"]
+
+
+def make_walk_forward_folds(
+    n_rows: int,
+    n_folds: int = BACKTEST_N_FOLDS,
+    mode: str = BACKTEST_MODE,
+    test_size: int | None = BACKTEST_TEST_SIZE,
+    train_size: int | None = BACKTEST_TRAIN_SIZE,
+    gap: int = BACKTEST_GAP
+) -> list:
+    """
+    Row ranges of walk-forward folds.
+
+    Test windows are consecutive and cover the end of the series; fold k
+    trains on rows before its test window minus the gap.
+
+    Parameters
+    ----------
+    n_rows : int
+        Number of time-ordered rows
+    n_folds : int, optional
+        Number of origins
+    mode : str, optional
+        "expanding" - train from row 0
+        "sliding"   - train on the train_size rows before the gap
+    test_size : int | None, optional
+        Rows per test window; None gives n_rows // (n_folds + 1)
+    train_size : int | None, optional
+        Sliding window length; None uses the first fold's training size
+    gap : int, optional
+        Rows skipped between train and test
+
+    Returns
+    -------
+    list of dict
+        fold, train_start, train_end, test_start, test_end (end exclusive)
+    """
+    if mode not in BACKTEST_MODES:
+        raise ValueError(f"Unknown backtest mode '{mode}'. Use one of {BACKTEST_MODES}")
+
+    test_size = test_size or n_rows // (n_folds + 1)
+    first_test = n_rows - n_folds * test_size
+    if test_size < 1 or first_test - gap < 1:
+        raise ValueError(f"{n_rows} rows are too few for {n_folds} folds of {test_size} test rows")
+
+    train_size = train_size or first_test - gap
+
+    folds = []
+    for k in range(n_folds):
+        test_start = first_test + k * test_size
+        train_end = test_start - gap
+        train_start = max(0, train_end - train_size) if mode == "sliding" else 0
+        folds.append({
+            "fold": k,
+            "train_start": train_start,
+            "train_end": train_end,
+            "test_start": test_start,
+            "test_end": test_start + test_size
+        })
+
+    return folds
+
+
+def _null_nan(value):
+    """
+    Replace NaN (e.g. metrics of single-class folds) with None, which JSON can encode.
+    """
+    if isinstance(value, dict):
+        return {key: _null_nan(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_null_nan(item) for item in value]
+    if isinstance(value, float) and np.isnan(value):
+        return None
+
+    return value
+
+
+def _run_fold(X_path, y_path, fold: dict, backend: str, model_params: dict, n_jobs: int) -> dict:
+    """
+    Train and score one fold; runs in a worker process.
+    """
+    X = np.load(X_path, mmap_mode="r")
+    y = np.load(y_path, mmap_mode="r")
+
+    X_train = prepare_features(X[fold["train_start"]:fold["train_end"]])
+    y_train = y[fold["train_start"]:fold["train_end"]]
+    X_test = prepare_features(X[fold["test_start"]:fold["test_end"]])
+    y_test = np.asarray(y[fold["test_start"]:fold["test_end"]])
+
+    overrides = dict(model_params)
+    if "n_jobs" in MODEL_PARAMS.get(backend, {}):
+        overrides["n_jobs"] = n_jobs
+    random_state = overrides.pop("random_state", RANDOM_STATE)
+
+    with threadpool_limits(n_jobs):
+        model = build_model(backend, random_state=random_state, **overrides)
+        model.fit(X_train, y_train)
+
+        y_pred = model.predict(X_test)
+        y_prob = model.predict_proba(X_test)[:, 1] if len(model.classes_) == 2 else np.zeros(len(y_test))
+
+    if len(np.unique(y_test)) < 2:
+        # ROC AUC is undefined on a single-class window
+        metrics = {name: float("nan") for name in METRIC_NAMES}
+        metrics["accuracy"] = float((y_pred == y_test).mean())
+    else:
+        metrics = evaluate_classification(y_test, y_pred, y_prob)
+        metrics = {name: float(metrics[name]) for name in METRIC_NAMES}
+
+    return {
+        **fold,
+        **metrics,
+        "test_positive_rate": float(y_test.mean()),
+        "accumulator": ClassificationAccumulator().update(y_test, y_pred, y_prob)
+    }
+
+
+def run_backtest(
+    X,
+    y,
+    n_folds: int = BACKTEST_N_FOLDS,
+    mode: str = BACKTEST_MODE,
+    test_size: int | None = BACKTEST_TEST_SIZE,
+    train_size: int | None = BACKTEST_TRAIN_SIZE,
+    gap: int = BACKTEST_GAP,
+    backend: str = MODEL_BACKEND,
+    model_params: dict | None = None,
+    max_workers: int | None = MAX_WORKERS,
+    save_path: Path | None = RESULTS_DIR / "backtest.json"
+) -> dict:
+    """
+    Walk-forward backtest of a model backend.
+
+    Parameters
+    ----------
+    X : pd.DataFrame | numpy.ndarray
+        Time-ordered feature matrix
+    y : pd.Series | numpy.ndarray
+        Labels
+    n_folds, mode, test_size, train_size, gap
+        Fold layout, see make_walk_forward_folds
+    backend : str, optional
+        Registered model backend, by default MODEL_BACKEND
+    model_params : dict | None
+        Overrides of MODEL_PARAMS[backend] (n_jobs is set per fold)
+    max_workers : int | None, optional
+        Total core budget shared by all folds, by default one per core
+    save_path : Path | None, optional
+        JSON report location; None to skip writing
+
+    Returns
+    -------
+    dict
+        "folds" (per-fold metrics DataFrame) and "summary" (mean / std)
+    """
+    # Replaced by the per-fold thread budget
+    model_params = {name: value for name, value in (model_params or {}).items() if name != "n_jobs"}
+
+    folds = make_walk_forward_folds(len(X), n_folds, mode, test_size, train_size, gap)
+
+    # Split the core budget: as many folds as possible, the rest as tree threads
+    n_cores = max_workers or os.cpu_count()
+    n_workers = max(1, min(len(folds), n_cores))
+    n_jobs = max(1, n_cores // n_workers)
+
+    print(f" Backtesting {backend} on {len(folds)} {mode} folds: {n_workers} workers x {n_jobs} threads")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        X_path = Path(tmp) / "X.npy"
+        y_path = Path(tmp) / "y.npy"
+        np.save(X_path, np.ascontiguousarray(np.asarray(X, dtype=np.float32)))
+        np.save(y_path, np.asarray(y, dtype=np.int8))
+
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            results = list(pool.map(
+                _run_fold,
+                [X_path] * len(folds),
+                [y_path] * len(folds),
+                folds,
+                [backend] * len(folds),
+                [model_params] * len(folds),
+                [n_jobs] * len(folds)
+            ))
+
+    pooled = ClassificationAccumulator()
+    for result in results:
+        pooled.merge(result.pop("accumulator"))
+    pooled_metrics = pooled.result()
+
+    fold_metrics = pd.DataFrame(results).set_index("fold")
+    summary = fold_metrics[METRIC_NAMES].agg(["mean", "std"])
+    summary.loc["pooled"] = [pooled_metrics[name] for name in METRIC_NAMES]
+
+    print(fold_metrics[["train_end", "test_start", "test_end"] + METRIC_NAMES].round(3).to_string())
+    print(" Mean / std over folds, and all test windows pooled:")
+    print(summary.round(3).to_string())
+
+    if save_path:
+        save_path = Path(save_path)
+        save_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(save_path, "w") as f:
+            json.dump(_null_nan({
+                "mode": mode,
+                "gap": gap,
+                "backend": backend,
+                "model_params": model_params,
+                "folds": results,
+                "summary": summary.to_dict()
+            }), f, indent=2, allow_nan=False)
+
+    return {"folds": fold_metrics, "summary": summary}
+
+
+if __name__ == "__main__":
+    from preprocessing.feature_store import load_feature_store
+
+    X, y, _ = load_feature_store()
+    run_backtest(X, y)
@@ -0,0 +1,99 @@
+"""
+Model Backend Benchmark
+
+Trains every registered backend on the same time-based split and compares:
+- fit time
+- predict latency (whole test set per row, and single rows)
+- ONNX model size
+- ROC AUC
+
+Run with:  python -m models.benchmark_backends
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from sklearn.metrics import roc_auc_score
+
+from config.setting import TRAIN_TEST_SPLIT_RATIO, RANDOM_STATE
+from models.registry import available_backends, build_model, prepare_features
+from models.export_onnx import export_model_to_onnx
+
+
+def benchmark_backends(X, y, backends=None, train_ratio: float = TRAIN_TEST_SPLIT_RATIO, n_single_rows: int = 200):
+    """
+    Fit and measure each backend on one split.
+
+    Parameters
+    ----------
+    X : pd.DataFrame | numpy.ndarray
+        Time-ordered feature matrix
+    y : pd.Series | numpy.ndarray
+        Labels
+    backends : list | None
+        Backend names, by default all registered
+    train_ratio : float, optional
+        Train/Test split ratio
+    n_single_rows : int, optional
+        Test rows predicted one at a time for the single-row latency
+
+    Returns
+    -------
+    list of dict
+        One entry per backend
+    """
+    X = prepare_features(X)
+    y = np.asarray(y)
+    split_index = int(len(X) * train_ratio)
+    X_train, X_test = X[:split_index], X[split_index:]
+    y_train, y_test = y[:split_index], y[split_index:]
+
+    results = []
+    for backend in backends or available_backends():
+        model = build_model(backend, random_state=RANDOM_STATE)
+
+        start = time.perf_counter()
+        model.fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        y_prob = model.predict_proba(X_test)[:, 1]
+        batch_seconds = time.perf_counter() - start
+
+        single_rows = X_test[:n_single_rows]
+        start = time.perf_counter()
+        for i in range(len(single_rows)):
+            model.predict_proba(single_rows[i:i + 1])
+        single_seconds = (time.perf_counter() - start) / len(single_rows)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            onnx_path = Path(tmp) / f"{backend}.onnx"
+            export_model_to_onnx(model, X.shape[1], onnx_path)
+            onnx_bytes = onnx_path.stat().st_size
+
+        results.append({
+            "backend": backend,
+            "fit_seconds": fit_seconds,
+            "predict_us_per_row": 1e6 * batch_seconds / len(X_test),
+            "single_row_ms": 1000 * single_seconds,
+            "onnx_kb": onnx_bytes / 1024,
+            "roc_auc": float(roc_auc_score(y_test, y_prob))
+        })
+
+    print(f"{'backend':<24} {'fit s':>7} {'us/row':>8} {'1-row ms':>9} {'ONNX KB':>9} {'ROC AUC':>8}")
+    for r in results:
+        print(
+            f"{r['backend']:<24} {r['fit_seconds']:>7.2f} {r['predict_us_per_row']:>8.2f} "
+            f"{r['single_row_ms']:>9.3f} {r['onnx_kb']:>9.0f} {r['roc_auc']:>8.4f}"
+        )
+
+    return results
+
+
+if __name__ == "__main__":
+    from preprocessing.feature_store import load_feature_store
+
+    X, y, _ = load_feature_store()
+    benchmark_backends(X, y)
@@ -2,11 +2,39 @@
 Export trained sklearn model to ONNX format
 """
 
+from contextlib import contextmanager, nullcontext
+
 from skl2onnx import convert_sklearn
 from skl2onnx.common.data_types import FloatTensorType
+from skl2onnx.common import tree_ensemble
+from sklearn.ensemble import HistGradientBoostingClassifier
+from utils.instrumentation import instrumented
+
+
+@contextmanager
+def _int_missing_tracks():
+    """
+    While converting, cast nodes_missing_value_tracks_true to int.
+
+    skl2onnx (1.20.0, the version in use) passes a Python bool for
+    HistGradientBoosting leaves, which ONNX rejects (ints only).
+    tree_ensemble.add_node is restored afterwards, so other users of
+    skl2onnx are unaffected.
+    """
+    add_node = tree_ensemble.add_node
+
+    def wrapper(*args, nodes_missing_value_tracks_true=0, **kwargs):
+        return add_node(*args, nodes_missing_value_tracks_true=int(nodes_missing_value_tracks_true), **kwargs)
+
+    tree_ensemble.add_node = wrapper
+    try:
+        yield
+    finally:
+        tree_ensemble.add_node = add_node
 
 
-def export_model_to_onnx(model, n_features, output_path):
+@instrumented("export")
+def export_model_to_onnx(model, n_features, output_path, zipmap=False):
     """
     Export sklearn model to ONNX format.
 
@@ -18,16 +46,23 @@ def export_model_to_onnx(model, n_features, output_path):
         Number of input features
     output_path : str
         Path to save ONNX model
+    zipmap : bool, optional
+        Emit class probabilities as a list of {class: probability} dicts
+        (skl2onnx default). Off by default: a plain float tensor is
+        faster to build and consume, and can be IO-bound to a buffer.
     """
 
     initial_type = [
         ("float_input", FloatTensorType([None, n_features]))
     ]
 
-    onnx_model = convert_sklearn(
-        model,
-        initial_types=initial_type
-    )
+    patch = _int_missing_tracks() if isinstance(model, HistGradientBoostingClassifier) else nullcontext()
+    with patch:
+        onnx_model = convert_sklearn(
+            model,
+            initial_types=initial_type,
+            options={id(model): {"zipmap": zipmap}}
+        )
 
     with open(output_path, "wb") as f:
         f.write(onnx_model.SerializeToString())
@@ -0,0 +1,405 @@
+"""
+Incremental Model Updates
+
+This module keeps a Random Forest up to date without retraining on the
+full history every run:
+- The forest and its state are persisted in MODEL_STATE_DIR
+- Each update grows INCREMENTAL_TREES_PER_UPDATE new trees (warm start)
+  on the rows added since the last update only
+- Trees older than the newest INCREMENTAL_MAX_TREES are aged out
+- Before training, the current model is scored on the new rows
+  (prequential accuracy) and the feature means are compared with the
+  running reference; either check can flag drift, which ages out one
+  extra batch of old trees
+- The ONNX model is re-exported only when the forest's hash changes
+
+Rows are identified by position: X / y must be the same time-ordered
+history as before with new rows appended. The imputation statistics and
+label thresholds of the first fit are stored with the state
+(frozen_preprocessing) and must be reused to build later X / y, so rows
+already trained on keep their values; if different ones are passed, the
+forest is retrained from scratch.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+import joblib
+import numpy as np
+from sklearn.metrics import roc_auc_score
+
+from config.setting import (
+    RANDOM_STATE,
+    ONNX_MODEL_PATH,
+    MODEL_STATE_DIR,
+    INCREMENTAL_TREES_PER_UPDATE,
+    INCREMENTAL_MAX_TREES,
+    INCREMENTAL_MIN_NEW_ROWS,
+    DRIFT_ACCURACY_DROP,
+    DRIFT_MEAN_SHIFT
+)
+from models.export_onnx import export_model_to_onnx
+from models.registry import build_model
+
+
+MODEL_FILE = "model.joblib"
+STATE_FILE = "state.json"
+
+# Weight of the newest prequential accuracy in the running baseline
+BASELINE_ALPHA = 0.3
+DRIFT_HISTORY_LENGTH = 100
+
+
+def model_fingerprint(model) -> str:
+    """
+    SHA-256 of the fitted trees' structure, thresholds and leaf values.
+
+    Unlike a pickle hash this only changes when the trees change.
+    """
+    digest = hashlib.sha256()
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        for array in (tree.children_left, tree.children_right, tree.feature, tree.threshold, tree.value):
+            digest.update(np.ascontiguousarray(array).tobytes())
+
+    return digest.hexdigest()
+
+
+def _new_state(n_features: int) -> dict:
+    return {
+        "n_rows_seen": 0,
+        "n_updates": 0,
+        "tree_birth": [],
+        "model_hash": None,
+        "exported_hash": None,
+        "reference": {
+            "count": 0,
+            "mean": [0.0] * n_features,
+            "m2": [0.0] * n_features
+        },
+        "baseline_accuracy": None,
+        "drift_history": []
+    }
+
+
+def frozen_preprocessing(state_dir: Path = MODEL_STATE_DIR) -> dict | None:
+    """
+    Imputer statistics and label thresholds of the persisted model's first fit.
+
+    Returns
+    -------
+    dict | None
+        {"imputer": ..., "label_thresholds": ...}, or None if there is no
+        persisted model yet
+    """
+    _, state = load_model_state(state_dir, load_model=False)
+
+    return None if state is None else state.get("preprocessing")
+
+
+def load_model_state(state_dir: Path = MODEL_STATE_DIR, load_model: bool = True):
+    """
+    Load the persisted forest and its state.
+
+    Returns
+    -------
+    model : RandomForestClassifier | None
+        None if nothing has been saved yet, or load_model is False
+    state : dict | None
+    """
+    state_dir = Path(state_dir)
+    if not (state_dir / STATE_FILE).exists():
+        return None, None
+
+    with open(state_dir / STATE_FILE) as f:
+        state = json.load(f)
+
+    return joblib.load(state_dir / MODEL_FILE) if load_model else None, state
+
+
+def save_model_state(model, state: dict, state_dir: Path = MODEL_STATE_DIR):
+    """
+    Persist the forest and its state; the state file is replaced last.
+    """
+    state_dir = Path(state_dir)
+    state_dir.mkdir(parents=True, exist_ok=True)
+
+    joblib.dump(model, state_dir / MODEL_FILE)
+
+    tmp_path = state_dir / (STATE_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    tmp_path.replace(state_dir / STATE_FILE)
+
+
+def _update_reference(reference: dict, X_new: np.ndarray):
+    """
+    Merge X_new into the running per-feature mean / variance (Chan et al.).
+    """
+    n_a = reference["count"]
+    n_b = len(X_new)
+    mean_a = np.asarray(reference["mean"])
+    m2_a = np.asarray(reference["m2"])
+
+    mean_b = X_new.mean(axis=0, dtype=np.float64)
+    m2_b = ((X_new - mean_b) ** 2).sum(axis=0, dtype=np.float64)
+
+    n = n_a + n_b
+    delta = mean_b - mean_a
+
+    reference["count"] = n
+    reference["mean"] = (mean_a + delta * n_b / n).tolist()
+    reference["m2"] = (m2_a + m2_b + delta ** 2 * n_a * n_b / n).tolist()
+
+
+def check_drift(
+    model,
+    X_new: np.ndarray,
+    y_new: np.ndarray,
+    state: dict,
+    accuracy_drop: float = DRIFT_ACCURACY_DROP,
+    mean_shift: float = DRIFT_MEAN_SHIFT
+) -> dict:
+    """
+    Score the current model on new rows before it learns from them.
+
+    Returns
+    -------
+    dict
+        Prequential accuracy / ROC AUC, largest feature mean shift and
+        whether either crosses its drift threshold
+    """
+    y_pred = model.predict(X_new)
+    accuracy = float((y_pred == y_new).mean())
+
+    roc_auc = None
+    if len(np.unique(y_new)) == 2 and len(model.classes_) == 2:
+        roc_auc = float(roc_auc_score(y_new, model.predict_proba(X_new)[:, 1]))
+
+    reference = state["reference"]
+    shift = 0.0
+    if reference["count"] > 1:
+        std = np.sqrt(np.asarray(reference["m2"]) / (reference["count"] - 1))
+        z = np.abs(X_new.mean(axis=0) - np.asarray(reference["mean"])) / np.maximum(std, 1e-9)
+        shift = float(z.max())
+
+    baseline = state["baseline_accuracy"]
+    accuracy_drift = baseline is not None and baseline - accuracy > accuracy_drop
+
+    return {
+        "update": state["n_updates"] + 1,
+        "rows": int(len(y_new)),
+        "accuracy": accuracy,
+        "roc_auc": roc_auc,
+        "baseline_accuracy": baseline,
+        "max_mean_shift": shift,
+        "drift": bool(accuracy_drift or shift > mean_shift)
+    }
+
+
+def update_forest(
+    model,
+    X_new: np.ndarray,
+    y_new: np.ndarray,
+    state: dict,
+    trees_per_update: int = INCREMENTAL_TREES_PER_UPDATE,
+    max_trees: int = INCREMENTAL_MAX_TREES,
+    extra_age_out: int = 0
+):
+    """
+    Grow trees_per_update trees on the new rows and age out old ones.
+
+    Parameters
+    ----------
+    model : RandomForestClassifier
+        Forest fitted earlier (modified in place)
+    X_new, y_new : numpy.ndarray
+        Rows added since the last update
+    state : dict
+        Model state; tree_birth is kept aligned with model.estimators_
+    trees_per_update : int, optional
+        Trees added per update
+    max_trees : int, optional
+        Forest size cap; the oldest trees are removed first
+    extra_age_out : int, optional
+        Additional oldest trees to drop, e.g. after drift
+
+    Returns
+    -------
+    RandomForestClassifier
+    """
+    update = state["n_updates"] + 1
+
+    model.set_params(
+        warm_start=True,
+        n_estimators=len(model.estimators_) + trees_per_update,
+        # A fresh seed per update, so new trees do not repeat earlier draws
+        random_state=RANDOM_STATE + update
+    )
+    model.fit(X_new, y_new)
+    state["tree_birth"] += [update] * trees_per_update
+
+    keep = min(max_trees, len(model.estimators_) - extra_age_out)
+    keep = max(keep, trees_per_update)
+    model.estimators_ = model.estimators_[-keep:]
+    model.n_estimators = len(model.estimators_)
+    state["tree_birth"] = state["tree_birth"][-keep:]
+
+    return model
+
+
+def export_if_changed(model, n_features: int, state: dict, output_path: Path = ONNX_MODEL_PATH) -> bool:
+    """
+    Re-export to ONNX only if the forest differs from the last export.
+
+    Returns
+    -------
+    bool
+        True if a new ONNX file was written
+    """
+    output_path = Path(output_path)
+    model_hash = model_fingerprint(model)
+
+    if model_hash == state.get("exported_hash") and output_path.exists():
+        print(f" Model unchanged ({model_hash[:12]}), ONNX export skipped.")
+        return False
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    export_model_to_onnx(model, n_features, output_path)
+    state["exported_hash"] = model_hash
+
+    return True
+
+
+def run_incremental_update(
+    X,
+    y,
+    state_dir: Path = MODEL_STATE_DIR,
+    onnx_path: Path | None = ONNX_MODEL_PATH,
+    trees_per_update: int = INCREMENTAL_TREES_PER_UPDATE,
+    max_trees: int = INCREMENTAL_MAX_TREES,
+    min_new_rows: int = INCREMENTAL_MIN_NEW_ROWS,
+    model_params: dict | None = None,
+    preprocessing: dict | None = None
+):
+    """
+    Bring the persisted forest up to date with the rows of X / y it has not seen.
+
+    The first run fits max_trees trees on all rows, with the same
+    parameters main.py trains with. Later runs train only
+    on the new rows, and do nothing if fewer than min_new_rows arrived.
+
+    Parameters
+    ----------
+    X : pd.DataFrame | numpy.ndarray
+        Full time-ordered feature history
+    y : pd.Series | numpy.ndarray
+        Labels
+    state_dir : Path, optional
+        Where the model and state are persisted
+    onnx_path : Path | None, optional
+        ONNX export target; None to skip exporting
+    trees_per_update, max_trees, min_new_rows
+        See the INCREMENTAL_* settings
+    model_params : dict | None
+        Overrides of MODEL_PARAMS["random_forest"]; by default the tuned
+        parameters of python -m models.tuning, if any. n_estimators is
+        always max_trees.
+    preprocessing : dict | None
+        Imputer statistics and label thresholds X / y were built with;
+        stored on the first fit. If they differ from the stored ones, the
+        old rows have changed and the forest is refitted from scratch.
+
+    Returns
+    -------
+    model : RandomForestClassifier
+    report : dict
+        What the run did, with the drift check of this update if any
+    """
+    X = np.ascontiguousarray(np.asarray(X, dtype=np.float32))
+    y = np.asarray(y).astype(np.int64)
+
+    model, state = load_model_state(state_dir)
+    report = {"action": None, "drift": None}
+
+    if preprocessing is not None:
+        # Compare in the form the state file stores
+        preprocessing = json.loads(json.dumps(preprocessing))
+        if model is not None and state.get("preprocessing") != preprocessing:
+            print(" Preprocessing statistics differ from the persisted model's, retraining from scratch")
+            model = None
+
+    if model is None:
+        if model_params is None:
+            from models.tuning import load_best_params
+
+            model_params = load_best_params(backend="random_forest")
+
+        state = _new_state(X.shape[1])
+        state["preprocessing"] = preprocessing
+        model = build_model(
+            "random_forest",
+            random_state=RANDOM_STATE,
+            **{**model_params, "n_estimators": max_trees}
+        )
+        model.fit(X, y)
+        state["tree_birth"] = [0] * max_trees
+        _update_reference(state["reference"], X)
+        state["n_rows_seen"] = len(X)
+        report["action"] = "initial_fit"
+        print(f" Initial forest: {max_trees} trees on {len(X)} rows")
+
+    else:
+        if X.shape[1] != model.n_features_in_:
+            raise ValueError(
+                f"Feature count changed ({model.n_features_in_} -> {X.shape[1]}); "
+                f"delete {state_dir} to retrain from scratch"
+            )
+
+        X_new = X[state["n_rows_seen"]:]
+        y_new = y[state["n_rows_seen"]:]
+
+        if len(X_new) < min_new_rows:
+            report["action"] = "skipped"
+            print(f" {len(X_new)} new rows (< {min_new_rows}), model not updated")
+        elif len(np.unique(y_new)) < 2:
+            # New trees must see both classes to stay compatible with the forest;
+            # the rows stay pending for the next update
+            report["action"] = "skipped"
+            print(f" {len(X_new)} new rows hold a single class, model not updated")
+        else:
+            drift = check_drift(model, X_new, y_new, state)
+            update_forest(
+                model, X_new, y_new, state,
+                trees_per_update=trees_per_update,
+                max_trees=max_trees,
+                extra_age_out=trees_per_update if drift["drift"] else 0
+            )
+
+            baseline = state["baseline_accuracy"]
+            state["baseline_accuracy"] = drift["accuracy"] if baseline is None else (
+                BASELINE_ALPHA * drift["accuracy"] + (1 - BASELINE_ALPHA) * baseline
+            )
+            state["drift_history"] = (state["drift_history"] + [drift])[-DRIFT_HISTORY_LENGTH:]
+            _update_reference(state["reference"], X_new)
+            state["n_rows_seen"] = len(X)
+            state["n_updates"] += 1
+
+            report.update(action="updated", drift=drift)
+            print(
+                f" Update {state['n_updates']}: {len(X_new)} new rows, "
+                f"prequential accuracy {drift['accuracy']:.3f}, "
+                f"mean shift {drift['max_mean_shift']:.2f}"
+                + (" - DRIFT, aging out extra trees" if drift["drift"] else "")
+            )
+
+    state["model_hash"] = model_fingerprint(model)
+
+    if onnx_path is not None:
+        report["exported"] = export_if_changed(model, X.shape[1], state, onnx_path)
+
+    save_model_state(model, state, state_dir)
+    report["n_trees"] = len(model.estimators_)
+
+    return model, report
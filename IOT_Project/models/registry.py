@@ -0,0 +1,81 @@
+"""
+Model Registry
+
+This module maps backend names to model builders so the classifier is
+selected from config (MODEL_BACKEND / MODEL_PARAMS) instead of being
+hardcoded:
+- random_forest          : RandomForestClassifier (original model)
+- hist_gradient_boosting : HistGradientBoostingClassifier, trained on
+                           float32 inputs binned into at most max_bins
+                           levels, with early stopping
+
+Every registered backend must be convertible by export_model_to_onnx.
+"""
+
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+
+from config.setting import MODEL_BACKEND, MODEL_PARAMS, RANDOM_STATE
+
+
+_BACKENDS = {}
+
+
+def register_backend(name: str):
+    """
+    Decorator registering a builder(random_state, **params) -> estimator.
+    """
+    def decorator(builder):
+        _BACKENDS[name] = builder
+        return builder
+
+    return decorator
+
+
+@register_backend("random_forest")
+def _build_random_forest(random_state, **params):
+    return RandomForestClassifier(random_state=random_state, **params)
+
+
+@register_backend("hist_gradient_boosting")
+def _build_hist_gradient_boosting(random_state, **params):
+    return HistGradientBoostingClassifier(random_state=random_state, **params)
+
+
+def available_backends() -> list:
+    return sorted(_BACKENDS)
+
+
+def build_model(backend: str = MODEL_BACKEND, random_state: int = RANDOM_STATE, **overrides):
+    """
+    Unfitted estimator for a backend.
+
+    Parameters
+    ----------
+    backend : str, optional
+        Registered backend name, by default MODEL_BACKEND
+    random_state : int, optional
+        Random seed
+    **overrides
+        Replace entries of MODEL_PARAMS[backend]
+
+    Returns
+    -------
+    sklearn estimator
+    """
+    if backend not in _BACKENDS:
+        raise ValueError(f"Unknown model backend '{backend}'. Available: {available_backends()}")
+
+    params = {**MODEL_PARAMS.get(backend, {}), **overrides}
+
+    return _BACKENDS[backend](random_state, **params)
+
+
+def prepare_features(X):
+    """
+    Contiguous float32 matrix, the dtype ONNX inference uses too.
+
+    Training on float32 keeps split thresholds identical between the
+    sklearn model and its ONNX export.
+    """
+    return np.ascontiguousarray(np.asarray(X, dtype=np.float32))
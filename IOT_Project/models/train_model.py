@@ -1,23 +1,31 @@
 """
 Model Training Module
 
-This module trains a Random Forest classifier
+This module trains the configured classifier (Random Forest by default)
 for time-aware air quality prediction.
+Backends are selected through models.registry.
 """
 
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report
 
+from config.setting import FEATURE_STORE_DIR, MODEL_BACKEND, RANDOM_STATE
+from preprocessing.feature_store import load_feature_store
+from models.registry import build_model, prepare_features
+from utils.instrumentation import instrumented
 
-def train_random_forest(
+
+@instrumented("train")
+def train_model(
     X: pd.DataFrame,
     y: pd.Series,
-    train_ratio: float = 0.8,   
-    random_state: int = 42
+    train_ratio: float = 0.8,
+    random_state: int = RANDOM_STATE,
+    backend: str = MODEL_BACKEND,
+    **params
 ):
     """
-    Train Random Forest model using time-based split.
+    Train the configured backend using time-based split.
 
     Parameters
     ----------
@@ -29,40 +37,80 @@ def train_random_forest(
         Train/Test split ratio, by default 0.8
     random_state : int, optional
         Random seed
+    backend : str, optional
+        Registered backend, by default MODEL_BACKEND
+    **params
+        Override the backend's MODEL_PARAMS
 
     Returns
     -------
-    model : RandomForestClassifier
+    model : estimator
         Trained model
-    X_test : pd.DataFrame
-        Test features
-    y_test : pd.Series
-        Test labels
+    X_train, X_test : pd.DataFrame
+        Train / test features
+    y_train, y_test : pd.Series
+        Train / test labels
     y_pred : array
         Predicted labels
     y_prob : array
         Predicted probabilities
     """
-
     split_index = int(len(X) * train_ratio)
 
     # Time-based split
     X_train, X_test = X.iloc[:split_index], X.iloc[split_index:]
     y_train, y_test = y.iloc[:split_index], y.iloc[split_index:]
 
-    model = RandomForestClassifier(
-        n_estimators=100,
-        max_depth=None,
-        random_state=42,
-        n_jobs=-1
-    )
-
-    model.fit(X_train, y_train)
+    model = build_model(backend, random_state=random_state, **params)
+    model.fit(prepare_features(X_train), y_train)
 
-    y_pred = model.predict(X_test)
-    y_prob = model.predict_proba(X_test)[:, 1]  # Probability of Unhealthy
+    X_test_values = prepare_features(X_test)
+    y_pred = model.predict(X_test_values)
+    y_prob = model.predict_proba(X_test_values)[:, 1]  # Probability of Unhealthy
 
-    print("Classification Report:")
+    print(f"Classification Report ({backend}):")
     print(classification_report(y_test, y_pred))
 
     return model, X_train, X_test, y_train, y_test, y_pred, y_prob
+
+
+def train_random_forest(
+    X: pd.DataFrame,
+    y: pd.Series,
+    train_ratio: float = 0.8,
+    random_state: int = 42
+):
+    """
+    Train Random Forest model using time-based split.
+
+    Kept for existing callers; same as train_model(backend="random_forest").
+
+    Returns
+    -------
+    Same tuple as train_model
+    """
+    return train_model(
+        X, y, train_ratio=train_ratio, random_state=random_state, backend="random_forest"
+    )
+
+
+def train_from_feature_store(store_dir=FEATURE_STORE_DIR, **kwargs):
+    """
+    Train directly from the binary feature store, skipping raw data.
+
+    Parameters
+    ----------
+    store_dir : Path, optional
+        Feature store written by save_feature_store
+    **kwargs
+        Forwarded to train_model
+
+    Returns
+    -------
+    Same tuple as train_model
+    """
+    X, y, manifest = load_feature_store(store_dir)
+
+    print(f"Loaded {manifest['n_rows']} rows from feature store: {store_dir}")
+
+    return train_model(X=X, y=y, **kwargs)
@@ -0,0 +1,287 @@
+"""
+Hyperparameter Tuning
+
+This module searches model hyperparameters with successive halving over
+walk-forward folds:
+- Candidates are sampled from TUNING_SPACE[backend]
+- Rung k trains every surviving candidate on the most recent
+  min_rows * factor**k rows of each fold's training window; the best
+  1 / factor advance to the next rung
+- Trials of a rung run in parallel worker processes, each with a bounded
+  thread count, all reading one memory-mapped feature store, so the
+  data is parsed and preprocessed once for the whole search
+- Every finished trial is appended to trials.jsonl; rerunning the same
+  search skips trials that are already recorded
+
+The score of a trial is the mean ROC AUC over its folds. Folds only
+cover the leading TRAIN_TEST_SPLIT_RATIO of the rows, so the test split
+main.py reports on is never used for tuning.
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import ParameterSampler
+from threadpoolctl import threadpool_limits
+
+from config.setting import (
+    FEATURE_STORE_DIR,
+    MAX_WORKERS,
+    MODEL_BACKEND,
+    MODEL_PARAMS,
+    RANDOM_STATE,
+    TRAIN_TEST_SPLIT_RATIO,
+    BACKTEST_GAP,
+    TUNING_DIR,
+    TUNING_N_CANDIDATES,
+    TUNING_FACTOR,
+    TUNING_N_FOLDS,
+    TUNING_MIN_ROWS,
+    TUNING_SPACE
+)
+from models.backtest import make_walk_forward_folds
+from models.registry import build_model
+from preprocessing.feature_store import load_feature_store, FEATURES_FILE, LABELS_FILE
+
+
+TRIALS_FILE = "trials.jsonl"
+BEST_PARAMS_FILE = "best_params.json"
+
+
+def search_id(backend: str, space: dict, settings: dict, manifest: dict) -> str:
+    """
+    Identifier of a search; trials are only reused under the same id.
+    """
+    key = json.dumps({
+        "backend": backend,
+        "space": space,
+        "settings": settings,
+        "data": [manifest["created_at"], manifest["n_rows"], manifest["feature_names"]]
+    }, sort_keys=True, default=str)
+
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def load_trials(trials_path: Path, search: str) -> dict:
+    """
+    Recorded trials of one search, keyed by (candidate, rung).
+    """
+    trials = {}
+    trials_path = Path(trials_path)
+    if not trials_path.exists():
+        return trials
+
+    with open(trials_path) as f:
+        for line in f:
+            try:
+                trial = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partial line from an interrupted write
+            if trial.get("search_id") == search:
+                trials[(trial["candidate"], trial["rung"])] = trial
+
+    return trials
+
+
+def _run_trial(store_dir, backend: str, params: dict, folds: list, n_rows: int, n_threads: int) -> dict:
+    """
+    Score one candidate at one budget; runs in a worker process.
+    """
+    X = np.load(Path(store_dir) / FEATURES_FILE, mmap_mode="r")
+    y = np.load(Path(store_dir) / LABELS_FILE, mmap_mode="r")
+    if y.ndim == 2:
+        y = y[:, 0]
+
+    overrides = dict(params)
+    if "n_jobs" in MODEL_PARAMS.get(backend, {}):
+        overrides["n_jobs"] = n_threads
+
+    start = time.perf_counter()
+    fold_scores = []
+    with threadpool_limits(n_threads):
+        for fold in folds:
+            train_start = max(fold["train_start"], fold["train_end"] - n_rows)
+            y_train = y[train_start:fold["train_end"]]
+            y_test = np.asarray(y[fold["test_start"]:fold["test_end"]])
+
+            if len(np.unique(y_train)) < 2 or len(np.unique(y_test)) < 2:
+                continue
+
+            model = build_model(backend, random_state=RANDOM_STATE, **overrides)
+            model.fit(X[train_start:fold["train_end"]], y_train)
+            y_prob = model.predict_proba(X[fold["test_start"]:fold["test_end"]])[:, 1]
+            fold_scores.append(float(roc_auc_score(y_test, y_prob)))
+
+    return {
+        "score": float(np.mean(fold_scores)) if fold_scores else float("nan"),
+        "fold_scores": fold_scores,
+        "seconds": time.perf_counter() - start
+    }
+
+
+def successive_halving(
+    store_dir: Path = FEATURE_STORE_DIR,
+    backend: str = MODEL_BACKEND,
+    space: dict | None = None,
+    n_candidates: int = TUNING_N_CANDIDATES,
+    factor: int = TUNING_FACTOR,
+    n_folds: int = TUNING_N_FOLDS,
+    min_rows: int | None = TUNING_MIN_ROWS,
+    max_workers: int | None = MAX_WORKERS,
+    output_dir: Path = TUNING_DIR,
+    train_ratio: float = TRAIN_TEST_SPLIT_RATIO
+) -> dict:
+    """
+    Successive-halving search over walk-forward folds.
+
+    Parameters
+    ----------
+    store_dir : Path, optional
+        Feature store to tune on (written by main.py)
+    backend : str, optional
+        Registered model backend
+    space : dict | None
+        Parameter lists; TUNING_SPACE[backend] if None
+    n_candidates : int, optional
+        Candidates in the first rung
+    factor : int, optional
+        Halving factor: 1 / factor of the candidates advance, with factor
+        times the training rows
+    n_folds : int, optional
+        Walk-forward folds per trial
+    min_rows : int | None, optional
+        Training rows per fold in the first rung
+    max_workers : int | None, optional
+        Core budget shared by parallel trials
+    output_dir : Path, optional
+        Holds trials.jsonl and best_params.json
+    train_ratio : float, optional
+        Leading share of the rows the folds are built from; the rest is
+        main.py's test split
+
+    Returns
+    -------
+    dict
+        Best parameters, their score and the search id
+    """
+    space = space or TUNING_SPACE[backend]
+    _, y, manifest = load_feature_store(store_dir)
+
+    # Keep main.py's test split out of the search
+    train_rows = int(len(y) * train_ratio)
+    folds = make_walk_forward_folds(train_rows, n_folds=n_folds, mode="expanding", gap=BACKTEST_GAP)
+    max_rows = max(f["train_end"] - f["train_start"] for f in folds)
+
+    n_rungs = max(1, int(np.floor(np.log(n_candidates) / np.log(factor))) + 1)
+    min_rows = min_rows or max(100, max_rows // factor ** (n_rungs - 1))
+
+    candidates = list(ParameterSampler(space, n_iter=n_candidates, random_state=RANDOM_STATE))
+
+    settings = {
+        "n_candidates": n_candidates,
+        "factor": factor,
+        "n_folds": n_folds,
+        "min_rows": min_rows,
+        "train_rows": train_rows
+    }
+    search = search_id(backend, space, settings, manifest)
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    trials_path = output_dir / TRIALS_FILE
+    trials = load_trials(trials_path, search)
+    if trials:
+        print(f" Resuming search {search}: {len(trials)} trials already recorded")
+
+    n_cores = max_workers or os.cpu_count()
+    survivors = list(range(len(candidates)))
+
+    for rung in range(n_rungs):
+        n_rows = min(max_rows, min_rows * factor ** rung)
+        pending = [c for c in survivors if (c, rung) not in trials]
+
+        n_workers = max(1, min(len(pending), n_cores))
+        n_threads = max(1, n_cores // n_workers)
+        print(
+            f" Rung {rung}: {len(survivors)} candidates x {n_rows} rows "
+            f"({len(pending)} to run, {n_workers} workers x {n_threads} threads)"
+        )
+
+        if pending:
+            with ProcessPoolExecutor(max_workers=n_workers) as pool, open(trials_path, "a") as log:
+                futures = {
+                    pool.submit(_run_trial, store_dir, backend, candidates[c], folds, n_rows, n_threads): c
+                    for c in pending
+                }
+                for future in as_completed(futures):
+                    c = futures[future]
+                    trial = {
+                        "search_id": search,
+                        "backend": backend,
+                        "candidate": c,
+                        "rung": rung,
+                        "n_rows": n_rows,
+                        "params": candidates[c],
+                        **future.result()
+                    }
+                    # One line per trial, flushed at once so an interrupt loses at most this trial
+                    log.write(json.dumps(trial, default=str) + "\n")
+                    log.flush()
+                    trials[(c, rung)] = trial
+
+        scores = {c: trials[(c, rung)]["score"] for c in survivors}
+        ranked = sorted(survivors, key=lambda c: -np.nan_to_num(scores[c], nan=-np.inf))
+
+        if rung == n_rungs - 1:
+            survivors = ranked[:1]
+        else:
+            survivors = ranked[:max(1, len(survivors) // factor)]
+
+    best = survivors[0]
+    best_trial = trials[(best, n_rungs - 1)]
+    result = {
+        "search_id": search,
+        "backend": backend,
+        "params": candidates[best],
+        "score": best_trial["score"],
+        "n_rows": best_trial["n_rows"],
+        "train_rows": train_rows
+    }
+
+    with open(output_dir / BEST_PARAMS_FILE, "w") as f:
+        json.dump(result, f, indent=2, default=str)
+
+    print(f" Best {backend} parameters (ROC AUC {result['score']:.4f}): {result['params']}")
+
+    return result
+
+
+def load_best_params(output_dir: Path = TUNING_DIR, backend: str = MODEL_BACKEND) -> dict:
+    """
+    Tuned parameters of a backend, or {} if it has not been tuned.
+
+    Results without a train_rows cutoff come from searches that also
+    scored on the test split and are ignored.
+    """
+    path = Path(output_dir) / BEST_PARAMS_FILE
+    if not path.exists():
+        return {}
+
+    with open(path) as f:
+        best = json.load(f)
+
+    if "train_rows" not in best:
+        print(f" {path} was tuned on the test split too, ignored; rerun python -m models.tuning")
+        return {}
+
+    return best["params"] if best["backend"] == backend else {}
+
+
+if __name__ == "__main__":
+    successive_halving()
@@ -7,10 +7,22 @@ This module is responsible for:
 - Creating final feature matrix for modeling
 """
 
+import numpy as np
 import pandas as pd
 
+from preprocessing.timestamps import (
+    MISSING_EPOCH,
+    build_epoch_timestamps,
+    calendar_features_from_epoch,
+    epoch_from_datetime
+)
+
 
-def extract_time_features(df: pd.DataFrame, timestamp_col: str) -> pd.DataFrame:
+def extract_time_features(
+    df: pd.DataFrame,
+    timestamp_col: str,
+    time_col: str | None = None
+) -> pd.DataFrame:
     """
     Extract temporal features from timestamp column.
 
@@ -19,27 +31,34 @@ def extract_time_features(df: pd.DataFrame, timestamp_col: str) -> pd.DataFrame:
     df : pd.DataFrame
         Input dataframe containing timestamp column
     timestamp_col : str
-        Name of the timestamp column
+        Name of the timestamp column: either already datetime64, or a
+        Date string column parsed with an explicit format
+    time_col : str | None, optional
+        Time string column combined with a Date string column; without
+        it every row is taken at midnight
 
     Returns
     -------
     pd.DataFrame
-        DataFrame with added temporal features
+        DataFrame with added temporal features, timestamp_col as datetime64
     """
 
-    df = df.copy()
+    df = df.copy(deep=False)
 
-    df[timestamp_col] = pd.to_datetime(
-        df[timestamp_col],
-        dayfirst=True,
-        errors="coerce"
-)
+    if pd.api.types.is_datetime64_any_dtype(df[timestamp_col]):
+        epoch = epoch_from_datetime(df[timestamp_col])
+    else:
+        epoch = build_epoch_timestamps(
+            df[timestamp_col],
+            None if time_col is None else df[time_col]
+        )
 
+    timestamp = epoch.astype("datetime64[s]")
+    timestamp[epoch == MISSING_EPOCH] = np.datetime64("NaT")
+    df[timestamp_col] = timestamp
 
-    df["hour"] = df[timestamp_col].dt.hour
-    df["day_of_week"] = df[timestamp_col].dt.dayofweek
-    df["month"] = df[timestamp_col].dt.month
-    df["is_weekend"] = df["day_of_week"].isin([5, 6]).astype(int)
+    for name, values in calendar_features_from_epoch(epoch).items():
+        df[name] = values
 
     return df
 
@@ -0,0 +1,125 @@
+"""
+Feature Store
+
+This module persists the preprocessed feature matrix and labels as
+typed binary arrays so training can start without touching raw data:
+- X.npy : float32 matrix (n_rows, n_features), C-contiguous
+- y.npy : int8 label vector (or matrix for several horizons)
+- manifest.json : feature names, dtypes, shapes, horizon and label config
+
+Arrays are loaded with numpy memory-mapping, so nothing is parsed or
+copied until the model reads it.
+"""
+
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config.setting import FEATURE_STORE_DIR
+from exceptions.custom_exceptions import DataNotFoundError
+
+
+MANIFEST_NAME = "manifest.json"
+FEATURES_FILE = "X.npy"
+LABELS_FILE = "y.npy"
+
+
+def save_feature_store(
+    X: pd.DataFrame,
+    y,
+    store_dir: Path = FEATURE_STORE_DIR,
+    metadata: dict | None = None
+) -> Path:
+    """
+    Save X / y as typed arrays plus a manifest.
+
+    Parameters
+    ----------
+    X : pd.DataFrame
+        Feature matrix
+    y : pd.Series | pd.DataFrame
+        Labels (one column per horizon if a DataFrame)
+    store_dir : Path, optional
+        Target directory, by default FEATURE_STORE_DIR
+    metadata : dict | None
+        Extra manifest entries, e.g. horizon and label config
+
+    Returns
+    -------
+    Path
+        Path of the written manifest
+    """
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+
+    X_values = np.ascontiguousarray(X.to_numpy(dtype=np.float32))
+    y_values = np.ascontiguousarray(y.to_numpy(dtype=np.int8))
+
+    np.save(store_dir / FEATURES_FILE, X_values)
+    np.save(store_dir / LABELS_FILE, y_values)
+
+    label_names = list(y.columns) if isinstance(y, pd.DataFrame) else [y.name]
+
+    manifest = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "n_rows": int(X_values.shape[0]),
+        "feature_names": [str(c) for c in X.columns],
+        "label_names": [None if n is None else str(n) for n in label_names],
+        "features": {"file": FEATURES_FILE, "dtype": "float32",
+                     "shape": list(X_values.shape)},
+        "labels": {"file": LABELS_FILE, "dtype": "int8",
+                   "shape": list(y_values.shape)},
+        **(metadata or {})
+    }
+
+    manifest_path = store_dir / MANIFEST_NAME
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest_path
+
+
+def load_feature_store(store_dir: Path = FEATURE_STORE_DIR, mmap: bool = True):
+    """
+    Load X / y from the feature store.
+
+    Parameters
+    ----------
+    store_dir : Path, optional
+        Store directory, by default FEATURE_STORE_DIR
+    mmap : bool, optional
+        Memory-map the arrays read-only instead of reading them into RAM
+
+    Returns
+    -------
+    X : pd.DataFrame
+        Feature matrix backed by the (memory-mapped) array
+    y : pd.Series | pd.DataFrame
+        Labels
+    manifest : dict
+    """
+    store_dir = Path(store_dir)
+    manifest_path = store_dir / MANIFEST_NAME
+    if not manifest_path.exists():
+        raise DataNotFoundError(f"No feature store found at {store_dir}")
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    mmap_mode = "r" if mmap else None
+    X_values = np.load(store_dir / manifest["features"]["file"], mmap_mode=mmap_mode)
+    y_values = np.load(store_dir / manifest["labels"]["file"], mmap_mode=mmap_mode)
+
+    # copy=False keeps the DataFrame a view over the memory map
+    X = pd.DataFrame(X_values, columns=manifest["feature_names"], copy=False)
+
+    label_names = manifest["label_names"]
+    if y_values.ndim == 2:
+        y = pd.DataFrame(y_values, columns=label_names, copy=False)
+    else:
+        y = pd.Series(y_values, name=label_names[0], copy=False)
+
+    return X, y, manifest
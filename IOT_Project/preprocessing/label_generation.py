@@ -5,58 +5,175 @@ This module generates future air quality labels
 based on sensor thresholds at t + 1 hour.
 """
 
+import numpy as np
 import pandas as pd
 
+from config.setting import LABEL_THRESHOLD_MODE, LABEL_THRESHOLD_WINDOW
+from preprocessing.streaming_quantile import P2Quantile, RollingP2Quantile
+
+
+# Future values above this quantile of the series are labelled unhealthy
+UNHEALTHY_QUANTILE = 0.75
+
+# Placeholder for rows whose future value lies past the end of the data
+INVALID_LABEL = -1
+
+
+def _causal_thresholds(values, mode, window, estimator):
+    """
+    Threshold known at each row, using only values up to and including it.
+    """
+    if estimator is None:
+        if mode == "expanding":
+            estimator = P2Quantile(UNHEALTHY_QUANTILE)
+        else:
+            estimator = RollingP2Quantile(UNHEALTHY_QUANTILE, window)
+
+    return estimator.update_many(values), estimator
+
 
 def generate_future_labels(
     df: pd.DataFrame,
     target_columns: list,
-    horizon: int = 1
+    horizon: int = 1,
+    threshold_mode: str = LABEL_THRESHOLD_MODE,
+    threshold_window: int = LABEL_THRESHOLD_WINDOW,
+    estimators: dict | None = None,
+    thresholds: dict | None = None
 ) -> pd.Series:
-    
+    """
+    Generate binary labels for future air quality condition.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Input dataframe sorted by time
+    target_columns : list
+        Pollutant columns used for labeling (e.g. CO, NO2)
+    horizon : int, optional
+        Prediction horizon in hours, by default 1
+    threshold_mode : str, optional
+        "global"    - UNHEALTHY_QUANTILE of the whole series (sees the future)
+        "expanding" - streaming estimate over all data up to each row
+        "rolling"   - streaming estimate over roughly the last
+                      threshold_window rows
+    threshold_window : int, optional
+        Window length for "rolling"
+    estimators : dict | None
+        Column -> streaming estimator, updated in place. Pass the same dict
+        for consecutive chunks (or restore it with
+        quantile_estimator_from_dict) to continue thresholds without
+        revisiting earlier history.
+    thresholds : dict | None
+        Column -> fixed "global" threshold, e.g. from global_thresholds on
+        an earlier fit; None computes them from df
+
+    Returns
+    -------
+    pd.Series
+        Binary labels (0 = Healthy, 1 = Unhealthy)
+    """
+    if threshold_mode not in ("global", "expanding", "rolling"):
+        raise ValueError(f"Unknown threshold mode '{threshold_mode}'")
+
     future_df = df[target_columns].shift(-horizon)
 
     unhealthy = pd.Series(False, index=df.index)
 
     for col in target_columns:
-        dynamic_threshold = df[col].quantile(0.75)    #حد آستانه به صورت داینامیک ایجاد می شود
+        if threshold_mode == "global" and thresholds is not None:
+            dynamic_threshold = thresholds[col]
+        elif threshold_mode == "global":
+            dynamic_threshold = df[col].quantile(UNHEALTHY_QUANTILE)    #حد آستانه به صورت داینامیک ایجاد می شود
+        else:
+            estimator = None if estimators is None else estimators.get(col)
+            dynamic_threshold, estimator = _causal_thresholds(
+                df[col].to_numpy(), threshold_mode, threshold_window, estimator
+            )
+            if estimators is not None:
+                estimators[col] = estimator
+
         unhealthy |= future_df[col] > dynamic_threshold
 
     return unhealthy.astype(int)
+
+
+def generate_multi_horizon_labels(
+    df: pd.DataFrame,
+    target_columns: list,
+    horizons: list,
+    threshold_mode: str = LABEL_THRESHOLD_MODE,
+    threshold_window: int = LABEL_THRESHOLD_WINDOW,
+    estimators: dict | None = None,
+    thresholds: dict | None = None
+) -> pd.DataFrame:
     """
-    Generate binary labels for future air quality condition.
+    Generate labels for several horizons from one pass over the data.
+
+    Thresholds are computed once per target column and every horizon is a
+    shifted view of the same value buffer, so nothing is re-sorted or
+    copied per horizon.
 
     Parameters
     ----------
     df : pd.DataFrame
         Input dataframe sorted by time
     target_columns : list
-        Pollutant columns used for labeling (e.g. CO, NO2)
-    thresholds : dict
-        Threshold values for pollutants
-    horizon : int, optional
-        Prediction horizon in hours, by default 1
+        Pollutant columns used for labeling
+    horizons : list
+        Prediction horizons in hours, e.g. [1, 3, 6, 12, 24]
+    threshold_mode, threshold_window, estimators, thresholds
+        See generate_future_labels
 
     Returns
     -------
-    pd.Series
-        Binary labels (0 = Healthy, 1 = Unhealthy)
+    pd.DataFrame
+        int8 label matrix (n_rows, n_horizons), one column "t+h" per
+        horizon. The last h rows of each column have no future value and
+        hold INVALID_LABEL; use select_horizon to trim them.
     """
+    if threshold_mode not in ("global", "expanding", "rolling"):
+        raise ValueError(f"Unknown threshold mode '{threshold_mode}'")
 
-    """df = df.copy()
+    n_rows = len(df)
+    labels = np.zeros((n_rows, len(horizons)), dtype=np.int8)
 
-    # Shift target columns to future (t + horizon)
     for col in target_columns:
-        df[f"{col}_future"] = df[col].shift(-horizon)
+        values = df[col].to_numpy(dtype=np.float64)
 
-    # Initialize label as healthy
-    label = pd.Series(0, index=df.index)
+        if threshold_mode == "global":
+            fixed = df[col].quantile(UNHEALTHY_QUANTILE) if thresholds is None else thresholds[col]
+            column_thresholds = np.full(n_rows, fixed)
+        else:
+            estimator = None if estimators is None else estimators.get(col)
+            column_thresholds, estimator = _causal_thresholds(
+                values, threshold_mode, threshold_window, estimator
+            )
+            if estimators is not None:
+                estimators[col] = estimator
 
-    # Apply rule-based labeling
-    for col in target_columns:
-        label |= df[f"{col}_future"] > thresholds[col]
+        for j, h in enumerate(horizons):
+            valid = n_rows - h
+            if valid > 0:
+                labels[:valid, j] |= values[h:] > column_thresholds[:valid]
+
+    for j, h in enumerate(horizons):
+        labels[max(n_rows - h, 0):, j] = INVALID_LABEL
+
+    return pd.DataFrame(
+        labels,
+        index=df.index,
+        columns=[horizon_label_name(h) for h in horizons],
+        copy=False
+    )
+
+
+def global_thresholds(df: pd.DataFrame, target_columns: list) -> dict:
+    """
+    The "global" mode thresholds of df, to be passed back as thresholds.
+    """
+    return {col: float(df[col].quantile(UNHEALTHY_QUANTILE)) for col in target_columns}
 
-    # Convert boolean to int (0 / 1)
-    label = label.astype(int)
 
-    return label"""
+def horizon_label_name(horizon: int) -> str:
+    return f"t+{horizon}"
@@ -0,0 +1,220 @@
+"""
+Multi-Station Preprocessing
+
+This module runs loading, cleaning and preprocessing for many monitoring
+stations in parallel, one AirQualityUCI-format file per station:
+- Station files are discovered under RAW_DATA_DIR
+- Each station is processed in its own worker process
+- Results are written as per-station feature-store shards
+- A combined manifest records the outcome of every station
+
+A failing station is recorded in the manifest with its error type and
+does not stop the rest of the batch, whether it failed while parsing,
+while writing its shard or because its worker process died.
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+
+from config.setting import (
+    RAW_DATA_DIR,
+    STATION_FILE_PATTERN,
+    STATION_SHARDS_DIR,
+    MAX_WORKERS,
+    SENSOR_FEATURES,
+    TARGET_COLUMNS,
+    FORECAST_HORIZON,
+    USE_WINDOW_FEATURES,
+    WINDOW_FEATURES,
+    PREPROCESS_LOW_MEMORY,
+    RESAMPLE_HOURLY
+)
+from exceptions.custom_exceptions import (
+    DataNotFoundError,
+    DataValidationError,
+    EmptyDatasetError,
+    PreprocessingError
+)
+from data_acquisition.load_data import load_raw_air_quality_data
+from data_acquisition.cleaning import handle_missing_values
+from preprocessing.preprocess_data import preprocess_data
+from preprocessing.resampling import resample_hourly
+from preprocessing.feature_store import save_feature_store
+from preprocessing.label_generation import UNHEALTHY_QUANTILE
+
+
+# Expected failures raised by process_station; any other exception,
+# e.g. from save_feature_store or a BrokenProcessPool, is recorded too
+STATION_ERRORS = (
+    DataNotFoundError,
+    DataValidationError,
+    EmptyDatasetError,
+    PreprocessingError
+)
+
+MANIFEST_NAME = "manifest.json"
+
+
+def default_preprocess_kwargs() -> dict:
+    """
+    preprocess_data arguments used for every station, from config.
+    """
+    return {
+        "timestamp_col": "Date",
+        "time_col": "Time",
+        "sensor_features": SENSOR_FEATURES,
+        "target_columns": TARGET_COLUMNS,
+        "horizon": FORECAST_HORIZON,
+        "use_time_features": True,
+        "window_features": WINDOW_FEATURES if USE_WINDOW_FEATURES else None,
+        "low_memory": PREPROCESS_LOW_MEMORY
+    }
+
+
+def discover_station_files(raw_dir: Path = RAW_DATA_DIR, pattern: str = STATION_FILE_PATTERN) -> list:
+    """
+    List station files under raw_dir, sorted by name.
+    """
+    files = sorted(p for p in Path(raw_dir).glob(pattern) if p.is_file())
+    if not files:
+        raise DataNotFoundError(f"No station files matching '{pattern}' in {raw_dir}")
+
+    return files
+
+
+def process_station(data_path: Path, shard_dir: Path, preprocess_kwargs: dict) -> dict:
+    """
+    Load, resample, clean and preprocess one station and write its shard.
+
+    Runs inside a worker process. Every failure is raised as one of
+    STATION_ERRORS so the parent can record it.
+
+    Returns
+    -------
+    dict
+        Station summary for the combined manifest
+    """
+    data_path = Path(data_path)
+    if not data_path.exists():
+        raise DataNotFoundError(f"Station file not found: {data_path}")
+
+    try:
+        df_raw = load_raw_air_quality_data(data_path)
+    except Exception as e:
+        raise DataValidationError(f"Could not read {data_path.name}: {e}")
+
+    if df_raw.empty:
+        raise EmptyDatasetError(f"Station file is empty: {data_path}")
+
+    try:
+        if RESAMPLE_HOURLY:
+            df_raw = resample_hourly(df_raw)
+        df_clean = handle_missing_values(df_raw)
+        X, y = preprocess_data(df=df_clean, **preprocess_kwargs)
+    except STATION_ERRORS:
+        raise
+    except Exception as e:
+        raise PreprocessingError(f"Preprocessing failed for {data_path.name}: {e}")
+
+    if X.empty or y.empty:
+        raise EmptyDatasetError(f"Station {data_path.name} became empty after preprocessing.")
+
+    manifest_path = save_feature_store(
+        X,
+        y,
+        store_dir=shard_dir,
+        metadata={
+            "source": str(data_path),
+            "horizon": preprocess_kwargs["horizon"],
+            "window_features": preprocess_kwargs.get("window_features"),
+            "label_config": {
+                "target_columns": preprocess_kwargs["target_columns"],
+                "threshold_quantile": UNHEALTHY_QUANTILE
+            }
+        }
+    )
+
+    return {
+        "rows": int(len(X)),
+        "positive_rate": float(y.to_numpy().mean()),
+        "shard": str(manifest_path.parent)
+    }
+
+
+def run_multi_station(
+    raw_dir: Path = RAW_DATA_DIR,
+    shards_dir: Path = STATION_SHARDS_DIR,
+    pattern: str = STATION_FILE_PATTERN,
+    max_workers: int | None = MAX_WORKERS,
+    preprocess_kwargs: dict | None = None
+) -> dict:
+    """
+    Preprocess every station file in parallel.
+
+    Parameters
+    ----------
+    raw_dir : Path, optional
+        Directory searched for station files
+    shards_dir : Path, optional
+        Output directory; one feature-store shard per station
+    pattern : str, optional
+        Glob pattern for station files
+    max_workers : int | None, optional
+        Worker processes, by default one per core
+    preprocess_kwargs : dict | None
+        preprocess_data arguments; default_preprocess_kwargs() if None
+
+    Returns
+    -------
+    dict
+        Combined manifest (also written to shards_dir / manifest.json)
+    """
+    station_files = discover_station_files(raw_dir, pattern)
+    preprocess_kwargs = preprocess_kwargs or default_preprocess_kwargs()
+
+    shards_dir = Path(shards_dir)
+    shards_dir.mkdir(parents=True, exist_ok=True)
+
+    max_workers = max_workers or os.cpu_count()
+    print(f" Processing {len(station_files)} stations with {max_workers} workers...")
+
+    stations = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(process_station, path, shards_dir / path.stem, preprocess_kwargs): path
+            for path in station_files
+        }
+
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                summary = future.result()
+                stations[path.stem] = {"status": "ok", "source": str(path), **summary}
+                print(f"  {path.stem}: {summary['rows']} rows")
+            except Exception as e:
+                stations[path.stem] = {
+                    "status": "failed",
+                    "source": str(path),
+                    "error_type": type(e).__name__,
+                    "error": str(e)
+                }
+                print(f"  {path.stem}: FAILED ({type(e).__name__}: {e})")
+
+    n_failed = sum(s["status"] == "failed" for s in stations.values())
+    manifest = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "n_stations": len(stations),
+        "n_failed": n_failed,
+        "preprocess": preprocess_kwargs,
+        "stations": dict(sorted(stations.items()))
+    }
+
+    with open(shards_dir / MANIFEST_NAME, "w") as f:
+        json.dump(manifest, f, indent=2, default=str)
+
+    print(f" {len(stations) - n_failed}/{len(stations)} stations processed, manifest: {shards_dir / MANIFEST_NAME}")
+
+    return manifest
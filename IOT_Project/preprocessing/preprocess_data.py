@@ -5,6 +5,9 @@ This module combines feature engineering and label generation
 to prepare final datasets for model training.
 """
 
+import tracemalloc
+
+import numpy as np
 import pandas as pd
 
 from preprocessing.feature_engineering import (
@@ -12,20 +15,51 @@ from preprocessing.feature_engineering import (
     select_features
 )
 
-from preprocessing.label_generation import generate_future_labels
+from preprocessing.window_features import (
+    WindowFeatureEngine,
+    compute_window_features
+)
+from preprocessing.timestamps import (
+    MISSING_EPOCH,
+    build_epoch_timestamps,
+    calendar_features_from_epoch,
+    epoch_from_datetime
+)
+
+from preprocessing.label_generation import (
+    INVALID_LABEL,
+    generate_future_labels,
+    generate_multi_horizon_labels,
+    horizon_label_name
+)
+from preprocessing.resampling import READINGS_COLUMN, horizon_valid_mask
+from utils.instrumentation import instrumented
+
 
+# Rows per block when computing window features in low-memory mode
+LOW_MEMORY_BLOCK_ROWS = 65_536
 
+
+@instrumented("preprocess")
 def preprocess_data(
     df: pd.DataFrame,
     timestamp_col: str,
     sensor_features: list,
     target_columns: list,
-    horizon: int = 1,
-    use_time_features: bool = True
+    horizon: int | list = 1,
+    use_time_features: bool = True,
+    window_features: dict | None = None,
+    time_col: str | None = None,
+    low_memory: bool = False,
+    thresholds: dict | None = None
 ):
     """
     Full preprocessing pipeline.
 
+    Labels are read `horizon` rows ahead, so rows must be hourly. For a
+    frame from resample_hourly, rows whose own hour or future hour is a
+    gap (READINGS_COLUMN == 0) get no label and are dropped.
+
     Parameters
     ----------
     df : pd.DataFrame
@@ -36,26 +70,57 @@ def preprocess_data(
         Sensor feature column names
     target_columns : list
         Columns used for label generation
-    thresholds : dict
-        Thresholds for unhealthy air
-    horizon : int, optional
-        Prediction horizon in hours, by default 1
+    horizon : int | list, optional
+        Prediction horizon in hours, by default 1. A list such as
+        [1, 3, 6, 12, 24] builds all horizons from the same sorted frame
+        and feature matrix.
     use_time_features : bool, optional
         Whether to include temporal features, by default True
+    window_features : dict | None, optional
+        Lag / rolling-window feature spec passed to
+        compute_window_features (columns, lags, windows, stats,
+        ewm_spans, max_memory_mb); None adds no window features
+    time_col : str | None, optional
+        Time string column parsed together with a Date timestamp_col
+    low_memory : bool, optional
+        Build X directly into one preallocated float32 matrix instead of
+        copying the frame at every step (single horizon only), see
+        preprocess_data_low_memory
+    thresholds : dict | None, optional
+        Fixed unhealthy thresholds per target column for the "global"
+        label mode (see global_thresholds); None uses the quantile of df
 
     Returns
     -------
     X : pd.DataFrame
         Feature matrix
-    y : pd.Series
-        Labels
+    y : pd.Series | pd.DataFrame
+        Labels; for a list of horizons an int8 matrix with one "t+h"
+        column per horizon (see select_horizon)
     """
+    # Gap marker of resample_hourly: it selects rows, it is never a feature
+    feature_columns = list(sensor_features) + list((window_features or {}).get("columns", []))
+    if READINGS_COLUMN in feature_columns:
+        raise ValueError(f"{READINGS_COLUMN} marks resampling gaps and cannot be used as a feature")
+
+    if low_memory:
+        return preprocess_data_low_memory(
+            df=df,
+            timestamp_col=timestamp_col,
+            sensor_features=sensor_features,
+            target_columns=target_columns,
+            horizon=horizon,
+            use_time_features=use_time_features,
+            window_features=window_features,
+            time_col=time_col,
+            thresholds=thresholds
+        )
 
-    # 1. Sort by time (VERY IMPORTANT)
-    df = df.sort_values(by=timestamp_col).reset_index(drop=True)
+    # 1. Parse Date (+ Time) once and extract time-based features
+    df = extract_time_features(df, timestamp_col=timestamp_col, time_col=time_col)
 
-    # 2. Extract time-based features
-    df = extract_time_features(df, timestamp_col=timestamp_col)
+    # 2. Sort by time (VERY IMPORTANT); stable keeps duplicate timestamps in file order
+    df = df.sort_values(by=timestamp_col, kind="stable").reset_index(drop=True)
 
     # 3. Select final feature set
     X = select_features(
@@ -64,11 +129,20 @@ def preprocess_data(
         use_time_features=use_time_features
     )
 
+    # 3b. Lag / rolling-window features (causal, computed on sorted data)
+    if window_features:
+        W = compute_window_features(df=df, **window_features)
+        X = pd.concat([X, W], axis=1)
+
+    if isinstance(horizon, (list, tuple)):
+        return _preprocess_multi_horizon(df, X, target_columns, list(horizon), thresholds)
+
     # 4. Generate future labels
     y = generate_future_labels(
         df=df,
         target_columns=target_columns,
-        horizon=horizon
+        horizon=horizon,
+        thresholds=thresholds
     )
 
     # 5. Remove rows with NaN (last rows due to shifting)
@@ -76,8 +150,230 @@ def preprocess_data(
     X = X.iloc[:valid_length]
     y = y.iloc[:valid_length]
 
+    # 5b. On an hourly grid, drop rows labelled from or at a gap
+    keep = _gap_free_rows(df, horizon, valid_length)
+    if keep is not None:
+        X = X[keep].reset_index(drop=True)
+        y = y[keep].reset_index(drop=True)
+
     # 6. Final NA handling
     X = X.fillna(X.median())
     y = y.fillna(0).astype(int)
 
     return X, y
+
+
+def preprocess_data_low_memory(
+    df: pd.DataFrame,
+    timestamp_col: str,
+    sensor_features: list,
+    target_columns: list,
+    horizon: int = 1,
+    use_time_features: bool = True,
+    window_features: dict | None = None,
+    time_col: str | None = None,
+    thresholds: dict | None = None
+):
+    """
+    Low-memory variant of preprocess_data, same outputs.
+
+    - The input frame is never copied or sorted as a whole: timestamps are
+      parsed once and, only if they are not already monotonic, a sort
+      order is applied one column at a time
+    - Sensor, calendar and window features are written straight into one
+      preallocated float32 matrix of the final (trimmed) size
+    - Missing values are filled in place, column by column
+    - X wraps that matrix without a copy
+
+    Peak traced memory is printed and stored in X.attrs["peak_memory_mb"].
+
+    Parameters
+    ----------
+    See preprocess_data (horizon must be a single int)
+
+    Returns
+    -------
+    X : pd.DataFrame
+        float32 feature matrix
+    y : pd.Series
+        Labels
+    """
+    if isinstance(horizon, (list, tuple)):
+        raise ValueError("low_memory preprocessing supports a single horizon")
+
+    tracing = not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    # 1. Timestamps, and a sort order only when the data is out of order
+    if pd.api.types.is_datetime64_any_dtype(df[timestamp_col]):
+        epoch = epoch_from_datetime(df[timestamp_col])
+    else:
+        epoch = build_epoch_timestamps(
+            df[timestamp_col],
+            None if time_col is None else df[time_col]
+        )
+
+    # Unparseable timestamps sort last, like NaT in sort_values
+    sort_key = np.where(epoch == MISSING_EPOCH, np.iinfo(np.int64).max, epoch)
+
+    order = None
+    if len(sort_key) > 1 and not (sort_key[1:] >= sort_key[:-1]).all():
+        order = np.argsort(sort_key, kind="stable")
+        epoch = epoch[order]
+    del sort_key
+
+    def column(name):
+        values = df[name].to_numpy()
+        return values if order is None else values[order]
+
+    # 2. One preallocated float32 matrix for every feature
+    n_valid = max(len(df) - horizon, 0)
+
+    engine = None
+    if window_features:
+        spec = {k: v for k, v in window_features.items() if k != "max_memory_mb"}
+        engine = WindowFeatureEngine(**spec)
+
+    time_names = list(calendar_features_from_epoch(epoch[:0])) if use_time_features else []
+    window_names = engine.feature_names if engine else []
+    feature_names = list(sensor_features) + time_names + window_names
+
+    X_values = np.empty((n_valid, len(feature_names)), dtype=np.float32)
+
+    for j, name in enumerate(sensor_features):
+        X_values[:, j] = column(name)[:n_valid]
+
+    offset = len(sensor_features)
+    if use_time_features:
+        calendar = calendar_features_from_epoch(epoch[:n_valid])
+        for j, name in enumerate(time_names):
+            X_values[:, offset + j] = calendar[name]
+        offset += len(time_names)
+
+    if engine:
+        window_frame = pd.DataFrame(
+            {name: column(name)[:n_valid] for name in engine.columns},
+            copy=False
+        )
+        # Row blocks keep the engine's float64 working set small
+        for start in range(0, n_valid, LOW_MEMORY_BLOCK_ROWS):
+            stop = min(start + LOW_MEMORY_BLOCK_ROWS, n_valid)
+            engine.transform(window_frame.iloc[start:stop], out=X_values[start:stop, offset:])
+        del window_frame
+
+    # 3. Labels from the (small) sorted target columns only
+    targets = pd.DataFrame({name: column(name) for name in target_columns}, copy=False)
+    Y = generate_multi_horizon_labels(
+        df=targets,
+        target_columns=target_columns,
+        horizons=[horizon],
+        thresholds=thresholds
+    )
+    y = pd.Series(Y.iloc[:n_valid, 0].to_numpy(dtype=int), name=None)
+    del targets, Y
+
+    # 3b. On an hourly grid, drop rows labelled from or at a gap
+    if READINGS_COLUMN in df:
+        keep = horizon_valid_mask(column(READINGS_COLUMN) > 0, horizon)[:n_valid]
+        if not keep.all():
+            X_values = X_values[keep]
+            y = y[keep].reset_index(drop=True)
+
+    # 4. Fill remaining NaN in place with column medians
+    for j in range(X_values.shape[1]):
+        values = X_values[:, j]
+        missing = np.isnan(values)
+        if missing.any() and not missing.all():
+            values[missing] = np.median(values[~missing])
+
+    X = pd.DataFrame(X_values, columns=feature_names, copy=False)
+
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    if tracing:
+        tracemalloc.stop()
+
+    input_bytes = df.memory_usage(index=False).sum()
+    X.attrs["peak_memory_mb"] = peak / 1024 ** 2
+    print(
+        f" Low-memory preprocessing peak: {peak / 1024 ** 2:.1f} MB "
+        f"(input {input_bytes / 1024 ** 2:.1f} MB, X {X_values.nbytes / 1024 ** 2:.1f} MB, "
+        f"{peak / max(input_bytes + X_values.nbytes, 1):.2f}x input + X)"
+    )
+
+    return X, y
+
+
+def _gap_free_rows(df, horizon: int, valid_length: int):
+    """
+    Mask of the first valid_length rows to keep, or None to keep all.
+    """
+    if READINGS_COLUMN not in df:
+        return None
+
+    keep = horizon_valid_mask(df[READINGS_COLUMN].to_numpy() > 0, horizon)[:valid_length]
+
+    return None if keep.all() else keep
+
+
+def _preprocess_multi_horizon(df, X, target_columns, horizons, thresholds=None):
+    """
+    Label matrix for several horizons over one shared feature matrix.
+    """
+    Y = generate_multi_horizon_labels(
+        df=df,
+        target_columns=target_columns,
+        horizons=horizons,
+        thresholds=thresholds
+    )
+
+    # On an hourly grid, rows labelled from or at a gap have no label
+    if READINGS_COLUMN in df:
+        observed = df[READINGS_COLUMN].to_numpy() > 0
+        for h in horizons:
+            name = horizon_label_name(h)
+            Y.loc[~horizon_valid_mask(observed, h), name] = INVALID_LABEL
+
+    # Keep every row that is valid for at least the shortest horizon;
+    # longer horizons are trimmed further by select_horizon
+    valid_length = len(df) - min(horizons)
+    X = X.iloc[:valid_length]
+    Y = Y.iloc[:valid_length]
+
+    X = X.fillna(X.median())
+
+    return X, Y
+
+
+def select_horizon(X: pd.DataFrame, Y: pd.DataFrame, horizon: int):
+    """
+    Slice the rows that have a label for one horizon.
+
+    Parameters
+    ----------
+    X : pd.DataFrame
+        Feature matrix from preprocess_data with a list of horizons
+    Y : pd.DataFrame
+        Matching label matrix
+    horizon : int
+        One of the horizons passed to preprocess_data
+
+    Returns
+    -------
+    X_h : pd.DataFrame
+        Leading rows of X (a view, no copy; a copy of the labelled rows
+        when a resampled grid has gaps)
+    y_h : pd.Series
+        int labels for this horizon
+    """
+    y_h = Y[horizon_label_name(horizon)]
+    valid = y_h.to_numpy() >= 0
+    valid_length = int(valid.sum())
+
+    if not valid[:valid_length].all():
+        # Gaps of a resampled grid: a copy of the labelled rows
+        return X[valid].reset_index(drop=True), y_h[valid].astype(int).reset_index(drop=True)
+
+    return X.iloc[:valid_length], y_h.iloc[:valid_length].astype(int)
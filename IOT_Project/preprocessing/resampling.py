@@ -0,0 +1,295 @@
+"""
+Hourly Resampling
+
+preprocess_data and the label generators work by position: the label of
+row t is read `horizon` rows later. This module puts each station on a
+regular hourly grid first, so that `horizon` rows later is always
+`horizon` hours later:
+- Timestamps become int64 epoch hours, rounded to the nearest hour by
+  default (RESAMPLE_ROUNDING), so a jittered 10:59 reading counts for
+  11:00; the grid slot of a reading is its hour minus the first hour,
+  without datetime objects
+- Timestamps far outside the bulk of a chunk (beyond a 3 * IQR fence
+  plus RESAMPLE_FENCE_HOURS) are dropped before the grid is allocated,
+  so one bogus date cannot stretch the grid over decades
+- Duplicate or jittered readings of one hour are averaged with a single
+  np.bincount over all columns; SENSOR_FAILURE_VALUE readings are left out
+- Hours without a valid reading keep SENSOR_FAILURE_VALUE, so
+  handle_missing_values fills them like any other sensor failure
+- READINGS_COLUMN counts the readings of every hour; 0 marks a gap, and
+  horizon_valid_mask drops rows whose own or future hour is a gap by
+  comparing the grid with itself at a constant offset
+
+HourlyAligner does the same chunk by chunk (e.g. over
+iter_raw_air_quality_chunks), carrying only the readings of the last,
+still open hour, so very long series are resampled in linear time and
+bounded memory.
+"""
+
+import numpy as np
+import pandas as pd
+
+from config.setting import RESAMPLE_FENCE_HOURS, RESAMPLE_ROUNDING, SENSOR_FAILURE_VALUE
+from preprocessing.timestamps import (
+    MISSING_EPOCH,
+    build_epoch_timestamps,
+    epoch_from_datetime
+)
+
+
+SECONDS_PER_HOUR = 3600
+
+# Readings that fell into each grid hour; 0 marks a gap
+READINGS_COLUMN = "n_readings"
+
+
+def epoch_hour(epoch, rounding: str = RESAMPLE_ROUNDING):
+    """
+    Grid hour (epoch // 3600) of epoch seconds, for scalars or arrays.
+    """
+    if rounding == "nearest":
+        return (epoch + SECONDS_PER_HOUR // 2) // SECONDS_PER_HOUR
+    if rounding == "floor":
+        return epoch // SECONDS_PER_HOUR
+
+    raise ValueError(f"Unknown rounding: {rounding!r}")
+
+
+def _epoch_hours(
+    df: pd.DataFrame,
+    timestamp_col: str,
+    time_col: str | None,
+    rounding: str = RESAMPLE_ROUNDING
+) -> np.ndarray:
+    if pd.api.types.is_datetime64_any_dtype(df[timestamp_col]):
+        epoch = epoch_from_datetime(df[timestamp_col])
+    else:
+        epoch = build_epoch_timestamps(
+            df[timestamp_col],
+            None if time_col is None or time_col not in df else df[time_col]
+        )
+
+    return np.where(epoch == MISSING_EPOCH, MISSING_EPOCH, epoch_hour(epoch, rounding))
+
+
+def _in_range(hours: np.ndarray, fence_hours: int) -> np.ndarray:
+    """
+    False for hours beyond the Tukey fence (3 * IQR) plus fence_hours.
+    """
+    if not len(hours):
+        return np.ones(0, dtype=bool)
+
+    q1, q3 = np.percentile(hours, [25, 75])
+    reach = 3 * (q3 - q1) + fence_hours
+
+    return (hours >= q1 - reach) & (hours <= q3 + reach)
+
+
+def _aggregate(hours: np.ndarray, values: np.ndarray, start: int, stop: int):
+    """
+    Mean of every column per grid hour in [start, stop).
+
+    Returns
+    -------
+    means : np.ndarray (stop - start, n_columns)
+        SENSOR_FAILURE_VALUE where an hour has no valid reading
+    n_readings : np.ndarray (stop - start,)
+    """
+    n_slots = max(stop - start, 0)
+    n_columns = values.shape[1]
+    slots = hours - start
+
+    valid = ~np.isnan(values) & (values != SENSOR_FAILURE_VALUE)
+
+    # One bincount for all columns: cell (slot, j) has code slot * n_columns + j
+    codes = (slots[:, None] * n_columns + np.arange(n_columns)).ravel()
+    size = n_slots * n_columns
+    sums = np.bincount(codes, weights=np.where(valid, values, 0.0).ravel(), minlength=size)
+    counts = np.bincount(codes, weights=valid.ravel(), minlength=size)
+
+    means = np.full(size, float(SENSOR_FAILURE_VALUE))
+    np.divide(sums, counts, out=means, where=counts > 0)
+
+    n_readings = np.bincount(slots, minlength=n_slots).astype(np.int32)
+
+    return means.reshape(n_slots, n_columns), n_readings
+
+
+class HourlyAligner:
+    """
+    Chunked resampling of a time-ordered series onto an hourly grid.
+
+    Rows may be in any order within a chunk. Readings of an hour that was
+    already emitted in an earlier chunk are counted in n_late and dropped;
+    readings far outside the chunk's own time range are counted in
+    n_out_of_range and dropped.
+
+    Parameters
+    ----------
+    timestamp_col : str, optional
+        Datetime column, or Date strings combined with time_col
+    time_col : str | None, optional
+        Time strings; not part of the output
+    columns : list | None
+        Numeric columns to aggregate; by default every numeric column of
+        the first chunk
+    rounding : str, optional
+        "nearest" or "floor" hour of each reading
+    fence_hours : int, optional
+        Slack beyond the 3 * IQR fence of a chunk's hours; needs chunks of
+        more than a handful of rows to catch anything
+    """
+
+    def __init__(
+        self,
+        timestamp_col: str = "Date",
+        time_col: str | None = "Time",
+        columns=None,
+        rounding: str = RESAMPLE_ROUNDING,
+        fence_hours: int = RESAMPLE_FENCE_HOURS
+    ):
+        self.timestamp_col = timestamp_col
+        self.time_col = time_col
+        self.columns = None if columns is None else list(columns)
+        self.rounding = rounding
+        self.fence_hours = fence_hours
+
+        # First grid hour not emitted yet
+        self.next_hour = None
+        self.n_late = 0
+        self.n_out_of_range = 0
+
+        # Readings of the last hour seen, which a later chunk may extend
+        self._open_hours = np.empty(0, dtype=np.int64)
+        self._open_values = None
+
+    def _frame(self, start: int, means: np.ndarray, n_readings: np.ndarray) -> pd.DataFrame:
+        hours = np.arange(start, start + len(n_readings), dtype=np.int64)
+        frame = pd.DataFrame(means, columns=self.columns, copy=False)
+        frame.insert(0, self.timestamp_col, (hours * SECONDS_PER_HOUR).astype("datetime64[s]"))
+        frame[READINGS_COLUMN] = n_readings
+
+        return frame
+
+    def transform(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        Grid rows of every hour completed by this chunk, gaps included.
+
+        The latest hour of the chunk stays open until a later chunk or
+        flush().
+        """
+        if self.columns is None:
+            excluded = {self.timestamp_col, self.time_col}
+            self.columns = [c for c in chunk.select_dtypes(include="number").columns if c not in excluded]
+        if self._open_values is None:
+            self._open_values = np.empty((0, len(self.columns)))
+
+        hours = _epoch_hours(chunk, self.timestamp_col, self.time_col, self.rounding)
+        values = chunk[self.columns].to_numpy(dtype=np.float64)
+
+        keep = hours != MISSING_EPOCH
+        in_range = _in_range(hours[keep], self.fence_hours)
+        self.n_out_of_range += int((~in_range).sum())
+        keep[keep] = in_range
+
+        if self.next_hour is not None:
+            late = keep & (hours < self.next_hour)
+            self.n_late += int(late.sum())
+            keep &= ~late
+
+        hours = np.concatenate([self._open_hours, hours[keep]])
+        values = np.vstack([self._open_values, values[keep]])
+        if not len(hours):
+            return self._frame(0, np.empty((0, len(self.columns))), np.empty(0, dtype=np.int32))
+
+        last = int(hours.max())
+        start = int(hours.min()) if self.next_hour is None else self.next_hour
+
+        closed = hours < last
+        means, n_readings = _aggregate(hours[closed], values[closed], start, last)
+
+        self._open_hours = hours[~closed]
+        self._open_values = values[~closed]
+        self.next_hour = last
+
+        return self._frame(start, means, n_readings)
+
+    def flush(self) -> pd.DataFrame:
+        """
+        Grid row of the open hour, once no more chunks follow.
+        """
+        if not len(self._open_hours):
+            return self._frame(0, np.empty((0, len(self.columns or []))), np.empty(0, dtype=np.int32))
+
+        start = self.next_hour
+        means, n_readings = _aggregate(self._open_hours, self._open_values, start, start + 1)
+
+        self._open_hours = self._open_hours[:0]
+        self._open_values = self._open_values[:0]
+        self.next_hour = start + 1
+
+        return self._frame(start, means, n_readings)
+
+
+def resample_hourly(
+    df: pd.DataFrame,
+    timestamp_col: str = "Date",
+    time_col: str | None = "Time",
+    columns=None
+) -> pd.DataFrame:
+    """
+    Align one station onto a regular hourly grid.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Raw readings, in any order
+    timestamp_col, time_col, columns
+        See HourlyAligner
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per hour from the first to the last reading:
+        timestamp_col (datetime64 hour start), the averaged columns and
+        READINGS_COLUMN. time_col is dropped; rows without a parseable
+        timestamp are dropped.
+    """
+    aligner = HourlyAligner(timestamp_col, time_col, columns)
+    frames = [aligner.transform(df), aligner.flush()]
+
+    resampled = pd.concat(frames, ignore_index=True)
+
+    n_gaps = int((resampled[READINGS_COLUMN] == 0).sum())
+    n_merged = int((resampled[READINGS_COLUMN] > 1).sum())
+    print(f" Resampled {len(df)} rows onto {len(resampled)} hours ({n_gaps} gaps, {n_merged} merged hours)")
+    if aligner.n_out_of_range:
+        print(f" Dropped {aligner.n_out_of_range} rows with out-of-range timestamps")
+
+    return resampled
+
+
+def horizon_valid_mask(observed: np.ndarray, horizon: int) -> np.ndarray:
+    """
+    Rows whose own hour and the hour `horizon` steps later both have readings.
+
+    Parameters
+    ----------
+    observed : np.ndarray of bool
+        Per grid hour, True when it had at least one reading
+    horizon : int
+        Label offset in hours (= rows on the grid)
+
+    Returns
+    -------
+    np.ndarray of bool
+        False for the last `horizon` rows
+    """
+    observed = np.asarray(observed, dtype=bool)
+    n_rows = len(observed)
+
+    valid = np.zeros(n_rows, dtype=bool)
+    if horizon < n_rows:
+        valid[:n_rows - horizon] = observed[:n_rows - horizon] & observed[horizon:]
+
+    return valid
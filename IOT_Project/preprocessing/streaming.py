@@ -0,0 +1,605 @@
+"""
+Streaming Preprocessing and Prediction
+
+This module scores a live feed of sensor records hour by hour instead of
+rerunning the batch pipeline, with state bounded by the longest window:
+- HourlyAggregator : averages the readings of the open hour; the hour is
+  closed when the first record of a later hour arrives, and hours
+  without records in between are passed on as gaps
+- StreamingImputer : handle_missing_values one row at a time, from the
+  fitted medians and the last ROLLING_MEDIAN_WINDOW hours
+- StreamingLabeler : P² label thresholds plus the last `horizon`
+  predictions, which are checked against their label once it is known
+- StreamingForecaster : calendar and WindowFeatureEngine features of
+  every closed hour, scored with OnnxPredictor
+
+The feature vector of an hour is the same as the row preprocess_data
+builds for it, so the ONNX model trained by main.py can score it.
+run_streaming wires a source from data_acquisition/stream_sources to a
+forecaster and writes one JSON line per scored hour.
+
+Run with:  python -m preprocessing.streaming
+"""
+
+import json
+import sys
+import time
+import warnings
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from config.setting import (
+    SENSOR_FAILURE_VALUE,
+    IMPUTATION_STRATEGY,
+    IMPUTATION_MAX_GAP,
+    ROLLING_MEDIAN_WINDOW,
+    LABEL_THRESHOLD_MODE,
+    LABEL_THRESHOLD_WINDOW,
+    SENSOR_FEATURES,
+    TARGET_COLUMNS,
+    FORECAST_HORIZON,
+    USE_WINDOW_FEATURES,
+    WINDOW_FEATURES,
+    ONNX_MODEL_PATH,
+    USE_SYNTHETIC_DATA,
+    REAL_DATA_FILE,
+    SYNTHETIC_DATA_FILE,
+    STREAM_SOURCE,
+    STREAM_PATH,
+    STREAM_WARMUP,
+    STREAM_OUTPUT_PATH,
+    STREAM_REPORT_EVERY,
+    STREAM_DATE_FORMAT
+)
+from data_acquisition.cleaning import IMPUTATION_STRATEGIES, fit_imputer
+from data_acquisition.load_data import load_raw_air_quality_data
+from data_acquisition.stream_sources import RecordParser, iter_source_lines
+from evaluation.metrics import ClassificationAccumulator
+from evaluation.onnx_inference import load_onnx_model, OnnxPredictor
+from preprocessing.label_generation import UNHEALTHY_QUANTILE
+from preprocessing.streaming_quantile import P2Quantile, RollingP2Quantile
+from preprocessing.resampling import SECONDS_PER_HOUR, READINGS_COLUMN, HourlyAligner, epoch_hour
+from preprocessing.timestamps import (
+    calendar_features_from_epoch,
+    detect_date_format,
+    epoch_from_datetime
+)
+from preprocessing.window_features import WindowFeatureEngine
+
+
+# Days from 0001-01-01 (ordinal 1) to 1970-01-01
+EPOCH_ORDINAL = 719_163
+
+# Number of recent records / hours kept for latency percentiles
+LATENCY_HISTORY = 10_000
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class HourlyAggregator:
+    """
+    Mean of every column over the readings of one grid hour (rounded as
+    in resampling.epoch_hour).
+
+    Records older than the open hour (or an hour already closed) are
+    counted in n_late and dropped.
+    """
+
+    def __init__(self, n_columns: int):
+        self.hour = None
+        self.last_closed = None
+        self.n_late = 0
+        self._sum = np.zeros(n_columns)
+        self._count = np.zeros(n_columns, dtype=np.int64)
+
+    def add(self, epoch: int, values: np.ndarray):
+        """
+        Add one reading (NaN = missing).
+
+        Returns
+        -------
+        tuple | None
+            (hour epoch, column means) of the hour this record closed
+        """
+        hour = epoch_hour(epoch) * SECONDS_PER_HOUR
+        if (self.hour is not None and hour < self.hour) or (
+            self.last_closed is not None and hour <= self.last_closed
+        ):
+            self.n_late += 1
+            return None
+
+        closed = None
+        if self.hour is not None and hour > self.hour:
+            closed = self.flush()
+        self.hour = hour
+
+        observed = ~np.isnan(values)
+        self._sum[observed] += values[observed]
+        self._count += observed
+
+        return closed
+
+    def flush(self):
+        """
+        Close the open hour; columns without readings are NaN.
+        """
+        if self.hour is None:
+            return None
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = self._sum / self._count
+        closed = (self.hour, means)
+
+        self.last_closed = self.hour
+        self.hour = None
+        self._sum[:] = 0.0
+        self._count[:] = 0
+
+        return closed
+
+
+class StreamingImputer:
+    """
+    apply_imputer for one row at a time.
+
+    Sensor failures are filled like the batch strategies, using only the
+    rows seen so far: "rolling_median" keeps the last `window` rows,
+    "ffill" the last observed value and gap length per column. Live rows
+    have no next observation to interpolate towards, so "interpolate"
+    holds the last value instead. Anything left gets the fitted medians.
+
+    Parameters
+    ----------
+    stats : dict
+        Output of fit_imputer
+    strategy, max_gap, window
+        See apply_imputer
+    """
+
+    def __init__(
+        self,
+        stats: dict,
+        strategy: str = IMPUTATION_STRATEGY,
+        max_gap: int = IMPUTATION_MAX_GAP,
+        window: int = ROLLING_MEDIAN_WINDOW
+    ):
+        if strategy not in IMPUTATION_STRATEGIES:
+            raise ValueError(
+                f"Unknown imputation strategy '{strategy}', expected one of {IMPUTATION_STRATEGIES}"
+            )
+
+        self.columns = list(stats["columns"])
+        self.medians = np.array(
+            [np.nan if m is None else m for m in stats["medians"]],
+            dtype=np.float32
+        )
+
+        self.strategy = "ffill" if strategy == "interpolate" else strategy
+        self.max_gap = np.inf if strategy == "interpolate" else max_gap
+        self.window = window
+
+        n_columns = len(self.columns)
+        self._last = np.full(n_columns, np.nan, dtype=np.float32)
+        self._since = np.zeros(n_columns)
+        self._history = np.full((window, n_columns), np.nan, dtype=np.float32)
+        self._position = 0
+
+    def impute(self, values) -> np.ndarray:
+        """
+        Filled float32 copy of one row in self.columns order.
+        """
+        raw = np.asarray(values, dtype=np.float32).copy()
+        raw[raw == SENSOR_FAILURE_VALUE] = np.nan
+        missing = np.isnan(raw)
+
+        row = raw.copy()
+        if missing.any():
+            if self.strategy == "rolling_median":
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore", RuntimeWarning)
+                    fill = np.nanmedian(self._history, axis=0)
+                row[missing] = fill[missing]
+            elif self.strategy == "ffill":
+                fillable = missing & (self._since + 1 <= self.max_gap)
+                row[fillable] = self._last[fillable]
+
+            remaining = np.isnan(row)
+            row[remaining] = self.medians[remaining]
+
+        if self.strategy == "rolling_median":
+            self._history[self._position % self.window] = raw
+            self._position += 1
+        elif self.strategy == "ffill":
+            self._since = np.where(missing, self._since + 1, 0)
+            self._last = np.where(missing, self._last, raw)
+
+        return row
+
+
+class StreamingLabeler:
+    """
+    Causal label thresholds and realized labels of past predictions.
+
+    The label of hour t is known once hour t + horizon arrives: any target
+    above the threshold estimated up to hour t. The "global" threshold
+    mode needs the whole series, so it is tracked with the expanding
+    estimate here.
+
+    Parameters
+    ----------
+    n_targets : int
+        Number of target columns
+    horizon : int
+        Prediction horizon in hours
+    mode, window
+        See generate_future_labels
+    """
+
+    def __init__(
+        self,
+        n_targets: int,
+        horizon: int = FORECAST_HORIZON,
+        mode: str = LABEL_THRESHOLD_MODE,
+        window: int = LABEL_THRESHOLD_WINDOW
+    ):
+        self.horizon = horizon
+        self.estimators = [
+            RollingP2Quantile(UNHEALTHY_QUANTILE, window) if mode == "rolling" else P2Quantile(UNHEALTHY_QUANTILE)
+            for _ in range(n_targets)
+        ]
+        # (hour, thresholds, prediction, probability) of the last `horizon` hours
+        self.pending = deque()
+        self.accumulator = ClassificationAccumulator()
+
+    def update(self, hour: int, targets, prediction=None, probability=None, observed: bool = True):
+        """
+        Add the target values of a new hour.
+
+        Returns
+        -------
+        dict | None
+            The prediction made horizon hours ago with its label, if any;
+            a gap hour (observed False) gives no label
+        """
+        resolved = None
+        if len(self.pending) == self.horizon:
+            past_hour, thresholds, past_prediction, past_probability = self.pending.popleft()
+            if past_prediction is not None and observed:
+                label = int((targets > thresholds).any())
+                self.accumulator.update([label], [past_prediction], [past_probability])
+                resolved = {
+                    "timestamp": _isoformat(past_hour),
+                    "prediction": past_prediction,
+                    "label": label
+                }
+
+        for estimator, value in zip(self.estimators, targets):
+            estimator.update(float(value))
+        thresholds = np.array([estimator.value for estimator in self.estimators])
+
+        self.pending.append((hour, thresholds, prediction, probability))
+
+        return resolved
+
+
+def _isoformat(epoch: int) -> str:
+    return str(np.datetime64(int(epoch), "s"))
+
+
+class StreamingForecaster:
+    """
+    Hour-by-hour preprocessing and ONNX scoring of a record stream.
+
+    Parameters
+    ----------
+    predictor : OnnxPredictor
+        Session of the model trained on preprocess_data features
+    imputer : StreamingImputer
+        Its columns are the record fields that are read and aggregated
+    sensor_features, target_columns, horizon, use_time_features, window_features
+        As passed to preprocess_data
+    date_format : str | None
+        strptime layout of the records' Date field; if None it is detected
+        from the dates replayed by warm_up
+    """
+
+    def __init__(
+        self,
+        predictor: OnnxPredictor,
+        imputer: StreamingImputer,
+        sensor_features: list = SENSOR_FEATURES,
+        target_columns: list = TARGET_COLUMNS,
+        horizon: int = FORECAST_HORIZON,
+        use_time_features: bool = True,
+        window_features: dict | None = WINDOW_FEATURES if USE_WINDOW_FEATURES else None,
+        date_format: str | None = STREAM_DATE_FORMAT
+    ):
+        self.predictor = predictor
+        self.imputer = imputer
+        self.columns = imputer.columns
+
+        position = {name: i for i, name in enumerate(self.columns)}
+        self._sensor_index = np.array([position[name] for name in sensor_features])
+        self._target_index = np.array([position[name] for name in target_columns])
+
+        self.engine = None
+        window_names = []
+        if window_features:
+            spec = {k: v for k, v in window_features.items() if k != "max_memory_mb"}
+            self.engine = WindowFeatureEngine(**spec)
+            self._window_index = np.array([position[name] for name in self.engine.columns])
+            window_names = self.engine.feature_names
+
+        self.time_names = list(calendar_features_from_epoch(np.zeros(0, dtype=np.int64))) if use_time_features else []
+        self.feature_names = list(sensor_features) + self.time_names + window_names
+        if predictor.n_features != len(self.feature_names):
+            raise ValueError(
+                f"Model expects {predictor.n_features} features, streaming builds {len(self.feature_names)}"
+            )
+
+        # Hours needed before every lag and window is defined
+        self.min_history = self.engine.history if self.engine else 0
+
+        self._x = np.empty((1, len(self.feature_names)), dtype=np.float32)
+        self._missing = np.full(len(self.columns), np.nan)
+        self.aggregator = HourlyAggregator(len(self.columns))
+        self.labeler = StreamingLabeler(len(target_columns), horizon)
+
+        self.n_records = 0
+        self.n_skipped = 0
+        self.n_hours = 0
+        self.n_scored = 0
+        self.record_latencies = deque(maxlen=LATENCY_HISTORY)
+        self.hour_latencies = deque(maxlen=LATENCY_HISTORY)
+
+        self._date_format = date_format
+        self._last_date = None
+        self._last_day = None
+
+    def _epoch(self, record: dict) -> int:
+        date = record["Date"]
+        if date != self._last_date:
+            if self._date_format is None:
+                # One record cannot tell 03/04 from 04/03
+                raise ValueError("Date format unknown: pass date_format or warm up first")
+            self._last_day = datetime.strptime(date, self._date_format).toordinal() - EPOCH_ORDINAL
+            self._last_date = date
+
+        h, m, s = (str(record.get("Time") or "00.00.00").replace(":", ".").split(".") + ["0", "0"])[:3]
+
+        return self._last_day * 86_400 + int(h) * 3600 + int(m) * 60 + int(float(s))
+
+    def process_hour(self, hour: int, values, score: bool = True, observed: bool = True):
+        """
+        Impute, build features for and (optionally) score one closed hour.
+
+        Gap hours (observed False) are imputed to keep lags and windows
+        aligned to the clock, but are neither scored nor labelled.
+
+        Returns
+        -------
+        dict | None
+            Prediction of this hour, with the resolved past prediction
+        """
+        row = self.imputer.impute(values)
+
+        x = self._x[0]
+        n_sensors = len(self._sensor_index)
+        x[:n_sensors] = row[self._sensor_index]
+
+        offset = n_sensors
+        if self.time_names:
+            calendar = calendar_features_from_epoch(np.array([hour], dtype=np.int64))
+            for name in self.time_names:
+                x[offset] = calendar[name][0]
+                offset += 1
+
+        if self.engine:
+            self.engine.transform_row(row[self._window_index], out=x[offset:])
+
+        self.n_hours += 1
+
+        prediction = probability = None
+        if score and observed and self.n_hours > self.min_history:
+            probability = float(self.predictor.predict_proba(self._x)[0, 1])
+            prediction = int(probability >= 0.5)
+            self.n_scored += 1
+
+        resolved = self.labeler.update(hour, row[self._target_index], prediction, probability, observed)
+        if prediction is None:
+            return None
+
+        result = {"timestamp": _isoformat(hour), "probability": probability, "prediction": prediction}
+        if resolved is not None:
+            result["resolved"] = resolved
+
+        return result
+
+    def _score_closed(self, closed):
+        if closed is None:
+            return None
+
+        start = time.perf_counter()
+        result = self.process_hour(*closed)
+        self.hour_latencies.append(time.perf_counter() - start)
+
+        return result
+
+    def ingest(self, record: dict):
+        """
+        Add one parsed record; returns the prediction of the hour it closed.
+        """
+        start = time.perf_counter()
+
+        epoch = self._epoch(record)
+        self.n_records += 1
+        values = np.array([_to_float(record.get(name)) for name in self.columns])
+        values[values == SENSOR_FAILURE_VALUE] = np.nan
+        closed = self.aggregator.add(epoch, values)
+
+        self.record_latencies.append(time.perf_counter() - start)
+
+        result = self._score_closed(closed)
+        if closed is not None:
+            # Hours without any record between the closed and the new open hour
+            for gap_hour in range(closed[0] + SECONDS_PER_HOUR, self.aggregator.hour, SECONDS_PER_HOUR):
+                self.process_hour(gap_hour, self._missing, score=False, observed=False)
+
+        return result
+
+    def flush(self):
+        """
+        Score the open hour, e.g. when the source ends.
+        """
+        return self._score_closed(self.aggregator.flush())
+
+    def warm_up(self, df):
+        """
+        Replay historical raw rows to prime imputation, windows and thresholds.
+
+        The rows are resampled onto the hourly grid first, like the batch
+        pipeline does. Without a configured date_format, the layout of the
+        live records is taken from these rows' dates.
+        """
+        if self._date_format is None:
+            self._date_format = detect_date_format(df["Date"])
+
+        grid = HourlyAligner(columns=self.columns)
+        hourly = pd.concat([grid.transform(df), grid.flush()], ignore_index=True)
+
+        epoch = epoch_from_datetime(hourly["Date"])
+        values = hourly[self.columns].to_numpy(dtype=np.float64)
+        observed = hourly[READINGS_COLUMN].to_numpy() > 0
+
+        for i in range(len(hourly)):
+            self.process_hour(int(epoch[i]), values[i], score=False, observed=bool(observed[i]))
+
+        if len(hourly):
+            self.aggregator.last_closed = int(epoch[-1])
+
+    def stats(self) -> dict:
+        record_us = np.array(self.record_latencies) * 1e6
+        hour_us = np.array(self.hour_latencies) * 1e6
+
+        stats = {
+            "records": self.n_records,
+            "skipped_records": self.n_skipped,
+            "late_records": self.aggregator.n_late,
+            "hours_scored": self.n_scored,
+            "record_latency_p50_us": float(np.percentile(record_us, 50)) if len(record_us) else None,
+            "record_latency_p99_us": float(np.percentile(record_us, 99)) if len(record_us) else None,
+            "hour_latency_p50_us": float(np.percentile(hour_us, 50)) if len(hour_us) else None,
+            "hour_latency_p99_us": float(np.percentile(hour_us, 99)) if len(hour_us) else None
+        }
+
+        realized = self.labeler.accumulator.result()
+        if realized["n_rows"]:
+            stats["realized"] = {
+                name: realized[name] for name in ("n_rows", "accuracy", "precision", "recall", "f1_score")
+            }
+
+        return stats
+
+
+def run_streaming(
+    data_path=None,
+    source: str = STREAM_SOURCE,
+    path=STREAM_PATH,
+    model_path=ONNX_MODEL_PATH,
+    output_path=STREAM_OUTPUT_PATH,
+    warm_up: bool = STREAM_WARMUP,
+    report_every: int = STREAM_REPORT_EVERY,
+    lines=None
+) -> StreamingForecaster:
+    """
+    Score a live record feed until the source ends or is interrupted.
+
+    Parameters
+    ----------
+    data_path : Path | None
+        Historical dataset: imputation medians are fitted on it, it is
+        replayed first when warm_up is set, and it is the default file
+        for the pipe / tail sources. None uses the selected dataset.
+    source : str, optional
+        One of STREAM_SOURCES
+    path : Path | None, optional
+        Named pipe or tailed CSV; defaults to data_path
+    model_path : Path, optional
+        ONNX model exported with zipmap=False
+    output_path : Path | None, optional
+        JSON lines file of predictions; None writes them to stdout
+    warm_up : bool, optional
+        Replay data_path before reading the source
+    report_every : int, optional
+        Scored hours between summaries on stderr
+    lines : iterable | None
+        Lines to read instead of the configured source
+
+    Returns
+    -------
+    StreamingForecaster
+    """
+    data_path = data_path or (SYNTHETIC_DATA_FILE if USE_SYNTHETIC_DATA else REAL_DATA_FILE)
+    history = load_raw_air_quality_data(data_path)
+
+    session = load_onnx_model(model_path, intra_op_threads=1, inter_op_threads=1)
+    forecaster = StreamingForecaster(
+        OnnxPredictor(session, max_batch_size=1),
+        StreamingImputer(fit_imputer(history)),
+        # Live records share the layout of the historical file
+        date_format=STREAM_DATE_FORMAT or detect_date_format(history["Date"])
+    )
+
+    if warm_up:
+        start = time.perf_counter()
+        forecaster.warm_up(history)
+        print(f" Replayed {len(history)} historical rows in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+
+    parser = RecordParser(history.columns)
+    del history
+
+    if lines is None:
+        lines = iter_source_lines(source, path or data_path)
+
+    out = open(output_path, "a", encoding="utf-8") if output_path else sys.stdout
+
+    def emit(result):
+        if result is None:
+            return
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+        if forecaster.n_scored % report_every == 0:
+            print(f" Stream stats: {json.dumps(forecaster.stats())}", file=sys.stderr)
+
+    try:
+        for line_number, line in enumerate(lines, start=1):
+            # One malformed line must not end a live feed
+            try:
+                record = parser(line)
+                result = forecaster.ingest(record) if record is not None else None
+            except (ValueError, TypeError, KeyError) as e:
+                forecaster.n_skipped += 1
+                print(f" Skipped record {line_number} ({e}): {line.strip()[:80]!r}", file=sys.stderr)
+                continue
+            emit(result)
+        emit(forecaster.flush())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f" Stream stats: {json.dumps(forecaster.stats())}", file=sys.stderr)
+        if out is not sys.stdout:
+            out.close()
+
+    return forecaster
+
+
+if __name__ == "__main__":
+    run_streaming()
@@ -0,0 +1,219 @@
+"""
+Streaming Quantile Estimation
+
+This module provides constant-memory quantile estimators for label
+thresholds, based on the P² algorithm (Jain & Chlamtac, 1985):
+- P2Quantile : expanding (all data seen so far)
+- RollingP2Quantile : approximately the last `window` observations
+
+Both are updated in O(1) per observation, can be carried across data
+chunks, and serialise to plain dicts for reuse in live mode.
+"""
+
+import math
+
+import numpy as np
+
+
+class P2Quantile:
+    """
+    Expanding P² estimate of a single quantile.
+
+    Parameters
+    ----------
+    q : float
+        Quantile to track, in (0, 1)
+    """
+
+    def __init__(self, q: float):
+        if not 0 < q < 1:
+            raise ValueError(f"Quantile must be in (0, 1), got {q}")
+
+        self.q = q
+        self.count = 0
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5]
+        self.increments = [0, q / 2, q, (1 + q) / 2, 1]
+
+    def update(self, x: float):
+        """
+        Add one observation (NaN is ignored).
+        """
+        if x != x:
+            return
+
+        self.count += 1
+        h = self.heights
+
+        # Warm-up: keep the first five observations sorted
+        if self.count <= 5:
+            h.append(float(x))
+            h.sort()
+            return
+
+        if x < h[0]:
+            h[0] = float(x)
+            k = 0
+        elif x >= h[4]:
+            h[4] = float(x)
+            k = 3
+        else:
+            k = 0
+            while x >= h[k + 1]:
+                k += 1
+
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Adjust the three middle markers
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+
+                candidate = h[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (h[i + 1] - h[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (h[i] - h[i - 1]) / (n[i] - n[i - 1])
+                )
+
+                if h[i - 1] < candidate < h[i + 1]:
+                    h[i] = candidate
+                else:
+                    h[i] = h[i] + d * (h[i + d] - h[i]) / (n[i + d] - n[i])
+
+                n[i] += d
+
+    @property
+    def value(self) -> float:
+        """
+        Current quantile estimate (NaN before the first observation).
+        """
+        if self.count == 0:
+            return math.nan
+        if self.count <= 5:
+            return float(np.quantile(self.heights, self.q))
+
+        return self.heights[2]
+
+    def update_many(self, values) -> np.ndarray:
+        """
+        Feed a sequence and return the estimate after each observation.
+
+        Returns
+        -------
+        np.ndarray
+            float64 array, same length as values; element t only depends
+            on values[:t + 1]
+        """
+        values = np.asarray(values, dtype=np.float64)
+        out = np.empty(len(values), dtype=np.float64)
+
+        for t, x in enumerate(values):
+            self.update(x)
+            out[t] = self.value
+
+        return out
+
+    def to_dict(self) -> dict:
+        return {
+            "type": "p2",
+            "q": self.q,
+            "count": self.count,
+            "heights": list(self.heights),
+            "positions": list(self.positions),
+            "desired": list(self.desired)
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "P2Quantile":
+        estimator = cls(state["q"])
+        estimator.count = state["count"]
+        estimator.heights = list(state["heights"])
+        estimator.positions = list(state["positions"])
+        estimator.desired = list(state["desired"])
+
+        return estimator
+
+
+class RollingP2Quantile:
+    """
+    Approximate quantile of the most recent `window` observations.
+
+    Two P² estimators run half a window apart and each one restarts once it
+    has seen `window` observations; the estimate comes from whichever has
+    more history, so it always covers between window / 2 and window of the
+    latest observations.
+
+    Parameters
+    ----------
+    q : float
+        Quantile to track, in (0, 1)
+    window : int
+        Nominal window length in observations
+    """
+
+    def __init__(self, q: float, window: int):
+        if window < 10:
+            raise ValueError(f"Window must be at least 10 observations, got {window}")
+
+        self.q = q
+        self.window = window
+        self.seen = 0
+        self.estimators = [P2Quantile(q), P2Quantile(q)]
+
+    def update(self, x: float):
+        if x != x:
+            return
+
+        self.seen += 1
+        # Second estimator only starts after half a window
+        active = self.estimators if self.seen > self.window // 2 else self.estimators[:1]
+        for i, estimator in enumerate(active):
+            if estimator.count >= self.window:
+                self.estimators[i] = estimator = P2Quantile(self.q)
+            estimator.update(x)
+
+    @property
+    def value(self) -> float:
+        return max(self.estimators, key=lambda e: e.count).value
+
+    def update_many(self, values) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        out = np.empty(len(values), dtype=np.float64)
+
+        for t, x in enumerate(values):
+            self.update(x)
+            out[t] = self.value
+
+        return out
+
+    def to_dict(self) -> dict:
+        return {
+            "type": "rolling_p2",
+            "q": self.q,
+            "window": self.window,
+            "seen": self.seen,
+            "estimators": [e.to_dict() for e in self.estimators]
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "RollingP2Quantile":
+        estimator = cls(state["q"], state["window"])
+        estimator.seen = state["seen"]
+        estimator.estimators = [P2Quantile.from_dict(s) for s in state["estimators"]]
+
+        return estimator
+
+
+def quantile_estimator_from_dict(state: dict):
+    """
+    Rebuild either estimator type from its to_dict() output.
+    """
+    if state["type"] == "rolling_p2":
+        return RollingP2Quantile.from_dict(state)
+
+    return P2Quantile.from_dict(state)
@@ -0,0 +1,335 @@
+"""
+Lag / Rolling-Window Feature Engine
+
+This module builds lag, rolling and exponentially weighted features for
+sensor series:
+- Lags : x[t - k]
+- Rolling mean / std from NaN-aware cumulative sums (O(n) for any window
+  length); a window holding a missing value is NaN, as in pandas rolling()
+- Rolling min / max from strided window views
+- EWM means (adjust=False, i.e. the plain recursive form; missing values
+  keep the last mean)
+
+All windows end at the current row, so every feature only uses data up
+to time t. Output is float32. WindowFeatureEngine keeps the tail of the
+previous chunk and the EWM state, so streaming chunk by chunk gives the
+same values as one pass over the full series; transform_row does the
+same for a single live row without building a DataFrame.
+"""
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+ROLLING_STATS = ("mean", "std", "min", "max")
+
+
+def window_feature_names(columns, lags=(), windows=(), stats=ROLLING_STATS, ewm_spans=()):
+    """
+    Output column names, in the order the engine writes them.
+    """
+    names = []
+    for col in columns:
+        names.extend(f"{col}_lag{k}" for k in lags)
+        for w in windows:
+            names.extend(f"{col}_roll{w}_{stat}" for stat in stats)
+        names.extend(f"{col}_ewm{span}" for span in ewm_spans)
+
+    return names
+
+
+class WindowFeatureEngine:
+    """
+    Stateful lag / window feature generator.
+
+    Parameters
+    ----------
+    columns : list
+        Sensor columns to expand
+    lags : list, optional
+        Lag offsets in rows
+    windows : list, optional
+        Rolling window lengths in rows
+    stats : list, optional
+        Subset of ROLLING_STATS computed for every window
+    ewm_spans : list, optional
+        Spans of exponentially weighted means
+    """
+
+    def __init__(self, columns, lags=(), windows=(), stats=ROLLING_STATS, ewm_spans=()):
+        unknown = set(stats) - set(ROLLING_STATS)
+        if unknown:
+            raise ValueError(f"Unknown rolling statistics: {sorted(unknown)}")
+
+        self.columns = list(columns)
+        self.lags = sorted(lags)
+        self.windows = sorted(windows)
+        self.stats = [s for s in ROLLING_STATS if s in stats]
+        self.ewm_spans = list(ewm_spans)
+
+        self.feature_names = window_feature_names(
+            self.columns, self.lags, self.windows, self.stats, self.ewm_spans
+        )
+
+        # Rows of history needed to continue every lag and window
+        self.history = max([0, *self.lags, *[w - 1 for w in self.windows]])
+
+        # Output position of each feature for all columns at once, for transform_row
+        positions = self._feature_positions()
+        self._row_positions = {
+            key: np.array([positions[(col, *key)] for col in self.columns])
+            for key in [("lag", k) for k in self.lags]
+            + [(stat, w) for w in self.windows for stat in self.stats]
+            + [("ewm", span) for span in self.ewm_spans]
+        }
+
+        self.reset()
+
+    def reset(self):
+        """
+        Forget all carried state.
+        """
+        self._tail = np.empty((0, len(self.columns)), dtype=np.float64)
+        self._ewm_last = {}
+
+    @property
+    def n_features(self) -> int:
+        return len(self.feature_names)
+
+    def transform(self, df: pd.DataFrame, out: np.ndarray | None = None) -> pd.DataFrame:
+        """
+        Compute features for the next chunk of a time-ordered series.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Next chunk, containing self.columns
+        out : np.ndarray | None
+            Optional preallocated float32 array (len(df), n_features)
+
+        Returns
+        -------
+        pd.DataFrame
+            float32 features indexed like df
+        """
+        values = df[self.columns].to_numpy(dtype=np.float64)
+        n_rows = len(values)
+
+        if out is None:
+            out = np.empty((n_rows, self.n_features), dtype=np.float32)
+
+        # Prepend carried history so windows span chunk boundaries
+        extended = np.vstack([self._tail, values])
+        offset = len(self._tail)
+
+        positions = self._feature_positions()
+
+        for j, col in enumerate(self.columns):
+            series = extended[:, j]
+
+            for k in self.lags:
+                out[:, positions[(col, "lag", k)]] = self._lag(series, k)[offset:]
+
+            if self.windows:
+                # Centering keeps the sum-of-squares variance numerically stable;
+                # NaNs add zero to the sums and are tracked by a running count
+                valid = ~np.isnan(series)
+                center = np.nanmean(series) if valid.any() else 0.0
+                centered = np.where(valid, series - center, 0.0)
+                csum = np.concatenate([[0.0], np.cumsum(centered)])
+                csum_sq = np.concatenate([[0.0], np.cumsum(centered * centered)])
+                ccount = np.concatenate([[0], np.cumsum(valid)])
+
+            for w in self.windows:
+                for stat in self.stats:
+                    feature = self._rolling(series, w, stat, csum, csum_sq, ccount, center)
+                    out[:, positions[(col, stat, w)]] = feature[offset:]
+
+            for span in self.ewm_spans:
+                out[:, positions[(col, "ewm", span)]] = self._ewm(values[:, j], col, span)
+
+        if self.history:
+            self._tail = extended[-self.history:]
+
+        return pd.DataFrame(out, index=df.index, columns=self.feature_names, copy=False)
+
+    def transform_row(self, values, out: np.ndarray | None = None) -> np.ndarray:
+        """
+        Features of the next single row, continuing the same state as transform.
+
+        Parameters
+        ----------
+        values : array-like
+            One value per column, in self.columns order
+        out : np.ndarray | None
+            Optional float32 array (n_features,) to write into
+
+        Returns
+        -------
+        np.ndarray
+            float32 features in feature_names order
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if out is None:
+            out = np.empty(self.n_features, dtype=np.float32)
+
+        extended = np.vstack([self._tail, values[None, :]])
+        n_rows = len(extended)
+        positions = self._row_positions
+
+        for k in self.lags:
+            out[positions[("lag", k)]] = extended[-1 - k] if k < n_rows else np.nan
+
+        for w in self.windows:
+            if w > n_rows:
+                for stat in self.stats:
+                    out[positions[(stat, w)]] = np.nan
+                continue
+
+            window = extended[-w:]
+            for stat in self.stats:
+                if stat == "mean":
+                    feature = window.mean(axis=0)
+                elif stat == "std":
+                    feature = window.std(axis=0, ddof=1) if w > 1 else np.zeros(len(self.columns))
+                else:
+                    feature = window.min(axis=0) if stat == "min" else window.max(axis=0)
+                out[positions[(stat, w)]] = feature
+
+        for span in self.ewm_spans:
+            alpha = 2.0 / (span + 1.0)
+            for j, col in enumerate(self.columns):
+                key = (col, span)
+                previous = self._ewm_last.get(key)
+                x = values[j]
+                if previous is None or previous != previous:
+                    ewm = x
+                elif x != x:
+                    # Missing values keep the last mean
+                    ewm = previous
+                else:
+                    ewm = previous + alpha * (x - previous)
+                self._ewm_last[key] = ewm
+            out[positions[("ewm", span)]] = [self._ewm_last[(col, span)] for col in self.columns]
+
+        if self.history:
+            self._tail = extended[-self.history:]
+
+        return out
+
+    def _feature_positions(self):
+        positions = {}
+        i = 0
+        for col in self.columns:
+            for k in self.lags:
+                positions[(col, "lag", k)] = i
+                i += 1
+            for w in self.windows:
+                for stat in self.stats:
+                    positions[(col, stat, w)] = i
+                    i += 1
+            for span in self.ewm_spans:
+                positions[(col, "ewm", span)] = i
+                i += 1
+
+        return positions
+
+    @staticmethod
+    def _lag(series, k):
+        shifted = np.full(len(series), np.nan)
+        if k < len(series):
+            shifted[k:] = series[:len(series) - k]
+
+        return shifted
+
+    @staticmethod
+    def _rolling(series, w, stat, csum, csum_sq, ccount, center):
+        """
+        Trailing window statistic; NaN until a full window is available
+        and for any window that contains a NaN.
+        """
+        n = len(series)
+        result = np.full(n, np.nan)
+        if w > n:
+            return result
+
+        if stat in ("mean", "std"):
+            window_sum = csum[w:] - csum[:-w]
+            complete = (ccount[w:] - ccount[:-w]) == w
+            if stat == "mean":
+                value = window_sum / w + center
+            else:
+                # Sample std (ddof=1), as in pandas rolling().std()
+                window_sum_sq = csum_sq[w:] - csum_sq[:-w]
+                var = (window_sum_sq - window_sum * window_sum / w) / max(w - 1, 1)
+                value = np.sqrt(np.maximum(var, 0.0))
+            result[w - 1:] = np.where(complete, value, np.nan)
+        else:
+            view = sliding_window_view(series, w)
+            result[w - 1:] = view.min(axis=1) if stat == "min" else view.max(axis=1)
+
+        return result
+
+    def _ewm(self, values, col, span):
+        """
+        Recursive EWM continued from the previous chunk's last value.
+        """
+        key = (col, span)
+        previous = self._ewm_last.get(key)
+
+        seeded = values if previous is None else np.concatenate([[previous], values])
+        ewm = pd.Series(seeded).ewm(span=span, adjust=False, ignore_na=True).mean().to_numpy()
+        if previous is not None:
+            ewm = ewm[1:]
+
+        if len(ewm):
+            self._ewm_last[key] = ewm[-1]
+
+        return ewm
+
+
+def compute_window_features(
+    df: pd.DataFrame,
+    columns: list,
+    lags=(),
+    windows=(),
+    stats=ROLLING_STATS,
+    ewm_spans=(),
+    max_memory_mb: float | None = None
+) -> pd.DataFrame:
+    """
+    Lag / rolling / EWM features for a whole time-ordered frame.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Time-ordered input
+    columns : list
+        Sensor columns to expand
+    lags, windows, stats, ewm_spans
+        See WindowFeatureEngine
+    max_memory_mb : float | None
+        Cap on the float64 working set; rows are processed in blocks of
+        this size (with carried state) instead of all at once
+
+    Returns
+    -------
+    pd.DataFrame
+        float32 features indexed like df
+    """
+    engine = WindowFeatureEngine(columns, lags, windows, stats, ewm_spans)
+    out = np.empty((len(df), engine.n_features), dtype=np.float32)
+
+    if max_memory_mb is None:
+        block_rows = len(df)
+    else:
+        # float64 series + cumulative sums / counts + one feature column per column
+        bytes_per_row = 8 * len(columns) * 5
+        block_rows = max(engine.history + 1, int(max_memory_mb * 1024 * 1024) // bytes_per_row)
+
+    for start in range(0, len(df), max(block_rows, 1)):
+        stop = min(start + block_rows, len(df))
+        engine.transform(df.iloc[start:stop], out=out[start:stop])
+
+    return pd.DataFrame(out, index=df.index, columns=engine.feature_names, copy=False)
@@ -0,0 +1,62 @@
+"""
+Window features against pandas rolling(), in one pass, in chunks and row by row.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from preprocessing.window_features import WindowFeatureEngine, compute_window_features
+
+
+WINDOWS = (3, 5)
+STATS = ("mean", "std", "min", "max")
+
+
+def _frame():
+    rng = np.random.default_rng(0)
+    x = 20.0 + rng.normal(size=40)
+    x[5] = np.nan
+    x[20:22] = np.nan
+    return pd.DataFrame({"x": x})
+
+
+def _expected(series, w, stat):
+    return getattr(series.rolling(w), stat)().to_numpy()
+
+
+@pytest.mark.parametrize("w", WINDOWS)
+@pytest.mark.parametrize("stat", STATS)
+def test_rolling_matches_pandas(w, stat):
+    df = _frame()
+    features = compute_window_features(df, ["x"], windows=WINDOWS, stats=STATS)
+
+    np.testing.assert_allclose(
+        features[f"x_roll{w}_{stat}"].to_numpy(),
+        _expected(df["x"], w, stat),
+        rtol=1e-5,
+        equal_nan=True,
+    )
+
+
+def test_nan_only_affects_windows_that_contain_it():
+    df = _frame()
+    features = compute_window_features(df, ["x"], windows=(3,), stats=("mean",))
+    column = features["x_roll3_mean"].to_numpy()
+
+    assert np.isnan(column[5:8]).all()
+    assert not np.isnan(column[8:20]).any()
+
+
+def test_chunks_and_rows_match_one_pass():
+    df = _frame()
+    full = compute_window_features(df, ["x"], lags=(1, 2), windows=WINDOWS, stats=STATS, ewm_spans=(4,))
+
+    engine = WindowFeatureEngine(["x"], lags=(1, 2), windows=WINDOWS, stats=STATS, ewm_spans=(4,))
+    chunked = pd.concat([engine.transform(df.iloc[i:i + 7]) for i in range(0, len(df), 7)])
+
+    engine.reset()
+    rows = np.vstack([engine.transform_row(row) for row in df.to_numpy()])
+
+    np.testing.assert_allclose(chunked.to_numpy(), full.to_numpy(), rtol=1e-5, equal_nan=True)
+    np.testing.assert_allclose(rows, full.to_numpy(), rtol=1e-5, equal_nan=True)
@@ -0,0 +1,261 @@
+"""
+Stage Instrumentation
+
+This module measures where the pipeline spends time and memory:
+- instrument(name) : context manager recording one stage
+- instrumented(name) : decorator doing the same for every call
+- configure_logging() : logging setup from LOG_LEVEL / LOG_FILE_PATH
+
+Each record holds wall and CPU time, the process peak RSS, the Python
+allocation peak (when INSTRUMENT_TRACEMALLOC is set) and input / output
+row counts. Records are logged as they finish and written as JSON to
+STAGE_METRICS_FILE by write_stage_metrics(). With PROFILE_STAGES set,
+every stage call also leaves a cProfile (.prof) or pyinstrument (.html)
+dump in PROFILE_DIR.
+"""
+
+import cProfile
+import functools
+import json
+import logging
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from config.setting import (
+    LOG_LEVEL,
+    LOG_FILE_PATH,
+    INSTRUMENT_STAGES,
+    INSTRUMENT_TRACEMALLOC,
+    PROFILE_STAGES,
+    STAGE_METRICS_FILE,
+    PROFILE_DIR
+)
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+try:
+    import pyinstrument
+except ImportError:  # pragma: no cover - pyinstrument profiles are optional
+    pyinstrument = None
+
+
+logger = logging.getLogger("iot_project")
+
+# Finished records of this process, in completion order
+_RECORDS = []
+
+# Records currently open, innermost last
+_ACTIVE = []
+
+
+def configure_logging(level: str = LOG_LEVEL, log_file: Path | None = LOG_FILE_PATH):
+    """
+    Send project logs to stderr and, if given, to log_file.
+    """
+    logger.setLevel(level)
+    logger.handlers.clear()
+
+    formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    handlers = [logging.StreamHandler(sys.stderr)]
+    if log_file:
+        Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+        handlers.append(logging.FileHandler(log_file, encoding="utf-8"))
+
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+
+    return logger
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def count_rows(value):
+    """
+    Rows of a DataFrame / array, or of the first element of a tuple.
+    """
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    shape = getattr(value, "shape", None)
+    if shape:
+        return int(shape[0])
+
+    return None
+
+
+@contextmanager
+def instrument(
+    name: str,
+    rows_in: int | None = None,
+    trace_memory: bool = INSTRUMENT_TRACEMALLOC,
+    profile: str | None = PROFILE_STAGES
+):
+    """
+    Record time, memory and rows of the enclosed block.
+
+    Parameters
+    ----------
+    name : str
+        Stage name
+    rows_in : int | None
+        Input rows, if known
+    trace_memory : bool, optional
+        Track the Python allocation peak with tracemalloc
+    profile : str | None, optional
+        "cprofile" or "pyinstrument" to dump a profile of the block
+
+    Yields
+    ------
+    dict
+        The record; set record["rows_out"] inside the block
+    """
+    record = {
+        "stage": name,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "rows_in": rows_in,
+        "rows_out": None,
+        "status": "ok"
+    }
+
+    parent = _ACTIVE[-1] if _ACTIVE else None
+
+    started_tracing = False
+    if trace_memory:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        elif parent is not None:
+            # Keep the parent's peak so far before resetting it for this block
+            parent["_peak_floor"] = max(parent.get("_peak_floor", 0), tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        record["_traced_start"] = tracemalloc.get_traced_memory()[0]
+
+    profiler = None
+    if profile == "cprofile":
+        profiler = cProfile.Profile()
+    elif profile == "pyinstrument" and pyinstrument is not None:
+        profiler = pyinstrument.Profiler()
+    elif profile is not None:
+        logger.warning(f"Profiler '{profile}' not available, {name} is not profiled")
+
+    rss_before = _peak_rss_mb()
+    _ACTIVE.append(record)
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    if isinstance(profiler, cProfile.Profile):
+        profiler.enable()
+    elif profiler is not None:
+        profiler.start()
+
+    try:
+        yield record
+    except BaseException as e:
+        record["status"] = f"failed: {type(e).__name__}"
+        raise
+    finally:
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+        elif profiler is not None:
+            profiler.stop()
+
+        record["wall_seconds"] = time.perf_counter() - wall_start
+        record["cpu_seconds"] = time.process_time() - cpu_start
+
+        rss_after = _peak_rss_mb()
+        record["peak_rss_mb"] = rss_after
+        record["peak_rss_growth_mb"] = None if rss_after is None else rss_after - rss_before
+
+        _ACTIVE.pop()
+
+        if trace_memory:
+            peak = max(tracemalloc.get_traced_memory()[1], record.pop("_peak_floor", 0))
+            record["traced_peak_mb"] = (peak - record.pop("_traced_start")) / (1024 * 1024)
+            if started_tracing:
+                tracemalloc.stop()
+            elif parent is not None:
+                parent["_peak_floor"] = max(parent.get("_peak_floor", 0), peak)
+
+        if profiler is not None:
+            record["profile"] = str(_dump_profile(profiler, name))
+
+        _RECORDS.append(record)
+        logger.info(json.dumps(record, default=str))
+
+
+def _dump_profile(profiler, name: str) -> Path:
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+
+    if isinstance(profiler, cProfile.Profile):
+        path = PROFILE_DIR / f"{name}-{stamp}.prof"
+        profiler.dump_stats(path)
+    else:
+        path = PROFILE_DIR / f"{name}-{stamp}.html"
+        path.write_text(profiler.output_html(), encoding="utf-8")
+
+    return path
+
+
+def instrumented(name: str | None = None):
+    """
+    Decorator recording every call of a function with instrument().
+
+    Input rows are taken from the first argument (positional or keyword),
+    output rows from the return value. Does nothing when
+    INSTRUMENT_STAGES is False.
+    """
+    def decorator(func):
+        if not INSTRUMENT_STAGES:
+            return func
+
+        stage = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            first = args[0] if args else next(iter(kwargs.values()), None)
+            with instrument(stage, rows_in=count_rows(first)) as record:
+                result = func(*args, **kwargs)
+                record["rows_out"] = count_rows(result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def stage_records() -> list:
+    """
+    Finished records of this process.
+    """
+    return list(_RECORDS)
+
+
+def write_stage_metrics(path: Path = STAGE_METRICS_FILE, extra: dict | None = None) -> Path:
+    """
+    Write all finished records (plus any extra entries) as JSON.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, "w") as f:
+        json.dump({
+            "written_at": datetime.now(timezone.utc).isoformat(),
+            "stages": _RECORDS,
+            **(extra or {})
+        }, f, indent=2, default=str)
+
+    return path
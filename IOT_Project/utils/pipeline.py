@@ -0,0 +1,330 @@
+"""
+Stage Pipeline
+
+This module runs the project workflow as declared stages whose outputs
+are memoized on disk:
+- A stage's key hashes its parameters, any extra dependencies (e.g. a
+  source file fingerprint) and the content hashes of its input stages
+- A stage whose key is already stored is not run; its output is only
+  read from disk if a later stage that does run needs it
+- Outputs are keyed by content, so a stage that reruns but produces the
+  same output does not invalidate the stages after it
+- Every output is stored as soon as its stage finishes, so a failed run
+  resumes from the last good stage
+- Files a stage writes (artifacts) are hashed with its output; a stored
+  output is only reused while every artifact still has that hash
+- Least recently used outputs of any stage are evicted once the cache
+  exceeds CACHE_MAX_SIZE_MB
+
+DataFrames are stored as Arrow files (see data_acquisition.cache) when
+pyarrow is installed, all other outputs with pickle.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from config.setting import (
+    PIPELINE_CACHE_DIR,
+    PIPELINE_KEEP_ENTRIES,
+    USE_DATA_CACHE,
+    CACHE_MAX_SIZE_MB
+)
+from data_acquisition.cache import pa, read_cached_frame, write_cached_frame
+
+
+# Bump when stage outputs change meaning without a parameter change
+PIPELINE_VERSION = 2
+
+
+class Stage:
+    """
+    One pipeline step.
+
+    Parameters
+    ----------
+    name : str
+        Unique stage name
+    func : callable
+        Called as func(**inputs, **params)
+    inputs : list, optional
+        Names of earlier stages whose outputs are passed as keyword arguments
+    params : dict, optional
+        Keyword arguments of func; part of the stage key
+    depends_on : dict, optional
+        Values that invalidate the stage without being passed to func
+    artifacts : list, optional
+        Files the stage writes; the stage reruns if any is missing or was
+        changed since its output was stored
+    memoize : bool, optional
+        False for stages that must run every time
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func,
+        inputs: list | None = None,
+        params: dict | None = None,
+        depends_on: dict | None = None,
+        artifacts: list | None = None,
+        memoize: bool = True
+    ):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs or [])
+        self.params = dict(params or {})
+        self.depends_on = dict(depends_on or {})
+        self.artifacts = [Path(p) for p in artifacts or []]
+        self.memoize = memoize
+
+    def key(self, input_hashes: dict) -> str:
+        payload = {
+            "version": PIPELINE_VERSION,
+            "stage": self.name,
+            "params": self.params,
+            "depends_on": self.depends_on,
+            "inputs": input_hashes
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+
+        return hashlib.sha256(encoded).hexdigest()
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+class Pipeline:
+    """
+    Run stages in declaration order with memoization.
+
+    Parameters
+    ----------
+    stages : list of Stage
+        Each stage may only take inputs from stages declared before it
+    cache_dir : Path, optional
+        Where stage outputs are stored
+    use_cache : bool, optional
+        False runs every stage and stores nothing
+    keep_entries : int, optional
+        Stored outputs kept per stage (most recently used first)
+    max_size_mb : float, optional
+        Size limit of the whole cache; outputs of the current run are
+        never evicted
+    """
+
+    def __init__(
+        self,
+        stages: list,
+        cache_dir: Path = PIPELINE_CACHE_DIR,
+        use_cache: bool = USE_DATA_CACHE,
+        keep_entries: int = PIPELINE_KEEP_ENTRIES,
+        max_size_mb: float = CACHE_MAX_SIZE_MB
+    ):
+        self.stages = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage '{stage.name}'")
+            missing = [name for name in stage.inputs if name not in self.stages]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' needs undeclared stages {missing}")
+            self.stages[stage.name] = stage
+
+        self.cache_dir = Path(cache_dir)
+        self.use_cache = use_cache
+        self.keep_entries = keep_entries
+        self.max_size_mb = max_size_mb
+
+        self._values = {}
+        self._hashes = {}
+        self._entries = {}
+        self.report = {}
+
+    # --------------------------------------------------
+    # Storage
+    # --------------------------------------------------
+
+    def _entry(self, stage: Stage, key: str) -> dict:
+        stage_dir = self.cache_dir / stage.name
+        return {
+            "meta": stage_dir / f"{key}.json",
+            "frame_key": key,
+            "frame_dir": stage_dir,
+            "pickle": stage_dir / f"{key}.pkl"
+        }
+
+    def _read_meta(self, entry: dict):
+        if not entry["meta"].exists():
+            return None
+        with open(entry["meta"]) as f:
+            meta = json.load(f)
+
+        data_path = entry["frame_dir"] / f"{entry['frame_key']}.arrow" if meta["format"] == "frame" else entry["pickle"]
+        if not data_path.exists():
+            return None
+
+        # An artifact overwritten since (e.g. by a run with other settings)
+        # no longer belongs to this entry
+        for path, digest in meta.get("artifacts", {}).items():
+            if not Path(path).exists() or _hash_file(Path(path)) != digest:
+                return None
+
+        # Mark the entry as recently used
+        os.utime(entry["meta"])
+        return meta
+
+    def _store(self, stage: Stage, key: str, value) -> str:
+        entry = self._entry(stage, key)
+        entry["frame_dir"].mkdir(parents=True, exist_ok=True)
+
+        if isinstance(value, pd.DataFrame) and pa is not None:
+            fmt = "frame"
+            # The size limit is enforced over all stages in _evict
+            write_cached_frame(key, value, cache_dir=entry["frame_dir"], max_size_mb=float("inf"))
+            content_hash = _hash_file(entry["frame_dir"] / f"{key}.arrow")
+        else:
+            fmt = "pickle"
+            payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            content_hash = hashlib.sha256(payload).hexdigest()
+            tmp_path = entry["pickle"].with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, entry["pickle"])
+
+        # Written last: an entry without meta is treated as missing
+        with open(entry["meta"], "w") as f:
+            json.dump({
+                "stage": stage.name,
+                "format": fmt,
+                "content_hash": content_hash,
+                "artifacts": {str(p): _hash_file(p) for p in stage.artifacts if p.exists()}
+            }, f)
+
+        self._evict(stage)
+
+        return content_hash
+
+    def _load(self, name: str):
+        if name in self._values:
+            return self._values[name]
+
+        stage = self.stages[name]
+        entry = self._entries[name]
+        with open(entry["meta"]) as f:
+            meta = json.load(f)
+
+        if meta["format"] == "frame":
+            value = read_cached_frame(entry["frame_key"], cache_dir=entry["frame_dir"])
+        else:
+            with open(entry["pickle"], "rb") as f:
+                value = pickle.load(f)
+
+        self._values[stage.name] = value
+        return value
+
+    def _evict(self, stage: Stage):
+        stage_dir = self.cache_dir / stage.name
+        metas = sorted(stage_dir.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+
+        for meta in metas[self.keep_entries:]:
+            key = meta.stem
+            for path in (meta, stage_dir / f"{key}.pkl", stage_dir / f"{key}.arrow"):
+                path.unlink(missing_ok=True)
+
+        self._enforce_size_limit()
+
+    def _enforce_size_limit(self):
+        # Entries loaded or stored by this run stay, later stages may read them
+        in_use = {entry["meta"] for entry in self._entries.values()}
+
+        entries = []
+        for meta in self.cache_dir.glob("*/*.json"):
+            files = [meta, meta.with_suffix(".pkl"), meta.with_suffix(".arrow")]
+            size = sum(p.stat().st_size for p in files if p.exists())
+            entries.append((meta.stat().st_mtime, size, meta, files))
+
+        total = sum(size for _, size, _, _ in entries)
+        limit = self.max_size_mb * 1024 * 1024
+
+        for _, size, meta, files in sorted(entries, key=lambda e: e[0]):
+            if total <= limit:
+                break
+            if meta in in_use:
+                continue
+            for path in files:
+                path.unlink(missing_ok=True)
+            total -= size
+
+    # --------------------------------------------------
+    # Execution
+    # --------------------------------------------------
+
+    def run(self, targets: list | None = None, force: list | None = None) -> dict:
+        """
+        Run or reuse every stage.
+
+        Parameters
+        ----------
+        targets : list | None
+            Stages whose outputs are returned (loaded from disk if
+            memoized); by default the last stage
+        force : list | None
+            Stages to rerun even if memoized
+
+        Returns
+        -------
+        dict
+            Stage name -> output, for the targets
+        """
+        targets = targets or [list(self.stages)[-1]]
+        force = set(force or [])
+
+        for stage in self.stages.values():
+            input_hashes = {name: self._hashes[name] for name in stage.inputs}
+            key = stage.key(input_hashes)
+            entry = self._entry(stage, key)
+
+            reusable = (
+                self.use_cache
+                and stage.memoize
+                and stage.name not in force
+                and all(p.exists() for p in stage.artifacts)
+            )
+            meta = self._read_meta(entry) if reusable else None
+
+            if meta is not None:
+                self._entries[stage.name] = entry
+                self._hashes[stage.name] = meta["content_hash"]
+                self.report[stage.name] = {"status": "cached", "key": key[:12]}
+                print(f" [{stage.name}] up to date ({key[:12]})")
+                continue
+
+            print(f" [{stage.name}] running...")
+            inputs = {name: self._load(name) for name in stage.inputs}
+
+            start = time.perf_counter()
+            value = stage.func(**inputs, **stage.params)
+            seconds = time.perf_counter() - start
+
+            self._values[stage.name] = value
+            if self.use_cache and stage.memoize:
+                self._entries[stage.name] = entry
+                self._hashes[stage.name] = self._store(stage, key, value)
+            else:
+                # Not stored: later stages are keyed on this run's key instead
+                self._hashes[stage.name] = key
+
+            self.report[stage.name] = {"status": "ran", "key": key[:12], "seconds": seconds}
+
+        return {name: self._load(name) for name in targets}